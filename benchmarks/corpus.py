@@ -0,0 +1,105 @@
+import os
+import json
+from collections import defaultdict
+
+import constants
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.objects import get_move_choice
+
+
+POSITIONS_FILE = os.path.join(os.path.dirname(__file__), "positions.json")
+SAVED_STATE_FILE = "state.bin"
+SAVED_SUMMARY_FILE = "summary.json"
+
+
+def load_positions(path=POSITIONS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_pokemon(pokemon):
+    state_pokemon = StatePokemon(pokemon["id"], pokemon["level"])
+    for move in pokemon["moves"]:
+        state_pokemon.add_move(move)
+    state_pokemon.item = pokemon["item"]
+    state_pokemon.ability = pokemon["ability"]
+    state_pokemon.hp = round(state_pokemon.max_hp * pokemon["hp"])
+    state_pokemon.fainted = state_pokemon.hp == 0
+    state_pokemon.status = pokemon.get("status")
+    for stat, boost in pokemon.get("boosts", {}).items():
+        state_pokemon.boosts[stat] = boost
+    if "tera_type" in pokemon:
+        state_pokemon.tera_type = pokemon["tera_type"]
+
+    return Pokemon.from_state_pokemon_dict(state_pokemon.to_dict())
+
+
+def build_side(side):
+    side_conditions = defaultdict(lambda: 0)
+    side_conditions.update(side.get("side_conditions", {}))
+
+    active = build_pokemon(side["active"])
+    reserve = dict()
+    for pokemon in side["reserve"]:
+        p = build_pokemon(pokemon)
+        reserve[p.id] = p
+
+    return Side(active, reserve, (0, 0), side_conditions, (0, 0))
+
+
+def build_state(position):
+    """
+    Creates the engine's State for a position in the corpus
+    The data mods for the position's `mode` must already be applied because the stats and types come from the pokedex
+    """
+    return State(
+        build_side(position[constants.USER]),
+        build_side(position[constants.OPPONENT]),
+        position[constants.WEATHER],
+        position["field"],
+        position["trick_room"],
+        tera_allowed=position["tera_allowed"]
+    )
+
+
+def load_saved_state(path):
+    """
+    Reads a state that was saved by the bot (e.g. a slow decision in `logs/slow/`)
+    `path` is the directory that it was saved to or the state file in that directory.
+    Returns the name of the directory, its summary and the encoded state.
+    The state is decoded with `decode_state` once the mods for the summary's `mode` are applied
+    """
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    state_file = os.path.join(path, SAVED_STATE_FILE) if os.path.isdir(path) else path
+    with open(os.path.join(directory, SAVED_SUMMARY_FILE)) as f:
+        summary = json.load(f)
+    with open(state_file, 'rb') as f:
+        data = f.read()
+
+    return os.path.basename(os.path.normpath(directory)), summary, data
+
+
+def load_saved_searches(path):
+    """
+    Reads the searches that were made by a decision that the bot saved
+    Returns the name of the directory, its summary and a list of each search's name, encoded state and options.
+    The options are None for a state that was saved without them, and are then the state's own options
+    """
+    name, summary, data = load_saved_state(path)
+    if not os.path.isdir(path) or not summary.get('searches'):
+        return name, summary, [(name, data, None, None)]
+
+    searches = []
+    for search in summary['searches']:
+        with open(os.path.join(path, search['state']), 'rb') as f:
+            state_data = f.read()
+        searches.append((
+            "{}/{}".format(name, os.path.splitext(search['state'])[0]),
+            state_data,
+            [get_move_choice(*o) for o in search['user_options']],
+            [get_move_choice(*o) for o in search['opponent_options']],
+        ))
+    return name, summary, searches
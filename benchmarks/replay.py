@@ -0,0 +1,365 @@
+"""
+Plays recorded battles through `battle_modifier.update_battle` as fast as possible
+
+    python -m benchmarks.replay --output baseline.json
+    python -m benchmarks.replay --baseline baseline.json
+
+The battles are the transcripts in `benchmarks/replays/`, in the format saved by the local server's `--record-dir`.
+The local server does not send `-start`, `-end` or `-activate`, so `gen9randombattle-15` is a battle in Pokemon Showdown's
+own protocol, with its nicknames, details and requests, that starts and ends volatile statuses
+Every message that the bot received is given to the battle the same way that `run_battle` does,
+and the recorded choices are used instead of searching.
+The results are the messages/sec for each battle and the time spent in each message handler.
+
+The battle that is tracked at the end of each replay is compared to the snapshot in `benchmarks/replay_snapshots.json`
+and the exit code is 1 if any of them differ. `--update-snapshots` saves the current battles as the snapshots
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from contextlib import contextmanager
+
+import constants
+from config import ShowdownConfig
+from data.mods.apply_mods import apply_mods
+from showdown import battle_modifier
+from showdown.battle import Battle
+from showdown.battle import LastUsedMove
+from showdown.run_battle import battle_is_finished
+
+from .run import time_calls
+from .run import compare
+from .run import DEFAULT_MIN_TIME
+from .run import DEFAULT_THRESHOLD
+
+
+RESULTS_VERSION = 1
+
+REPLAYS_DIR = os.path.join(os.path.dirname(__file__), "replays")
+SNAPSHOTS_FILE = os.path.join(os.path.dirname(__file__), "replay_snapshots.json")
+
+# the heuristics that `update_battle` calls after the functions in `BATTLE_MODIFIERS`
+TIMED_HEURISTICS = (
+    'check_speed_ranges', 'check_choicescarf', 'get_damage_dealt', 'check_choice_band_or_specs',
+    'check_heavydutyboots',
+)
+
+
+class ReplayBattle(Battle):
+    # the choices come from the recording
+    def find_best_move(self):
+        raise NotImplementedError("A replayed battle does not make decisions")
+
+
+def load_log(path):
+    with open(path) as f:
+        log = json.load(f)
+    log['name'] = os.path.splitext(os.path.basename(path))[0]
+    return log
+
+
+def log_paths(paths):
+    if paths:
+        return paths
+    return sorted(
+        os.path.join(REPLAYS_DIR, f) for f in os.listdir(REPLAYS_DIR) if f.endswith(".json")
+    )
+
+
+def create_battle(log, user_json):
+    # what `initialize_battle_with_tag` and `start_random_battle` do when the first request is received
+    battle = ReplayBattle(log['battle_tag'])
+    battle.opponent.name = constants.ID_LOOKUP[user_json[constants.SIDE][constants.ID]]
+    battle.opponent.account_name = log['opponent']
+    battle.request_json = user_json
+    battle.battle_type = constants.RANDOM_BATTLE
+    battle.generation = log['format'][:4]
+    return battle
+
+
+def start_battle(battle, user_json, msg):
+    # what `read_messages_until_first_pokemon_is_seen` does with the message that starts the battle
+    for line in msg.split(constants.START_STRING)[-1].split('\n'):
+        if battle.opponent.name in line and constants.SWITCH_STRING in line:
+            battle.start_non_team_preview_battle(user_json, line)
+
+        elif battle.started:
+            battle_modifier.update_battle(battle, line)
+
+
+def record_choice(battle, choice):
+    # what `async_pick_move` remembers about the bot's own choice
+    choice = choice.split('|')[0]
+    if constants.SWITCH_STRING in choice:
+        battle.user.last_used_move = LastUsedMove(battle.user.active.name, "switch {}".format(choice.split()[-1]), battle.turn)
+    else:
+        battle.user.last_used_move = LastUsedMove(battle.user.active.name, choice.split()[2], battle.turn)
+
+
+def replay(log):
+    """
+    Plays the messages that the bot received in `log` and returns the battle that they were tracked in
+    The messages before the first request only tell the bot the battle's tag, and they are skipped
+    """
+    battle = None
+    user_json = None
+    for event in log['events']:
+        if 'choice' in event:
+            if battle is not None and battle.started:
+                record_choice(battle, event['choice'])
+            continue
+
+        msg = event['send']
+        if battle is None:
+            split_msg = msg.split('\n')[-1].split('|')
+            if len(split_msg) > 2 and split_msg[1] == 'request' and split_msg[2]:
+                user_json = json.loads(split_msg[2])
+                battle = create_battle(log, user_json)
+
+        elif not battle.started:
+            if constants.START_STRING in msg:
+                start_battle(battle, user_json, msg)
+
+        elif battle_is_finished(battle.battle_tag, msg):
+            break
+
+        else:
+            battle_modifier.update_battle(battle, msg)
+
+    return battle
+
+
+def count_messages(log):
+    messages = [e['send'] for e in log['events'] if 'send' in e]
+    return len(messages), sum(m.count('\n') + 1 for m in messages)
+
+
+@contextmanager
+def timed_functions(timings):
+    """
+    Replaces the functions in `battle_modifier` with ones that add their calls and time to `timings`
+    The time of a function includes the time of the functions that it calls
+    """
+    def timed(name, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timing = timings.setdefault(name, [0, 0])
+                timing[0] += 1
+                timing[1] += time.perf_counter() - start
+        return wrapper
+
+    modifiers = dict(battle_modifier.BATTLE_MODIFIERS)
+    heuristics = {name: getattr(battle_modifier, name) for name in TIMED_HEURISTICS}
+    for action, function in modifiers.items():
+        battle_modifier.BATTLE_MODIFIERS[action] = timed(function.__name__, function)
+    for name, function in heuristics.items():
+        setattr(battle_modifier, name, timed(name, function))
+    try:
+        yield
+    finally:
+        battle_modifier.BATTLE_MODIFIERS.update(modifiers)
+        for name, function in heuristics.items():
+            setattr(battle_modifier, name, function)
+
+
+def snapshot_pokemon(pokemon):
+    return {
+        'name': pokemon.name,
+        'hp': pokemon.hp,
+        'max_hp': pokemon.max_hp,
+        'status': pokemon.status,
+        'item': pokemon.item,
+        'ability': pokemon.ability,
+        'moves': [m.name for m in pokemon.moves],
+        'boosts': {k: v for k, v in pokemon.boosts.items() if v},
+        'volatile_statuses': list(pokemon.volatile_statuses),
+        'terastallized': pokemon.terastallized,
+        'speed_range': [pokemon.speed_range.min, None if pokemon.speed_range.max == float("inf") else pokemon.speed_range.max],
+        'can_have_choice_item': pokemon.can_have_choice_item,
+        'can_have_heavydutyboots': pokemon.can_have_heavydutyboots,
+    }
+
+
+def snapshot_side(side):
+    return {
+        'active': snapshot_pokemon(side.active),
+        'reserve': [snapshot_pokemon(p) for p in side.reserve],
+        'side_conditions': {k: v for k, v in side.side_conditions.items() if v},
+        'last_used_move': list(side.last_used_move),
+    }
+
+
+def snapshot(battle):
+    # the parts of the battle that the messages change, as JSON
+    return {
+        'turn': battle.turn,
+        'weather': battle.weather,
+        'field': battle.field,
+        'trick_room': battle.trick_room,
+        constants.USER: snapshot_side(battle.user),
+        constants.OPPONENT: snapshot_side(battle.opponent),
+    }
+
+
+def differences(expected, actual, path=""):
+    # a line for each value in `actual` that is not the same as in `expected`
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        lines = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            lines.extend(differences(expected.get(key), actual.get(key), "{}.{}".format(path, key).lstrip(".")))
+        return lines
+
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        lines = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            lines.extend(differences(e, a, "{}[{}]".format(path, i)))
+        return lines
+
+    if expected != actual:
+        return ["{}: expected {}, got {}".format(path, json.dumps(expected), json.dumps(actual))]
+    return []
+
+
+def benchmark_log(path, snapshots, min_time):
+    log = load_log(path)
+    messages, lines = count_messages(log)
+
+    actual = snapshot(replay(log))
+    expected = snapshots.get(log['name'])
+    result = {
+        'name': log['name'],
+        'mode': log['format'],
+        'path': path,
+        'messages': messages,
+        'lines': lines,
+        'snapshot': actual,
+        'differences': differences(expected, actual) if expected is not None else None,
+    }
+
+    timing = time_calls(lambda: replay(log), min_time)
+    timing['messages_per_second'] = round(timing['calls'] * messages / timing['seconds'], 1)
+    timing['lines_per_second'] = round(timing['calls'] * lines / timing['seconds'], 1)
+    timing['per_second'] = timing['messages_per_second']
+
+    # the functions are timed separately because timing them slows the replays down
+    timings = dict()
+    with timed_functions(timings):
+        calls = time_calls(lambda: replay(log), min_time)['calls']
+    result['functions'] = {
+        name: {
+            'calls_per_replay': round(function_calls / calls),
+            'microseconds_per_replay': round(seconds / calls * 1000000, 1),
+        }
+        for name, (function_calls, seconds) in sorted(timings.items(), key=lambda t: -t[1][1])
+    }
+
+    result['benchmarks'] = {'update_battle': timing}
+    return result
+
+
+def load_snapshots(path=SNAPSHOTS_FILE):
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_mode(mode, paths, min_time):
+    # runs in a fresh process for each mode because the mods cannot be undone
+    apply_mods(mode)
+    ShowdownConfig.damage_calc_type = "average"
+
+    snapshots = load_snapshots()
+    return [benchmark_log(path, snapshots, min_time) for path in paths]
+
+
+def run_all(paths, min_time):
+    paths_by_mode = dict()
+    for path in paths:
+        with open(path) as f:
+            mode = json.load(f)['format']
+        paths_by_mode.setdefault(mode, []).append(path)
+
+    logs = []
+    for mode, mode_paths in paths_by_mode.items():
+        cmd = [
+            sys.executable, "-m", "benchmarks.replay",
+            "--mode", mode,
+            "--min-time", str(min_time),
+        ]
+        for path in mode_paths:
+            cmd.extend(["--log", path])
+        sys.stderr.write("Replaying {}\n".format(mode))
+        output = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+        logs.extend(json.loads(output))
+
+    return {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'logs': logs
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tracking the battle from recorded messages")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--baseline", help="compare the results to this file of earlier results")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="the slowdown that is a regression")
+    parser.add_argument("--log", action="append", default=[], help="only replay these recorded battles")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds to replay each battle for")
+    parser.add_argument("--update-snapshots", action="store_true", help="save the battles at the end of the replays as the expected snapshots")
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        json.dump(run_mode(args.mode, args.log, args.min_time), sys.stdout)
+        return 0
+
+    results = run_all(log_paths(args.log), args.min_time)
+    # the snapshots are only kept to be saved
+    snapshots = {log['name']: log.pop('snapshot') for log in results['logs']}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    exit_code = 0
+    if args.update_snapshots:
+        snapshots = dict(load_snapshots(), **snapshots)
+        with open(SNAPSHOTS_FILE, 'w') as f:
+            json.dump(snapshots, f, indent=2, sort_keys=True)
+            f.write("\n")
+    else:
+        for log in results['logs']:
+            if log['differences'] is None:
+                sys.stderr.write("{}: there is no snapshot to compare to\n".format(log['name']))
+            elif log['differences']:
+                sys.stderr.write("{}: the battle is not the same as the snapshot\n    {}\n".format(
+                    log['name'], "\n    ".join(log['differences'])
+                ))
+                exit_code = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(baseline, results, args.threshold, section='logs')
+        sys.stderr.write("\n".join(lines) + "\n")
+        if regressed:
+            exit_code = 1
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+"""
+Benchmarks the battle engine on the positions in `benchmarks/positions.json`
+
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --baseline baseline.json
+
+States saved by the bot, e.g. the slow decisions in `logs/slow/`, are benchmarked instead with
+
+    python -m benchmarks.run --state logs/slow/<directory>
+
+`--check-dominance` does not time the engine. Instead it compares the safest bot's decision on each position
+with and without removing the options that are dominated after one turn (`ELIMINATE_DOMINATED`),
+and the exit code is 1 if any decision is different
+
+The data mods for a generation change the move and pokedex data for the whole process,
+so each generation's positions are benchmarked in their own process.
+The results are JSON. When a baseline is given, every throughput is compared to it
+and the exit code is 1 if any of them are slower by more than the threshold
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import subprocess
+import tracemalloc
+
+import constants
+from config import ShowdownConfig
+from data.mods.apply_mods import apply_mods
+from showdown.engine.objects import StateMutator
+from showdown.engine.objects import IncrementalStateMutator
+from showdown.engine.evaluate import evaluate
+from showdown.engine.damage_calculator import _calculate_damage
+from showdown.engine.damage_calculator import damage_cache
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.find_state_instructions import get_effective_speeds
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import pick_safest
+from showdown.engine.payoff_matrix import PayoffMatrix
+from showdown.engine.serialization import decode_state
+
+from showdown.battle_bots.helpers import search_state
+
+from .corpus import load_positions
+from .corpus import build_state
+from .corpus import load_saved_state
+from .corpus import load_saved_searches
+
+
+RESULTS_VERSION = 1
+
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_THRESHOLD = 0.1
+
+# deeper searches take seconds, so they are repeated fewer times
+SEARCH_REPEATS = {1: 5, 2: 3, 3: 1}
+
+
+class CountingMutator(IncrementalStateMutator):
+    # every evaluation is a leaf of the search
+    def __init__(self, state):
+        super().__init__(state)
+        self.nodes = 0
+
+    def evaluate(self):
+        self.nodes += 1
+        return super().evaluate()
+
+
+def time_calls(func, min_time):
+    # calls `func` in batches until at least `min_time` seconds have passed
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            func()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return {
+                'calls': calls,
+                'seconds': round(elapsed, 6),
+                'per_second': round(calls / elapsed, 1)
+            }
+        batch *= 2
+
+
+def measure_memory(func):
+    """
+    The peak memory that Python allocates while `func` runs,
+    and the number of memory blocks that are still allocated afterwards (e.g. the entries added to caches)
+    """
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    gc.collect()
+
+    return {
+        'peak_memory_bytes': peak,
+        'retained_blocks': sys.getallocatedblocks() - blocks_before
+    }
+
+
+def benchmark_state_instructions(state, option_pairs, min_time):
+    mutator = StateMutator(state)
+    effective_speeds = get_effective_speeds(state)
+
+    def all_pairs():
+        for user_option, opponent_option in option_pairs:
+            get_all_state_instructions(mutator, user_option, opponent_option, effective_speeds)
+
+    result = time_calls(all_pairs, min_time)
+    result['calls'] *= len(option_pairs)
+    result['per_second'] = round(result['calls'] / result['seconds'], 1)
+    result['outcomes'] = sum(
+        len(get_all_state_instructions(mutator, u, o, effective_speeds)) for u, o in option_pairs
+    )
+    return result
+
+
+def benchmark_mutator(state, option_pairs, min_time):
+    mutator = StateMutator(state)
+    all_instructions = [
+        transpose_instruction.instructions
+        for u, o in option_pairs
+        for transpose_instruction in get_all_state_instructions(mutator, u, o)
+    ]
+
+    def apply_and_reverse():
+        for instructions in all_instructions:
+            mutator.apply(instructions)
+            mutator.reverse(instructions)
+
+    result = time_calls(apply_and_reverse, min_time)
+    result['calls'] *= len(all_instructions)
+    result['per_second'] = round(result['calls'] / result['seconds'], 1)
+    result['instructions'] = sum(len(i) for i in all_instructions)
+    return result
+
+
+def benchmark_damage(state, min_time, cached):
+    attacker = state.user.active
+    defender = state.opponent.active
+    conditions = {
+        constants.REFLECT: state.opponent.side_conditions[constants.REFLECT],
+        constants.LIGHT_SCREEN: state.opponent.side_conditions[constants.LIGHT_SCREEN],
+        constants.AURORA_VEIL: state.opponent.side_conditions[constants.AURORA_VEIL],
+        constants.WEATHER: state.weather,
+        constants.TERRAIN: state.field
+    }
+    moves = [m[constants.ID] for m in attacker.moves]
+
+    def calculate_damage():
+        if not cached:
+            damage_cache.clear()
+        for move in moves:
+            _calculate_damage(attacker, defender, move, conditions=conditions, calc_type=ShowdownConfig.damage_calc_type)
+
+    result = time_calls(calculate_damage, min_time)
+    result['calls'] *= len(moves)
+    result['per_second'] = round(result['calls'] / result['seconds'], 1)
+    return result
+
+
+def benchmark_search(state, user_options, opponent_options, depth):
+    def search():
+        damage_cache.clear()
+        mutator = CountingMutator(state)
+        start = time.perf_counter()
+        get_payoff_matrix(mutator, user_options, opponent_options, depth=depth, prune=True)
+        return time.perf_counter() - start, mutator.nodes
+
+    seconds, nodes = min(search() for _ in range(SEARCH_REPEATS.get(depth, 1)))
+    result = {
+        'seconds': round(seconds, 6),
+        'nodes': nodes,
+        'nodes_per_second': round(nodes / seconds, 1),
+    }
+    result.update(measure_memory(search))
+    return result
+
+
+def benchmark_state(state, min_time, max_depth, options=None):
+    # `options` are the options that the bot searched the state with - by default they are the state's own
+    user_options, opponent_options = options or state.get_all_options()
+    option_pairs = list(itertools.product(user_options, opponent_options))
+
+    benchmarks = {
+        'get_all_state_instructions': benchmark_state_instructions(state, option_pairs, min_time),
+        'mutator_apply_reverse': benchmark_mutator(state, option_pairs, min_time),
+        'calculate_damage': benchmark_damage(state, min_time, cached=False),
+        'calculate_damage_cached': benchmark_damage(state, min_time, cached=True),
+        'evaluate': time_calls(lambda: evaluate(state), min_time),
+    }
+    for depth in range(1, max_depth + 1):
+        benchmarks['get_payoff_matrix_depth_{}'.format(depth)] = benchmark_search(
+            state,
+            user_options,
+            opponent_options,
+            depth
+        )
+
+    return {
+        'options': [len(user_options), len(opponent_options)],
+        'benchmarks': benchmarks
+    }
+
+
+def benchmark_position(position, min_time, max_depth):
+    result = {
+        'name': position['name'],
+        'mode': position['mode'],
+        'format': position['format'],
+        'phase': position['phase'],
+    }
+    result.update(benchmark_state(build_state(position), min_time, max_depth))
+    return result
+
+
+def benchmark_saved_state(path, min_time, max_depth):
+    # a result for each search that the saved decision made
+    _, summary, searches = load_saved_searches(path)
+    results = []
+    for name, data, user_options, opponent_options in searches:
+        result = {
+            'name': name,
+            'mode': summary['mode'],
+            'path': path,
+            'decision_seconds': summary.get('seconds'),
+        }
+        options = (user_options, opponent_options) if user_options is not None else None
+        result.update(benchmark_state(decode_state(data), min_time, max_depth, options))
+        results.append(result)
+    return results
+
+
+def format_choice(choice):
+    if choice.is_switch:
+        return "switch {}".format(choice.id)
+    if choice.terastallize:
+        return "{} tera".format(choice.id)
+    return choice.id
+
+
+def safest_decision(state, user_options, opponent_options, depth, eliminate_dominated):
+    # searches the same way that the safest bot does
+    damage_cache.clear()
+    start = time.perf_counter()
+    payoff_matrix, _ = search_state(state, user_options, opponent_options, depth, True, eliminate_dominated, False)
+    seconds = time.perf_counter() - start
+    decision, payoff = pick_safest(PayoffMatrix.concatenate([payoff_matrix]), remove_guaranteed=True)
+    return {
+        'decision': format_choice(decision[0]),
+        'payoff': round(float(payoff), 3),
+        'seconds': round(seconds, 6),
+    }
+
+
+def check_dominance(name, state, max_depth, options=None):
+    user_options, opponent_options = options or state.get_all_options()
+    results = []
+    for depth in range(2, max_depth + 1):
+        searched = safest_decision(state, user_options, opponent_options, depth, eliminate_dominated=False)
+        eliminated = safest_decision(state, user_options, opponent_options, depth, eliminate_dominated=True)
+        results.append({
+            'name': name,
+            'depth': depth,
+            'searched': searched,
+            'eliminated': eliminated,
+            'same_decision': searched['decision'] == eliminated['decision'],
+        })
+    return results
+
+
+def dominance_lines(results):
+    """
+    Returns a line for each position and depth that was checked and whether any of the decisions changed
+    Each line has the decision and its payoff without and with the dominated options removed,
+    and how many times faster the search was with them removed
+    """
+    lines = []
+    changed = False
+    for result in results['dominance']:
+        searched, eliminated = result['searched'], result['eliminated']
+        status = ""
+        if not result['same_decision']:
+            status = "CHANGED"
+            changed = True
+        lines.append(
+            "{:<28} depth {} {:<26} {:<26} {:>6.2f}x {}".format(
+                result['name'],
+                result['depth'],
+                "{} ({})".format(searched['decision'], searched['payoff']),
+                "{} ({})".format(eliminated['decision'], eliminated['payoff']),
+                searched['seconds'] / eliminated['seconds'],
+                status
+            ).rstrip()
+        )
+
+    return lines, changed
+
+
+def is_selected(position, names, states):
+    # every position is benchmarked unless some positions or saved states were asked for
+    if names:
+        return position['name'] in names
+    return not states
+
+
+def run_mode(mode, names, states, min_time, max_depth, dominance=False):
+    # runs in a fresh process for each mode because the mods cannot be undone
+    apply_mods(mode)
+    ShowdownConfig.damage_calc_type = "average"
+
+    results = []
+    for position in load_positions():
+        if position['mode'] == mode and is_selected(position, names, states):
+            if dominance:
+                results.extend(check_dominance(position['name'], build_state(position), max_depth))
+            else:
+                results.append(benchmark_position(position, min_time, max_depth))
+
+    for path in states:
+        if dominance:
+            for name, data, user_options, opponent_options in load_saved_searches(path)[2]:
+                options = (user_options, opponent_options) if user_options is not None else None
+                results.extend(check_dominance(name, decode_state(data), max_depth, options))
+        else:
+            results.extend(benchmark_saved_state(path, min_time, max_depth))
+    return results
+
+
+def run_all(names, states, min_time, max_depth, dominance=False):
+    modes = []
+    for position in load_positions():
+        if position['mode'] not in modes and is_selected(position, names, states):
+            modes.append(position['mode'])
+
+    states_by_mode = dict()
+    for path in states:
+        mode = load_saved_state(path)[1]['mode']
+        states_by_mode.setdefault(mode, []).append(path)
+        if mode not in modes:
+            modes.append(mode)
+
+    positions = []
+    for mode in modes:
+        cmd = [
+            sys.executable, "-m", "benchmarks.run",
+            "--mode", mode,
+            "--min-time", str(min_time),
+            "--max-depth", str(max_depth),
+        ]
+        for name in names:
+            cmd.extend(["--position", name])
+        for path in states_by_mode.get(mode, []):
+            cmd.extend(["--state", path])
+        if dominance:
+            cmd.append("--check-dominance")
+        sys.stderr.write("Benchmarking {}\n".format(mode))
+        output = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+        positions.extend(json.loads(output))
+
+    return {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'dominance' if dominance else 'positions': positions
+    }
+
+
+def throughputs(results, section):
+    # the number that is compared for each benchmark - higher is faster
+    values = dict()
+    for position in results[section]:
+        for benchmark, result in position['benchmarks'].items():
+            value = result.get('per_second', result.get('nodes_per_second'))
+            values[(position['name'], benchmark)] = value
+    return values
+
+
+def compare(baseline, results, threshold, section='positions'):
+    """
+    Returns a line for each benchmark in both `baseline` and `results` and whether any of them regressed
+    i.e. the throughput fell by more than `threshold` (a fraction)
+    `section` is the list of results in each file, e.g. the positions
+    """
+    baseline_values = throughputs(baseline, section)
+    lines = []
+    regressed = False
+    for key, value in throughputs(results, section).items():
+        baseline_value = baseline_values.get(key)
+        if not baseline_value:
+            continue
+
+        ratio = value / baseline_value
+        status = ""
+        if ratio < 1 - threshold:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio > 1 + threshold:
+            status = "improvement"
+        lines.append("{:<28} {:<28} {:>8.3f}x {}".format(key[0], key[1], ratio, status).rstrip())
+
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the battle engine")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--baseline", help="compare the results to this file of earlier results")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="the slowdown that is a regression")
+    parser.add_argument("--position", action="append", default=[], help="only benchmark these positions")
+    parser.add_argument("--state", action="append", default=[], help="benchmark a state saved by the bot")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds to time each benchmark for")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="the deepest search to time")
+    parser.add_argument(
+        "--check-dominance",
+        action="store_true",
+        help="compare the decisions with and without removing dominated options instead of timing the engine"
+    )
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        json.dump(
+            run_mode(args.mode, args.position, args.state, args.min_time, args.max_depth, args.check_dominance),
+            sys.stdout
+        )
+        return 0
+
+    results = run_all(args.position, args.state, args.min_time, args.max_depth, args.check_dominance)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.check_dominance:
+        lines, changed = dominance_lines(results)
+        sys.stderr.write("\n".join(lines) + "\n")
+        return 1 if changed else 0
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(baseline, results, args.threshold)
+        sys.stderr.write("\n".join(lines) + "\n")
+        return 1 if regressed else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
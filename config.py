@@ -2,11 +2,14 @@ import logging
 import os
 import sys
 from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueListener
 from typing import Union
 
 from environs import Env
 
 import constants
+from showdown.event_log import DEFAULT_QUEUE_SIZE
+from showdown.event_log import start_background_logging
 
 env = Env()
 env.read_env(path="env", recurse=False)
@@ -16,7 +19,7 @@ class CustomFormatter(logging.Formatter):
     def format(self, record):
         record.module = "[{}]".format(record.module)
         record.levelname = "[{}]".format(record.levelname)
-        return "{} {}".format(record.levelname.ljust(10), record.msg)
+        return "{} {}".format(record.levelname.ljust(10), record.getMessage())
 
 
 class CustomRotatingFileHandler(RotatingFileHandler):
@@ -28,11 +31,16 @@ class CustomRotatingFileHandler(RotatingFileHandler):
         super().__init__("{}/{}".format(self.base_dir, file_name), **kwargs)
 
     def do_rollover(self, new_file_name):
-        self.baseFilename = "{}/{}".format(self.base_dir, new_file_name)
-        self.doRollover()
+        # the records are written by another thread, which holds this lock while it writes
+        self.acquire()
+        try:
+            self.baseFilename = "{}/{}".format(self.base_dir, new_file_name)
+            self.doRollover()
+        finally:
+            self.release()
 
 
-def init_logging(level, log_to_file):
+def init_logging(level, log_to_file, queue_size=DEFAULT_QUEUE_SIZE, message_sampling=1):
     websockets_logger = logging.getLogger("websockets")
     websockets_logger.setLevel(logging.INFO)
     requests_logger = logging.getLogger("urllib3")
@@ -48,12 +56,21 @@ def init_logging(level, log_to_file):
 
     ShowdownConfig.log_handler = log_handler
     log_handler.setFormatter(CustomFormatter())
-    logger.addHandler(log_handler)
+    ShowdownConfig.log_listener = start_background_logging(log_handler, queue_size, message_sampling)
+
+
+def stop_logging():
+    # writes the records that are still queued
+    log_listener = getattr(ShowdownConfig, 'log_listener', None)
+    if log_listener is not None:
+        log_listener.stop()
+        ShowdownConfig.log_listener = None
 
 
 class _ShowdownConfig:
     battle_bot_module: str
     websocket_uri: str
+    login_uri: str
     username: str
     password: str
     bot_mode: str
@@ -64,13 +81,22 @@ class _ShowdownConfig:
     save_replay: bool
     room_name: str
     damage_calc_type: str
+    search_processes: int
+    equilibrium_cache_file: str
+    eliminate_dominated: bool
+    search_stats: bool
+    slow_decision_seconds: float
     log_level: str
     log_to_file: bool
+    log_queue_size: int
+    log_message_sampling: int
     log_handler: Union[CustomRotatingFileHandler, logging.StreamHandler]
+    log_listener: QueueListener
 
     def configure(self):
         self.battle_bot_module = env("BATTLE_BOT")
         self.websocket_uri = env("WEBSOCKET_URI")
+        self.login_uri = env("LOGIN_URI", None)
         self.username = env("PS_USERNAME")
         self.password = env("PS_PASSWORD")
         self.bot_mode = env("BOT_MODE")
@@ -83,9 +109,16 @@ class _ShowdownConfig:
         self.save_replay = env.bool("SAVE_REPLAY", False)
         self.room_name = env("ROOM_NAME", None)
         self.damage_calc_type = env("DAMAGE_CALC_TYPE", "average")
+        self.search_processes = env.int("SEARCH_PROCESSES", 1)
+        self.equilibrium_cache_file = env("EQUILIBRIUM_CACHE_FILE", None)
+        self.eliminate_dominated = env.bool("ELIMINATE_DOMINATED", False)
+        self.search_stats = env.bool("SEARCH_STATS", False)
+        self.slow_decision_seconds = env.float("SLOW_DECISION_SECONDS", None)
 
         self.log_level = env("LOG_LEVEL", "DEBUG")
         self.log_to_file = env.bool("LOG_TO_FILE", False)
+        self.log_queue_size = env.int("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        self.log_message_sampling = env.int("LOG_MESSAGE_SAMPLING", 1)
 
         self.validate_config()
 
@@ -6,6 +6,7 @@ import data
 from data import all_move_json
 from data import pokedex
 from showdown.engine import damage_calculator
+from showdown.engine.move_records import recompile_move_records
 
 logger = logging.getLogger(__name__)
 
@@ -131,3 +132,7 @@ def apply_mods(game_mode):
             damage_calculator.TERRAIN_DAMAGE_BOOST = 1.5  # terrain gave a 1.5x damage boost prior to gen8
         if int(game_mode[3]) < 9:
             constants.ICE_WEATHER = constants.HAIL  # ice-type weather was hail prior to gen9
+
+    # anything cached or compiled before the mods were applied may be stale
+    damage_calculator.damage_cache.clear()
+    recompile_move_records()
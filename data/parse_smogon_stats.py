@@ -1,5 +1,6 @@
 import logging
 import ntpath
+import threading
 from datetime import datetime
 from dateutil import relativedelta
 
@@ -17,6 +18,18 @@ SPREADS_STRING = "spreads"
 ABILITY_STRING = "abilities"
 EFFECTIVENESS = "effectiveness"
 
+SMOGON_STATS_TIMEOUT = 30
+
+_sessions = threading.local()
+
+
+def get_session():
+    # the stats are fetched from an executor, and a session can only be used by one thread at a time
+    # each thread keeps its own session so that its requests to smogon reuse the same connection
+    if not hasattr(_sessions, 'session'):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
 
 def get_smogon_stats_file_name(game_mode, month_delta=1):
     """
@@ -46,9 +59,13 @@ def pokemon_is_similar(normalized_name, list_of_pkmn_names):
 
 
 def get_pokemon_information(smogon_stats_url, pkmn_names=None):
-    r = requests.get(smogon_stats_url)
+    session = get_session()
+    r = session.get(smogon_stats_url, timeout=SMOGON_STATS_TIMEOUT)
     if r.status_code == 404:
-        r = requests.get(get_smogon_stats_file_name(ntpath.basename(smogon_stats_url.replace('-0.json', '')), month_delta=2))
+        r = session.get(
+            get_smogon_stats_file_name(ntpath.basename(smogon_stats_url.replace('-0.json', '')), month_delta=2),
+            timeout=SMOGON_STATS_TIMEOUT
+        )
 
     infos = r.json()['data']
     final_infos = {}
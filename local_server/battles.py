@@ -0,0 +1,569 @@
+"""
+The battles that the local server runs
+
+`EngineBattle` plays a random battle with the battle engine. The server keeps the battle's `State`,
+asks each player for a choice, picks one of the outcomes of the pair of choices by its probability,
+and sends each player the changes as Showdown protocol messages.
+The engine's instructions do not say which move caused them, so each move is followed by the changes to
+the side that it targeted and volatile statuses are not sent. This is close enough for the bot to track
+the battle, but it is not a simulator.
+
+`RecordedBattle` sends one player the messages from a recorded battle and waits wherever a choice was made.
+The choices do not change what is sent
+"""
+import re
+import json
+import time
+import asyncio
+from collections import defaultdict
+
+import constants
+import data
+from data import all_move_json
+from data import pokedex
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.objects import StateMutator
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.find_state_instructions import lookup_move
+from showdown.engine.find_state_instructions import user_moves_first
+
+
+TEAM_SIZE = 6
+LEVEL = 100
+MAX_TURNS = 500
+
+SIDES = ('p1', 'p2')
+OTHER_SIDE = {'p1': 'p2', 'p2': 'p1'}
+
+BOOSTS = (
+    (constants.ATTACK_BOOST, 'atk'),
+    (constants.DEFENSE_BOOST, 'def'),
+    (constants.SPECIAL_ATTACK_BOOST, 'spa'),
+    (constants.SPECIAL_DEFENSE_BOOST, 'spd'),
+    (constants.SPEED_BOOST, 'spe'),
+    (constants.ACCURACY_BOOST, 'accuracy'),
+    (constants.EVASION_BOOST, 'evasion'),
+)
+
+SHOWN_SIDE_CONDITIONS = (
+    constants.STEALTH_ROCK,
+    constants.SPIKES,
+    constants.TOXIC_SPIKES,
+    constants.STICKY_WEB,
+    constants.REFLECT,
+    constants.LIGHT_SCREEN,
+    constants.AURORA_VEIL,
+    constants.TAILWIND,
+)
+
+# the lines that a player's name is in
+NAMED_LINES = {'j', 'title', 'player', 'win', 'request'}
+
+
+class Player:
+    """
+    A player in a battle. The server's own player has no connection and picks its choices at random
+    """
+    def __init__(self, name, connection=None):
+        self.name = name
+        self.connection = connection
+        self.choices = asyncio.Queue()
+
+
+def weighted_choice(rng, options):
+    # `options` are lists ending in their weight, as in the random battle sets
+    return rng.choices(options, weights=[o[-1] for o in options])[0]
+
+
+def random_pokemon(rng, name):
+    sets = data.random_battle_sets[name]
+    nature, evs, _ = weighted_choice(rng, sets['spreads'])
+    pokemon = StatePokemon(name, LEVEL, nature=nature, evs=[int(e) for e in evs.split(',')])
+    moves = rng.choices(list(sets[constants.SETS]), weights=list(sets[constants.SETS].values()))[0]
+    for move in moves.split('|'):
+        pokemon.add_move(move)
+    pokemon.ability = weighted_choice(rng, sets[constants.ABILITIES])[0]
+    pokemon.item = weighted_choice(rng, sets[constants.ITEMS])[0]
+    return Pokemon.from_state_pokemon_dict(pokemon.to_dict())
+
+
+def random_side(rng):
+    names = rng.sample(sorted(n for n in data.random_battle_sets if n in pokedex), TEAM_SIZE)
+    team = [random_pokemon(rng, name) for name in names]
+    side = Side(team[0], {p.id: p for p in team[1:]}, (0, 0), defaultdict(lambda: 0), (0, 0))
+    return side, [p.id for p in team]
+
+
+def condition(pokemon, exact):
+    # the opponent's hp is shown as a percentage
+    if pokemon.hp <= 0:
+        return "0 {}".format(constants.FNT)
+    if exact:
+        hp = "{}/{}".format(max(1, round(pokemon.hp)), round(pokemon.maxhp))
+    else:
+        hp = "{}/100".format(max(1, round(100 * pokemon.hp / pokemon.maxhp)))
+    if pokemon.status:
+        return "{} {}".format(hp, pokemon.status)
+    return hp
+
+
+def details(pokemon):
+    if pokemon.level == 100:
+        return pokemon.id
+    return "{}, L{}".format(pokemon.id, pokemon.level)
+
+
+def rename(frame, battle_tag, new_battle_tag, name, new_name):
+    # puts a new battle tag and player name into a frame from a recorded battle
+    name_pattern = re.compile(r"(?<![\w]){}(?![\w])".format(re.escape(name)))
+    lines = []
+    for line in frame.replace(battle_tag, new_battle_tag).split('\n'):
+        split_line = line.split('|')
+        if len(split_line) > 1 and split_line[1] in NAMED_LINES:
+            line = name_pattern.sub(new_name, line)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def choice_text(choice):
+    # the choice without the room or rqid, e.g. "move thunderbolt"
+    return choice.split('|')[0].replace('/choose', '').strip().lstrip('/')
+
+
+class LocalBattle:
+    def __init__(self, server, battle_tag, battle_format, players):
+        self.server = server
+        self.battle_tag = battle_tag
+        self.format = battle_format
+        self.players = players
+        self.finished = False
+        self.transcripts = {side: [] for side, p in players.items() if p.connection is not None}
+
+    def player_named(self, name):
+        for side, player in self.players.items():
+            if player.name == name and player.connection is not None:
+                return side, player
+        return None, None
+
+    def receive_choice(self, name, choice):
+        _, player = self.player_named(name)
+        if player is not None:
+            player.choices.put_nowait(choice)
+
+    def forfeit(self, name):
+        # a player that leaves or disconnects has no more choices
+        self.receive_choice(name, None)
+
+    async def send_frame(self, side, frame):
+        player = self.players[side]
+        if player.connection is None:
+            return
+        self.transcripts[side].append({'send': frame})
+        await self.server.send(player.connection, frame)
+
+    async def send(self, side, lines):
+        await self.send_frame(side, ">{}\n{}".format(self.battle_tag, "\n".join(lines)))
+
+    async def abort(self):
+        for side in self.transcripts:
+            await self.send(side, ["|error|The local server could not continue this battle", constants.TIE_STRING])
+
+    async def wait_for_choice(self, side):
+        player = self.players[side]
+        start_time = time.perf_counter()
+        try:
+            choice = await asyncio.wait_for(player.choices.get(), self.server.choice_timeout)
+        except asyncio.TimeoutError:
+            self.server.metrics.timeouts += 1
+            return None
+
+        if choice is not None:
+            self.server.metrics.record_choice(time.perf_counter() - start_time)
+            self.transcripts[side].append({'choice': choice})
+        return choice
+
+    def transcript(self, side):
+        return {
+            'format': self.format,
+            'battle_tag': self.battle_tag,
+            'side': side,
+            'player': self.players[side].name,
+            'opponent': self.players[OTHER_SIDE[side]].name,
+            'events': self.transcripts[side],
+        }
+
+
+class EngineBattle(LocalBattle):
+    def __init__(self, server, battle_tag, battle_format, players, rng):
+        super().__init__(server, battle_tag, battle_format, players)
+        self.rng = rng
+        user, user_order = random_side(rng)
+        opponent, opponent_order = random_side(rng)
+        self.state = State(user, opponent, None, None, False)
+        self.mutator = StateMutator(self.state)
+
+        # the pokemon in the order of the request, which is the order used by "/switch <n>"
+        self.team_order = {'p1': user_order, 'p2': opponent_order}
+        self.rqid = 0
+        self.turn = 0
+
+    def side(self, side):
+        return self.state.user if side == 'p1' else self.state.opponent
+
+    def pokemon(self, side, pokemon_id):
+        engine_side = self.side(side)
+        if engine_side.active.id == pokemon_id:
+            return engine_side.active
+        return engine_side.reserve[pokemon_id]
+
+    def options(self):
+        user_options, opponent_options = self.state.get_all_options()
+        return {'p1': user_options, 'p2': opponent_options}
+
+    def request(self, side, options):
+        engine_side = self.side(side)
+        pokemon = []
+        for pokemon_id in self.team_order[side]:
+            p = self.pokemon(side, pokemon_id)
+            pokemon.append({
+                constants.IDENT: "{}: {}".format(side, p.id),
+                constants.DETAILS: details(p),
+                constants.CONDITION: condition(p, exact=True),
+                constants.ACTIVE: p is engine_side.active,
+                constants.STATS: {
+                    'atk': p.attack,
+                    'def': p.defense,
+                    'spa': p.special_attack,
+                    'spd': p.special_defense,
+                    'spe': p.speed,
+                },
+                constants.MOVES: [m[constants.ID] for m in p.moves],
+                'baseAbility': p.ability,
+                constants.ABILITY: p.ability,
+                constants.ITEM: p.item or "",
+                'pokeball': 'pokeball',
+            })
+
+        self.rqid += 1
+        request = {
+            constants.SIDE: {'name': self.players[side].name, constants.ID: side, constants.POKEMON: pokemon},
+            constants.RQID: self.rqid,
+        }
+        if options[0].id == constants.DO_NOTHING_MOVE:
+            request[constants.WAIT] = True
+        elif engine_side.active.hp <= 0:
+            request[constants.FORCE_SWITCH] = [True]
+        else:
+            move_options = {o.id for o in options if not o.is_switch}
+            request[constants.ACTIVE] = [{
+                constants.MOVES: [
+                    {
+                        'move': all_move_json[m[constants.ID]]['name'],
+                        constants.ID: m[constants.ID],
+                        constants.PP: m[constants.CURRENT_PP],
+                        'maxpp': int(all_move_json[m[constants.ID]][constants.PP] * 1.6),
+                        'target': all_move_json[m[constants.ID]]['target'],
+                        constants.DISABLED: m[constants.DISABLED] or m[constants.ID] not in move_options,
+                    }
+                    for m in engine_side.active.moves
+                ],
+                constants.TRAPPED: engine_side.trapped(self.side(OTHER_SIDE[side]).active),
+            }]
+        return request
+
+    def render(self, event, viewer):
+        # events are rendered for each player because a player sees the exact hp of their own pokemon only
+        if isinstance(event, str):
+            return event
+
+        kind, side = event[0], event[1]
+        if kind in ('switch', 'drag'):
+            p = event[2]
+            return "|{}|{}a: {}|{}|{}".format(kind, side, p.id, details(p), condition(p, side == viewer))
+        elif kind in ('-damage', '-heal'):
+            p = event[2]
+            return "|{}|{}a: {}|{}".format(kind, side, p.id, condition(p, side == viewer))
+        elif kind == 'faint':
+            return "|faint|{}a: {}".format(side, event[2].id)
+        elif kind in ('-status', '-curestatus'):
+            return "|{}|{}a: {}|{}".format(kind, side, event[2].id, event[3])
+        elif kind in ('-boost', '-unboost'):
+            return "|{}|{}a: {}|{}|{}".format(kind, side, event[2].id, event[3], event[4])
+        elif kind == 'move':
+            attacker, move, target_side, target = event[2:]
+            return "|move|{}a: {}|{}|{}a: {}".format(side, attacker, all_move_json[move]['name'], target_side, target)
+        elif kind in ('-sidestart', '-sideend'):
+            return "|{}|{}: {}|move: {}".format(kind, side, self.players[side].name, event[2])
+        raise ValueError("Unknown event: {}".format(kind))
+
+    async def send_events(self, events):
+        for side in SIDES:
+            await self.send(side, [self.render(e, side) for e in events])
+
+    def snapshot(self):
+        snapshot = {}
+        for side in SIDES:
+            engine_side = self.side(side)
+            everyone = [engine_side.active] + list(engine_side.reserve.values())
+            snapshot[side] = {
+                'active': engine_side.active.id,
+                'hp': {p.id: p.hp for p in everyone},
+                'status': {p.id: p.status for p in everyone},
+                'boosts': {name: getattr(engine_side.active, attribute) for attribute, name in BOOSTS},
+                'side_conditions': {c: engine_side.side_conditions[c] for c in SHOWN_SIDE_CONDITIONS},
+            }
+        snapshot['weather'] = self.state.weather
+        snapshot['field'] = self.state.field
+        snapshot['trick_room'] = self.state.trick_room
+        return snapshot
+
+    def side_events(self, side, before, switched):
+        engine_side = self.side(side)
+        active = engine_side.active
+        was = before[side]
+        events = []
+        if active.id != was['active'] and not switched:
+            events.append(('drag', side, active))
+
+        hp = was['hp'][active.id]
+        if active.hp < hp:
+            events.append(('-damage', side, active))
+        elif active.hp > hp:
+            events.append(('-heal', side, active))
+
+        if active.hp > 0:
+            status = was['status'][active.id]
+            if active.status != status:
+                if status is not None:
+                    events.append(('-curestatus', side, active, status))
+                if active.status is not None:
+                    events.append(('-status', side, active, active.status))
+
+            if active.id == was['active']:
+                for attribute, name in BOOSTS:
+                    change = getattr(active, attribute) - was['boosts'][name]
+                    if change > 0:
+                        events.append(('-boost', side, active, name, change))
+                    elif change < 0:
+                        events.append(('-unboost', side, active, name, -change))
+        elif hp > 0:
+            events.append(('faint', side, active))
+
+        for side_condition, count in was['side_conditions'].items():
+            new_count = engine_side.side_conditions[side_condition]
+            if new_count == 0 and count > 0:
+                events.append(('-sideend', side, side_condition))
+            for _ in range(new_count - count):
+                events.append(('-sidestart', side, side_condition))
+
+        return events
+
+    def field_events(self, before):
+        events = []
+        if self.state.weather != before['weather']:
+            events.append("|-weather|{}".format(self.state.weather or "none"))
+        if self.state.field != before['field']:
+            if before['field']:
+                events.append("|-fieldend|move: {}".format(before['field']))
+            if self.state.field:
+                events.append("|-fieldstart|move: {}".format(self.state.field))
+        if self.state.trick_room != before['trick_room']:
+            events.append("|-field{}|move: Trick Room".format("start" if self.state.trick_room else "end"))
+        return events
+
+    def turn_events(self, before, choices, first):
+        order = (first, OTHER_SIDE[first])
+        events = []
+        for side in order:
+            if choices[side].is_switch:
+                events.append(('switch', side, self.pokemon(side, choices[side].id)))
+
+        shown = set()
+        for side in order:
+            choice = choices[side]
+            if choice.is_switch or choice.id == constants.DO_NOTHING_MOVE:
+                continue
+
+            # a pokemon that fainted before it could move does not use its move
+            attacker = self.pokemon(side, before[side]['active'])
+            if attacker.hp <= 0 and side != first:
+                continue
+
+            target = OTHER_SIDE[side]
+            events.append(('move', side, attacker.id, choice.id, target, before[target]['active']))
+            if target not in shown:
+                events.extend(self.side_events(target, before, choices[target].is_switch))
+                shown.add(target)
+
+        for side in order:
+            if side not in shown:
+                events.extend(self.side_events(side, before, choices[side].is_switch))
+
+        events.extend(self.field_events(before))
+        return events
+
+    def update_team_order(self):
+        # the pokemon that switches in swaps places with the first pokemon in the request
+        for side in SIDES:
+            order = self.team_order[side]
+            index = order.index(self.side(side).active.id)
+            order[0], order[index] = order[index], order[0]
+
+    def parse_choice(self, side, choice, options):
+        words = choice_text(choice).split()
+        if len(words) >= 2 and words[0] == constants.SWITCH_STRING:
+            pokemon_id, is_switch = self.team_order[side][int(words[1]) - 1], True
+        elif len(words) >= 2 and words[0] == 'move':
+            pokemon_id, is_switch = words[1], False
+        else:
+            pokemon_id, is_switch = None, False
+
+        for option in options:
+            if option.id == pokemon_id and option.is_switch == is_switch:
+                return option
+
+        self.server.metrics.invalid_choices += 1
+        return options[0]
+
+    async def collect_choices(self, options):
+        # returns the choices of both players, or None if a player forfeited
+        choices = {}
+        waiting = []
+        for side in SIDES:
+            if options[side][0].id == constants.DO_NOTHING_MOVE:
+                choices[side] = options[side][0]
+            elif self.players[side].connection is None:
+                choices[side] = self.rng.choice(options[side])
+            else:
+                waiting.append(side)
+
+        received = await asyncio.gather(*(self.wait_for_choice(side) for side in waiting))
+        for side, choice in zip(waiting, received):
+            if choice is None:
+                await self.finish(self.players[OTHER_SIDE[side]], "|-message|{} forfeited.".format(self.players[side].name))
+                return None
+            choices[side] = self.parse_choice(side, choice, options[side])
+
+        return choices
+
+    async def finish(self, winner, *lines):
+        result = "|win|{}".format(winner.name) if winner is not None else "|tie"
+        await self.send_events(list(lines) + [result])
+        self.finished = True
+
+    async def send_requests(self, options):
+        for side in SIDES:
+            if self.players[side].connection is not None:
+                await self.send(side, ["|request|{}".format(json.dumps(self.request(side, options[side])))])
+
+    async def start(self):
+        names = [self.players[side].name for side in SIDES]
+        for side in SIDES:
+            await self.send(side, [
+                "|init|battle",
+                "|title|{} vs. {}".format(*names),
+                "|j|☆{}".format(self.players[side].name)
+            ])
+
+        options = self.options()
+        await self.send_requests(options)
+
+        generation = self.format[3] if self.format.startswith("gen") else ""
+        events = [
+            "|",
+            "|t:|{}".format(int(time.time())),
+            "|gametype|singles",
+            "|player|p1|{}|1|".format(names[0]),
+            "|player|p2|{}|1|".format(names[1]),
+            "|teamsize|p1|{}".format(TEAM_SIZE),
+            "|teamsize|p2|{}".format(TEAM_SIZE),
+            "|gen|{}".format(generation),
+            "|tier|{}".format(self.format),
+            "|",
+            constants.START_STRING,
+        ]
+        for side in SIDES:
+            events.append(('switch', side, self.side(side).active))
+        self.turn = 1
+        events.append("|turn|1")
+        await self.send_events(events)
+        return options
+
+    async def play_turn(self, options):
+        # returns the options for the next turn
+        choices = await self.collect_choices(options)
+        if choices is None:
+            return None
+
+        first = 'p1' if user_moves_first(self.state, lookup_move(choices['p1']), lookup_move(choices['p2'])) else 'p2'
+        before = self.snapshot()
+        outcomes = get_all_state_instructions(self.mutator, choices['p1'], choices['p2'])
+        outcome = self.rng.choices(outcomes, weights=[o.percentage for o in outcomes])[0]
+        self.mutator.apply(outcome.instructions)
+        self.update_team_order()
+
+        events = self.turn_events(before, choices, first)
+        winner = self.state.battle_is_finished()
+        if winner:
+            await self.finish(self.players['p1' if winner == 1 else 'p2'], *events)
+            return None
+        if self.turn >= MAX_TURNS:
+            await self.finish(None, *events)
+            return None
+
+        options = self.options()
+        await self.send_requests(options)
+
+        # the turn only ends once every fainted pokemon has been replaced
+        if any(c.id != constants.DO_NOTHING_MOVE and not c.is_switch for c in choices.values()):
+            events.append("|upkeep")
+        if all(self.side(side).active.hp > 0 for side in SIDES):
+            self.turn += 1
+            self.server.metrics.turns += 1
+            events.append("|turn|{}".format(self.turn))
+        await self.send_events(events)
+        return options
+
+    async def run(self):
+        options = await self.start()
+        while options is not None:
+            options = await self.play_turn(options)
+
+
+class RecordedBattle(LocalBattle):
+    def __init__(self, server, battle_tag, player, transcript):
+        side = transcript['side']
+        opponent = Player(transcript['opponent'])
+        super().__init__(server, battle_tag, transcript['format'], {side: player, OTHER_SIDE[side]: opponent})
+        self.side = side
+        self.recording = transcript
+
+    async def run(self):
+        player = self.players[self.side]
+        for event in self.recording['events']:
+            if 'send' in event:
+                frame = rename(
+                    event['send'],
+                    self.recording['battle_tag'],
+                    self.battle_tag,
+                    self.recording['player'],
+                    player.name
+                )
+                await self.send_frame(self.side, frame)
+                if "|turn|" in frame:
+                    self.server.metrics.turns += 1
+                continue
+
+            choice = await self.wait_for_choice(self.side)
+            if choice is None:
+                await self.send(self.side, ["|win|{}".format(self.recording['opponent'])])
+                break
+
+            self.server.metrics.recorded_choices += 1
+            if choice_text(choice) == choice_text(event['choice']):
+                self.server.metrics.recorded_choices_matched += 1
+
+        self.finished = True
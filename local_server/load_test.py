@@ -0,0 +1,139 @@
+"""
+Plays many concurrent battles against the local server and reports its metrics
+
+    python -m local_server.load_test --bots 16 --battles 2
+
+The server runs in its own process so that it does not compete with the bots for the GIL.
+Every bot plays `--battles` battles in a row, so `--bots` is the number of battles at the same time.
+The results are the server's metrics (messages/sec, choice latency, timeouts) as JSON
+"""
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import websockets
+
+from config import ShowdownConfig
+from data.mods.apply_mods import apply_mods
+from showdown.run_battle import pokemon_battle
+from showdown.websocket_client import PSWebsocketClient
+
+from .run import add_server_arguments
+from .run import server_arguments
+
+
+STARTUP_SECONDS = 30
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_server(address):
+    deadline = time.perf_counter() + STARTUP_SECONDS
+    while True:
+        try:
+            websocket = await websockets.connect("ws://{}/showdown/websocket".format(address))
+            return websocket
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def get_metrics(websocket):
+    await websocket.send("|/metrics")
+    while True:
+        message = await websocket.recv()
+        if message.startswith("|metrics|"):
+            return json.loads(message.split("|", 2)[2])
+
+
+async def run_bot(name, address, login_uri, battle_format, battles):
+    ps_websocket_client = await PSWebsocketClient.create(name, None, address, login_uri)
+    await ps_websocket_client.login()
+
+    wins = 0
+    for _ in range(battles):
+        await ps_websocket_client.search_for_match(battle_format, None)
+        winner = await pokemon_battle(ps_websocket_client, battle_format)
+        if winner == name:
+            wins += 1
+
+    await ps_websocket_client.websocket.close()
+    return wins
+
+
+async def load_test(args, address, login_uri):
+    websocket = await wait_for_server(address)
+    start_time = time.perf_counter()
+    wins = await asyncio.gather(*(
+        run_bot("bot{}".format(i), address, login_uri, args.format, args.battles) for i in range(args.bots)
+    ))
+    seconds = time.perf_counter() - start_time
+
+    metrics = await get_metrics(websocket)
+    await websocket.close()
+    return {
+        'bots': args.bots,
+        'battles': args.bots * args.battles,
+        'wins': sum(wins),
+        'seconds': round(seconds, 6),
+        'server': metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the bot against the local server")
+    parser.add_argument("--bots", type=int, default=4, help="the number of bots that connect at the same time")
+    parser.add_argument("--battles", type=int, default=1, help="the number of battles that each bot plays")
+    parser.add_argument("--bot", default="most_damage", help="the battle bot that makes the decisions")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    apply_mods(args.format)
+    ShowdownConfig.battle_bot_module = args.bot
+    ShowdownConfig.pokemon_mode = args.format
+    ShowdownConfig.damage_calc_type = "average"
+    ShowdownConfig.save_replay = False
+    ShowdownConfig.slow_decision_seconds = None
+    ShowdownConfig.eliminate_dominated = False
+    ShowdownConfig.search_stats = False
+
+    port, login_port = free_port(), free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "local_server.run",
+            "--port", str(port),
+            "--login-port", str(login_port),
+        ] + server_arguments(args),
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        results = asyncio.get_event_loop().run_until_complete(load_test(
+            args,
+            "localhost:{}".format(port),
+            "http://localhost:{}/action.php".format(login_port)
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Runs the local stand-in for the Pokemon Showdown server until it is interrupted
+
+    python -m local_server.run --port 8000 --login-port 8001
+
+Bots connect to it with WEBSOCKET_URI=localhost:8000 and LOGIN_URI=http://localhost:8001/action.php.
+The server's metrics are printed as JSON when it stops
+"""
+import sys
+import json
+import asyncio
+import argparse
+
+from config import ShowdownConfig
+from data.mods.apply_mods import apply_mods
+
+from .server import LocalServer
+from .server import DEFAULT_CHOICE_TIMEOUT
+from .server import load_transcript
+
+
+DEFAULT_FORMAT = "gen9randombattle"
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--format", default=DEFAULT_FORMAT, help="the format whose data mods are applied")
+    parser.add_argument("--choice-timeout", type=float, default=DEFAULT_CHOICE_TIMEOUT, help="seconds before a player that has not chosen loses")
+    parser.add_argument("--frame-delay", type=float, default=0, help="seconds to wait before sending each message")
+    parser.add_argument("--login-delay", type=float, default=0, help="seconds that the login server waits before answering")
+    parser.add_argument("--transcript", action="append", default=[], help="play this recorded battle instead of the engine")
+    parser.add_argument("--record-dir", help="save a transcript of every engine battle to this directory")
+    parser.add_argument("--seed", type=int, help="the seed for the teams and the server's choices")
+
+
+def server_arguments(args):
+    # the command line arguments that start a server with the same settings as `args`
+    argv = [
+        "--format", args.format,
+        "--choice-timeout", str(args.choice_timeout),
+        "--frame-delay", str(args.frame_delay),
+        "--login-delay", str(args.login_delay),
+    ]
+    for path in args.transcript:
+        argv.extend(["--transcript", path])
+    if args.record_dir:
+        argv.extend(["--record-dir", args.record_dir])
+    if args.seed is not None:
+        argv.extend(["--seed", str(args.seed)])
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Pokemon Showdown server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--login-port", type=int, default=8001)
+    parser.add_argument("--pair-searches", action="store_true", help="pair players that search instead of playing them")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    apply_mods(args.format)
+    ShowdownConfig.damage_calc_type = "average"
+    server = LocalServer(
+        host=args.host,
+        port=args.port,
+        login_port=args.login_port,
+        choice_timeout=args.choice_timeout,
+        frame_delay=args.frame_delay,
+        login_delay=args.login_delay,
+        transcripts=[load_transcript(path) for path in args.transcript],
+        record_dir=args.record_dir,
+        pair_searches=args.pair_searches,
+        seed=args.seed
+    )
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+    json.dump(server.metrics.summary(), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+A local stand-in for the Pokemon Showdown server
+
+It speaks the part of the protocol that the bot uses: the challstr and login, `/search`, `/challenge` and
+`/accept`, battle requests and messages, choices, and `/leave`. Logging in is checked against a stub of the
+login server's `action.php` which accepts any name and password.
+
+Searching starts a battle against the server's own player unless `pair_searches` is set,
+in which case two connections searching for the same format play each other
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import websockets
+
+from .battles import Player
+from .battles import EngineBattle
+from .battles import RecordedBattle
+
+
+logger = logging.getLogger(__name__)
+
+
+HOUSE_PLAYER = "house"
+DEFAULT_CHOICE_TIMEOUT = 150
+
+
+class ServerMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.start_time = time.perf_counter()
+        self.connections = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.bytes_sent = 0
+        self.battles_started = 0
+        self.battles_finished = 0
+        self.turns = 0
+        self.choice_seconds = []
+        self.timeouts = 0
+        self.invalid_choices = 0
+        self.recorded_choices = 0
+        self.recorded_choices_matched = 0
+
+    def record_choice(self, seconds):
+        # the time from sending the message that needed a choice to receiving the choice
+        self.choice_seconds.append(seconds)
+
+    def summary(self):
+        seconds = time.perf_counter() - self.start_time
+        choice_seconds = sorted(self.choice_seconds)
+
+        def percentile(p):
+            if not choice_seconds:
+                return 0
+            return round(choice_seconds[min(len(choice_seconds) - 1, int(p * len(choice_seconds)))], 6)
+
+        return {
+            'seconds': round(seconds, 6),
+            'connections': self.connections,
+            'messages_sent': self.messages_sent,
+            'messages_received': self.messages_received,
+            'messages_per_second': round((self.messages_sent + self.messages_received) / seconds, 1),
+            'bytes_sent': self.bytes_sent,
+            'battles_started': self.battles_started,
+            'battles_finished': self.battles_finished,
+            'turns': self.turns,
+            'choices': len(choice_seconds),
+            'choice_seconds': {
+                'mean': round(sum(choice_seconds) / len(choice_seconds), 6) if choice_seconds else 0,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': percentile(1),
+            },
+            'timeouts': self.timeouts,
+            'invalid_choices': self.invalid_choices,
+            'recorded_choices': self.recorded_choices,
+            'recorded_choices_matched': self.recorded_choices_matched,
+        }
+
+
+class LoginHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests that `PSWebsocketClient.login` makes to `action.php`
+    It runs in its own thread so that a client that logs in with a blocking request does not block the server
+    The server's `delay` is how long it waits before answering, like a slow login server
+    """
+    def do_POST(self):
+        time.sleep(self.server.delay)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        form = {k: v[0] for k, v in parse_qs(body).items()}
+        assertion = "local-assertion-{}".format(form.get('name') or form.get('userid'))
+        if form.get('act') == 'login':
+            response = "]" + json.dumps({'actionsuccess': True, 'assertion': assertion})
+        else:
+            response = assertion
+
+        encoded = response.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+class Connection:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.name = None
+
+
+class LocalServer:
+    def __init__(
+        self,
+        host="localhost",
+        port=8000,
+        login_port=8001,
+        choice_timeout=DEFAULT_CHOICE_TIMEOUT,
+        frame_delay=0,
+        login_delay=0,
+        transcripts=(),
+        record_dir=None,
+        pair_searches=False,
+        seed=None
+    ):
+        self.host = host
+        self.port = port
+        self.login_port = login_port
+        self.choice_timeout = choice_timeout
+        self.frame_delay = frame_delay
+        self.login_delay = login_delay
+        self.record_dir = record_dir
+        self.pair_searches = pair_searches
+        self.rng = random.Random(seed)
+        self.metrics = ServerMetrics()
+
+        # recorded battles are played in turn for each format
+        self.transcripts = dict()
+        for transcript in transcripts:
+            self.transcripts.setdefault(transcript['format'], []).append(transcript)
+
+        self.connections = dict()
+        self.battles = dict()
+        self.challenges = dict()
+        self.searching = dict()
+        self.battle_count = 0
+        self._tasks = set()
+        self._websocket_server = None
+        self._login_server = None
+
+        self.commands = {
+            '/trn': self.login,
+            '/search': self.search,
+            '/challenge': self.challenge,
+            '/accept': self.accept,
+            '/leave': self.leave,
+            '/metrics': self.send_metrics,
+        }
+
+    @property
+    def address(self):
+        # the value for WEBSOCKET_URI
+        return "{}:{}".format(self.host, self.port)
+
+    @property
+    def login_uri(self):
+        return "http://{}:{}/action.php".format(self.host, self.login_port)
+
+    async def start(self):
+        self._login_server = ThreadingHTTPServer((self.host, self.login_port), LoginHandler)
+        self._login_server.delay = self.login_delay
+        self.login_port = self._login_server.server_address[1]
+        threading.Thread(target=self._login_server.serve_forever, daemon=True).start()
+
+        self._websocket_server = await websockets.serve(self.handler, self.host, self.port)
+        self.port = self._websocket_server.sockets[0].getsockname()[1]
+        self.metrics.reset()
+        logger.info("Local server listening on {} with logins on {}".format(self.address, self.login_uri))
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self._websocket_server.close()
+        await self._websocket_server.wait_closed()
+        self._login_server.shutdown()
+        self._login_server.server_close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def send(self, connection, message):
+        if self.frame_delay:
+            await asyncio.sleep(self.frame_delay)
+        try:
+            await connection.websocket.send(message)
+        except websockets.ConnectionClosed:
+            return
+        self.metrics.messages_sent += 1
+        self.metrics.bytes_sent += len(message)
+
+    async def handler(self, websocket):
+        connection = Connection(websocket)
+        self.metrics.connections += 1
+        await self.send(connection, "|challstr|4|{:032x}".format(self.rng.getrandbits(128)))
+        try:
+            async for message in websocket:
+                await self.receive(connection, message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.disconnect(connection)
+
+    def disconnect(self, connection):
+        if self.connections.get(connection.name) is connection:
+            del self.connections[connection.name]
+        for waiting in self.searching.values():
+            if connection in waiting:
+                waiting.remove(connection)
+        for battle in self.battles.values():
+            battle.forfeit(connection.name)
+
+    async def receive(self, connection, message):
+        self.metrics.messages_received += 1
+        room, _, text = message.partition('|')
+        if room:
+            # choices are the only battle messages that are answered. Chat and the timer are ignored
+            battle = self.battles.get(room)
+            if battle is not None and text.startswith(('/choose', '/switch', '/move', '/team')):
+                battle.receive_choice(connection.name, text)
+            return
+
+        command, _, argument = text.partition(' ')
+        function_to_call = self.commands.get(command)
+        if function_to_call is not None:
+            await function_to_call(connection, argument.strip())
+
+    async def login(self, connection, argument):
+        name = argument.split(',')[0].strip()
+        connection.name = name
+        self.connections[name] = connection
+        await self.send(connection, "|updateuser| {}|1|1|{{}}".format(name))
+
+    async def search(self, connection, battle_format):
+        if battle_format in self.transcripts:
+            transcripts = self.transcripts[battle_format]
+            transcript = transcripts[self.battle_count % len(transcripts)]
+            battle = RecordedBattle(self, self.next_battle_tag(battle_format), Player(connection.name, connection), transcript)
+            self.start_battle(battle)
+            return
+
+        if not self.pair_searches:
+            await self.start_engine_battle(battle_format, connection, None)
+            return
+
+        waiting = self.searching.setdefault(battle_format, [])
+        if waiting and waiting[0] is not connection:
+            await self.start_engine_battle(battle_format, waiting.pop(0), connection)
+        elif connection not in waiting:
+            waiting.append(connection)
+
+    async def challenge(self, connection, argument):
+        name, _, battle_format = argument.partition(',')
+        name, battle_format = name.strip(), battle_format.strip()
+        challenged = self.connections.get(name)
+        if challenged is None:
+            await self.send(connection, "|popup|The user '{}' was not found.".format(name))
+            return
+
+        self.challenges[(connection.name, name)] = battle_format
+        await self.send(
+            challenged,
+            "|pm| {}| {}|/challenge {}|{}|||".format(connection.name, name, battle_format, battle_format)
+        )
+
+    async def accept(self, connection, name):
+        battle_format = self.challenges.pop((name, connection.name), None)
+        challenger = self.connections.get(name)
+        if battle_format is None or challenger is None:
+            await self.send(connection, "|popup|{} is not challenging you.".format(name))
+            return
+
+        await self.start_engine_battle(battle_format, challenger, connection)
+
+    async def leave(self, connection, battle_tag):
+        battle = self.battles.get(battle_tag)
+        if battle is not None:
+            battle.forfeit(connection.name)
+        await self.send(connection, ">{}\n|deinit".format(battle_tag))
+
+    async def send_metrics(self, connection, _):
+        await self.send(connection, "|metrics|{}".format(json.dumps(self.metrics.summary())))
+
+    def next_battle_tag(self, battle_format):
+        self.battle_count += 1
+        return "battle-{}-{}".format(battle_format, self.battle_count)
+
+    async def start_engine_battle(self, battle_format, first, second):
+        # `second` is None for a battle against the server's own player
+        if "random" not in battle_format:
+            for connection in (first, second):
+                if connection is not None:
+                    await self.send(connection, "|popup|The local server only plays random battles.")
+            return
+
+        players = {
+            'p1': Player(first.name, first),
+            'p2': Player(second.name, second) if second is not None else Player(HOUSE_PLAYER),
+        }
+        self.start_battle(EngineBattle(self, self.next_battle_tag(battle_format), battle_format, players, self.rng))
+
+    def start_battle(self, battle):
+        self.battles[battle.battle_tag] = battle
+        self.metrics.battles_started += 1
+        task = asyncio.ensure_future(self.run_battle(battle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run_battle(self, battle):
+        try:
+            await battle.run()
+        except Exception:
+            # the players are told that the battle is over so that they do not wait for it forever
+            logger.exception("Battle {} failed".format(battle.battle_tag))
+            await battle.abort()
+            raise
+        finally:
+            del self.battles[battle.battle_tag]
+
+        self.metrics.battles_finished += 1
+        if self.record_dir is not None and isinstance(battle, EngineBattle):
+            self.save_transcripts(battle)
+
+    def save_transcripts(self, battle):
+        os.makedirs(self.record_dir, exist_ok=True)
+        for side in battle.transcripts:
+            path = os.path.join(self.record_dir, "{}-{}.json".format(battle.battle_tag, side))
+            with open(path, 'w') as f:
+                json.dump(battle.transcript(side), f)
+
+
+def load_transcript(path):
+    with open(path) as f:
+        return json.load(f)
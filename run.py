@@ -6,10 +6,12 @@ from datetime import datetime
 from copy import deepcopy
 
 import constants
-from config import ShowdownConfig, init_logging
+from config import ShowdownConfig, init_logging, stop_logging
 
 from teams import load_team
 from showdown.run_battle import pokemon_battle
+from showdown.search_workers import start_search_workers
+from showdown.battle_bots.nash_equilibrium.equilibrium_cache import equilibrium_cache
 from showdown.websocket_client import PSWebsocketClient
 
 from data import all_move_json
@@ -46,17 +48,27 @@ async def showdown():
     ShowdownConfig.configure()
     init_logging(
         ShowdownConfig.log_level,
-        ShowdownConfig.log_to_file
+        ShowdownConfig.log_to_file,
+        ShowdownConfig.log_queue_size,
+        ShowdownConfig.log_message_sampling
     )
     apply_mods(ShowdownConfig.pokemon_mode)
 
     original_pokedex = deepcopy(pokedex)
     original_move_json = deepcopy(all_move_json)
 
+    if ShowdownConfig.equilibrium_cache_file:
+        equilibrium_cache.load(ShowdownConfig.equilibrium_cache_file)
+
+    # the workers are forked once all of the data is loaded and modded so that they share it
+    if ShowdownConfig.search_processes > 1:
+        start_search_workers(ShowdownConfig.search_processes)
+
     ps_websocket_client = await PSWebsocketClient.create(
         ShowdownConfig.username,
         ShowdownConfig.password,
-        ShowdownConfig.websocket_uri
+        ShowdownConfig.websocket_uri,
+        ShowdownConfig.login_uri
     )
     await ps_websocket_client.login()
 
@@ -93,6 +105,10 @@ async def showdown():
         logger.info("W: {}\tL: {}".format(wins, losses))
         check_dictionaries_are_unmodified(original_pokedex, original_move_json)
 
+        if ShowdownConfig.equilibrium_cache_file:
+            equilibrium_cache.save(ShowdownConfig.equilibrium_cache_file)
+            logger.info("Equilibrium cache: {}".format(equilibrium_cache.info()))
+
         battles_run += 1
         if battles_run >= ShowdownConfig.run_count:
             break
@@ -104,3 +120,5 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(traceback.format_exc())
         raise
+    finally:
+        stop_logging()
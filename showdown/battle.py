@@ -1,4 +1,5 @@
 import itertools
+import math
 from collections import defaultdict
 from collections import namedtuple
 from copy import copy
@@ -81,6 +82,9 @@ class Battle(ABC):
 
         self.request_json = None
 
+        # how likely this battle is relative to the others returned by `prepare_battles`
+        self.prior_weight = 1
+
     def initialize_team_preview(self, user_json, opponent_pokemon, battle_type):
         self.user.from_json(user_json, first_turn=True)
         self.user.reserve.insert(0, self.user.active)
@@ -173,6 +177,13 @@ class Battle(ABC):
 
         combinations = list(itertools.product(spreads, items, abilities, chance_move_combinations))
 
+        # a battle's prior weight is the product of how often its spread, item, ability and chance moves are used
+        # unknowns that are not in the sets (e.g. an unknown item) do not change the weight
+        spread_weights = {tuple(s[:2]): s[2] for s in possible_spreads}
+        item_weights = dict(possible_items)
+        ability_weights = dict(possible_abilities)
+        move_weights = dict(possible_moves)
+
         # create battle clones for each of the combinations
         battles = list()
         for c in combinations:
@@ -189,12 +200,18 @@ class Battle(ABC):
                     new_battle.opponent.active.stats = battle_copy.opponent.active.stats
                 new_battle.opponent.active.item = c[1]
                 new_battle.opponent.active.ability = c[2]
+                new_battle.prior_weight = (
+                    spread_weights.get(tuple(c[0][:2]), 1) *
+                    item_weights.get(c[1], 1) *
+                    ability_weights.get(c[2], 1) *
+                    math.prod(move_weights.get(m, 1) for m in c[3])
+                )
                 for m in expected_moves:
                     new_battle.opponent.active.add_move(m)
                 for m in c[3]:
                     new_battle.opponent.active.add_move(m)
 
-                logger.debug("Possible set for opponent's {}:\t{} {} {} {} {}".format(battle_copy.opponent.active.name, c[0][0], c[0][1], c[1], c[2], all_moves))
+                logger.debug("Possible set for opponent's %s:\t%s %s %s %s %s", battle_copy.opponent.active.name, c[0][0], c[0][1], c[1], c[2], all_moves)
                 battles.append(new_battle)
 
             new_battle.opponent.lock_moves()
@@ -3,9 +3,20 @@ import logging
 import config
 import constants
 
-from showdown.engine.objects import StateMutator
+from showdown.engine.damage_calculator import damage_cache
+from showdown.engine.objects import IncrementalStateMutator
 from showdown.engine.select_best_move import pick_safest
 from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import remove_dominated_options
+from showdown.engine.select_best_move import get_dominance_stats
+from showdown.engine.payoff_matrix import PayoffMatrix
+from showdown.engine.serialization import encode_state
+from showdown.engine.serialization import decode_state
+from showdown.engine.search_stats import get_decision_stats
+from showdown.engine.search_stats import measure_search
+from showdown.search_workers import search_worker_pool
+from showdown.slow_decisions import record_search
+from showdown.event_log import TRACE
 
 
 logger = logging.getLogger(__name__)
@@ -44,31 +55,78 @@ def format_decision(battle, decision):
     return [message, str(battle.rqid)]
 
 
-def prefix_opponent_move(score_lookup, prefix):
-    new_score_lookup = dict()
-    for k, v in score_lookup.items():
-        bot_move, opponent_move = k
-        new_opponent_move = "{}_{}".format(opponent_move, prefix)
-        new_score_lookup[(bot_move, new_opponent_move)] = v
+def search_state(state, user_options, opponent_options, depth, prune, eliminate_dominated, measure):
+    # returns the payoff matrix and, if `measure` is True, the summary of the search's stats
+    mutator = IncrementalStateMutator(state)
+    if logger.isEnabledFor(TRACE):
+        logger.log(TRACE, "Searching through the state: %s", mutator.state)
+    dominance_stats = get_dominance_stats()
+    dominance_stats.reset()
+    with measure_search(measure) as stats:
+        if eliminate_dominated and depth > 1:
+            # each battle is one of the sets that the opponent may have
+            # the bot's options are kept because one that is dominated in this battle may not be in the others
+            user_options, opponent_options = remove_dominated_options(
+                mutator,
+                user_options,
+                opponent_options,
+                remove_user_options=False
+            )
+        payoff_matrix = get_payoff_matrix(
+            mutator,
+            user_options,
+            opponent_options,
+            depth=depth,
+            prune=prune,
+            eliminate_dominated=eliminate_dominated
+        )
+    if eliminate_dominated:
+        logger.debug("Dominated options removed: {}".format(dominance_stats.info()))
+    return payoff_matrix, stats.summary() if measure else None
+
+
+def search_encoded_state(state_data, *search_args):
+    # the search workers are sent the state's compact encoding, which is much smaller than the pickled objects
+    return search_state(decode_state(state_data), *search_args)
+
+
+def search_battles(battles, depth=2, prune=True, eliminate_dominated=False):
+    # the battles are searched by the search workers if they have been started
+    # `eliminate_dominated` is a heuristic: options that are dominated after one turn are not searched deeper
+    decision_stats = get_decision_stats()
+    in_workers = search_worker_pool.started
+    searches = []
+    for b in battles:
+        state = b.create_state()
+        user_options, opponent_options = b.get_all_options()
+        record_search(state, user_options, opponent_options, depth)
+        if in_workers:
+            state = encode_state(state)
+        searches.append(
+            (state, user_options, opponent_options, depth, prune, eliminate_dominated, decision_stats.enabled)
+        )
 
-    return new_score_lookup
+    search = search_encoded_state if in_workers else search_state
+    payoff_matrices = []
+    for payoff_matrix, summary in search_worker_pool.map(search, searches):
+        payoff_matrices.append(payoff_matrix)
+        if summary is not None:
+            decision_stats.merge(summary)
 
+    return payoff_matrices
 
-def pick_safest_move_from_battles(battles):
-    all_scores = dict()
-    for i, b in enumerate(battles):
-        state = b.create_state()
-        mutator = StateMutator(state)
-        user_options, opponent_options = b.get_all_options()
-        logger.debug("Searching through the state: {}".format(mutator.state))
-        scores = get_payoff_matrix(mutator, user_options, opponent_options, prune=True)
 
-        prefixed_scores = prefix_opponent_move(scores, str(i))
-        all_scores = {**all_scores, **prefixed_scores}
+def pick_safest_move_from_battles(battles):
+    # the opponent's options in each battle are separate columns of one matrix
+    payoff_matrix = PayoffMatrix.concatenate(
+        search_battles(battles, prune=True, eliminate_dominated=config.ShowdownConfig.eliminate_dominated)
+    )
 
-    decision, payoff = pick_safest(all_scores, remove_guaranteed=True)
+    with get_decision_stats().timer('solving'):
+        decision, payoff = pick_safest(payoff_matrix, remove_guaranteed=True)
     bot_choice = decision[0]
     logger.debug("Safest: {}, {}".format(bot_choice, payoff))
+    logger.debug("Damage cache: {}".format(damage_cache.info()))
     return bot_choice
 
 
@@ -80,27 +138,26 @@ def pick_safest_move_using_dynamic_search_depth(battles):
     Using a pypy interpreter will also result in better performance.
 
     """
-    all_scores = dict()
     num_battles = len(battles)
+    decision_stats = get_decision_stats()
 
     if num_battles > 1:
         search_depth = 2
-
-        for i, b in enumerate(battles):
-            state = b.create_state()
-            mutator = StateMutator(state)
-            user_options, opponent_options = b.get_all_options()
-            logger.debug("Searching through the state: {}".format(mutator.state))
-            scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=True)
-            prefixed_scores = prefix_opponent_move(scores, str(i))
-            all_scores = {**all_scores, **prefixed_scores}
+        payoff_matrix = PayoffMatrix.concatenate(
+            search_battles(
+                battles,
+                depth=search_depth,
+                prune=True,
+                eliminate_dominated=config.ShowdownConfig.eliminate_dominated
+            )
+        )
 
     elif num_battles == 1:
         search_depth = 3
 
         b = battles[0]
         state = b.create_state()
-        mutator = StateMutator(state)
+        mutator = IncrementalStateMutator(state)
         user_options, opponent_options = b.get_all_options()
 
         num_user_options = len(user_options)
@@ -109,19 +166,40 @@ def pick_safest_move_using_dynamic_search_depth(battles):
         if options_product < 20 and num_user_options > 1 and num_opponent_options > 1:
             logger.debug("Low options product, looking an additional depth")
             search_depth += 1
-
-        logger.debug("Searching through the state: {}".format(mutator.state))
-        logger.debug("Options Product: {}".format(options_product))
-        logger.debug("My Options: {}".format(user_options))
-        logger.debug("Opponent Options: {}".format(opponent_options))
-        logger.debug("Search depth: {}".format(search_depth))
-        all_scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=True)
+        record_search(state, user_options, opponent_options, search_depth)
+
+        if logger.isEnabledFor(TRACE):
+            logger.log(TRACE, "Searching through the state: %s", mutator.state)
+            logger.log(TRACE, "My Options: %s", user_options)
+            logger.log(TRACE, "Opponent Options: %s", opponent_options)
+        logger.debug("Options Product: %s", options_product)
+        logger.debug("Search depth: %s", search_depth)
+        eliminate_dominated = config.ShowdownConfig.eliminate_dominated
+        dominance_stats = get_dominance_stats()
+        dominance_stats.reset()
+        with measure_search(decision_stats.enabled) as stats:
+            if eliminate_dominated:
+                user_options, opponent_options = remove_dominated_options(mutator, user_options, opponent_options)
+            payoff_matrix = get_payoff_matrix(
+                mutator,
+                user_options,
+                opponent_options,
+                depth=search_depth,
+                prune=True,
+                eliminate_dominated=eliminate_dominated
+            )
+        if decision_stats.enabled:
+            decision_stats.merge(stats.summary())
+        if eliminate_dominated:
+            logger.debug("Dominated options removed: {}".format(dominance_stats.info()))
 
     else:
         raise ValueError("less than 1 battle?: {}".format(battles))
 
-    decision, payoff = pick_safest(all_scores, remove_guaranteed=True)
+    with decision_stats.timer('solving'):
+        decision, payoff = pick_safest(payoff_matrix, remove_guaranteed=True)
     bot_choice = decision[0]
     logger.debug("Safest: {}, {}".format(bot_choice, payoff))
     logger.debug("Depth: {}".format(search_depth))
+    logger.debug("Damage cache: {}".format(damage_cache.info()))
     return bot_choice
@@ -1,8 +1,9 @@
+import numpy as np
+
 import constants
-from data import all_move_json
 from showdown.battle import Battle
-from showdown.engine.damage_calculator import calculate_damage
-from showdown.engine.find_state_instructions import update_attacking_move
+from showdown.engine.damage_calculator import damage_matrix
+from showdown.engine.damage_calculator import get_attacking_move_and_conditions
 from ..helpers import format_decision
 
 
@@ -11,13 +12,12 @@ class BattleBot(Battle):
         super(BattleBot, self).__init__(*args, **kwargs)
 
     def find_best_move(self):
-        state = self.create_state()
         my_options = self.get_all_options()[0]
 
         moves = []
         switches = []
         for option in my_options:
-            if option.startswith(constants.SWITCH_STRING + " "):
+            if option.is_switch:
                 switches.append(option)
             else:
                 moves.append(option)
@@ -25,15 +25,30 @@ class BattleBot(Battle):
         if self.force_switch or not moves:
             return format_decision(self, switches[0])
 
-        most_damage = -1
-        choice = None
-        for move in moves:
-            damage_amounts = calculate_damage(state, constants.USER, move, constants.DO_NOTHING_MOVE)
-
-            damage = damage_amounts[0] if damage_amounts else 0
-
-            if damage > most_damage:
-                choice = move
-                most_damage = damage
+        # the damage is summed over the opponent's possible sets, weighted by how likely they are
+        # the sets that the moves are prepared the same way against are calculated together
+        groups = []
+        for battle in self.prepare_battles(join_moves_together=True):
+            state = battle.create_state()
+            attacking_moves = []
+            conditions = None
+            for move in moves:
+                _, _, attacking_move, conditions = get_attacking_move_and_conditions(state, constants.USER, move.id, constants.DO_NOTHING_MOVE)
+                attacking_moves.append(attacking_move)
+
+            for group in groups:
+                if group['moves'] == attacking_moves and group['conditions'] == conditions:
+                    break
+            else:
+                group = {'attacker': state.user.active, 'moves': attacking_moves, 'conditions': conditions, 'defenders': [], 'weights': []}
+                groups.append(group)
+            group['defenders'].append(state.opponent.active)
+            group['weights'].append(battle.prior_weight)
+
+        damage = np.zeros(len(moves))
+        for group in groups:
+            matrix = damage_matrix(group['attacker'], group['defenders'], group['moves'], group['conditions'])[:, :, 0]
+            damage += np.nan_to_num(matrix, nan=0) @ np.array(group['weights'], dtype=float)
+        choice = moves[int(np.argmax(damage))]
 
         return format_decision(self, choice)
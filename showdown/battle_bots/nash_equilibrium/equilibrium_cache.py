@@ -0,0 +1,185 @@
+import os
+import json
+import base64
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+EQUILIBRIUM_CACHE_SIZE = 10000
+
+# bumped whenever the key or the stored value changes so that old files are not used
+EQUILIBRIUM_CACHE_FILE_VERSION = 2
+
+# matrices are rounded to the nearest integer before they are compared, as is done for gambit
+PAYOFF_DECIMALS = 0
+PRIOR_DECIMALS = 3
+
+
+def _sorted_order(vectors):
+    # the order that sorts `vectors` by their sorted values, which does not depend on the order they were given in
+    # ties are kept in their original order
+    return sorted(range(len(vectors)), key=lambda i: (tuple(sorted(vectors[i])), tuple(vectors[i])))
+
+
+def canonical_form(matrices, priors):
+    """
+    Returns a key that is the same for games that only differ by the order of their rows and columns
+    along with the row order and each matrix's column order that were used to make it
+
+    Every matrix shares its rows (the bot's options) and has its own columns (one opponent type's options).
+    The key contains the re-ordered, rounded matrices so two games with the same key are the same game
+    """
+    rounded = [np.round(np.asarray(m, dtype=float), PAYOFF_DECIMALS) + 0.0 for m in matrices]
+
+    joined = np.hstack([np.sort(m, axis=1) for m in rounded])
+    row_order = _sorted_order(joined.tolist())
+
+    column_orders = []
+    key_matrices = []
+    for m in rounded:
+        m = m[row_order]
+        column_order = _sorted_order(m.T.tolist())
+        m = m[:, column_order]
+        column_orders.append(column_order)
+        key_matrices.append((m.shape, m.tobytes()))
+
+    priors = np.asarray(priors, dtype=float)
+    rounded_priors = tuple(np.round(priors / priors.sum(), PRIOR_DECIMALS).tolist())
+
+    return (rounded_priors, tuple(key_matrices)), row_order, column_orders
+
+
+def _game_to_json(key, value):
+    priors, key_matrices = key
+    return [
+        list(priors),
+        [[list(shape), base64.b64encode(data).decode('ascii')] for shape, data in key_matrices],
+        [list(value[0]), [list(c) for c in value[1]]]
+    ]
+
+
+def _game_from_json(game):
+    # raises an error if `game` is not the JSON of a solved game
+    priors, key_matrices, (row_strategy, column_strategies) = game
+    key = (
+        tuple(float(p) for p in priors),
+        tuple((tuple(int(d) for d in shape), base64.b64decode(data)) for shape, data in key_matrices)
+    )
+    value = (
+        tuple(float(p) for p in row_strategy),
+        tuple(tuple(float(p) for p in c) for c in column_strategies)
+    )
+    return key, value
+
+
+class EquilibriumCache:
+    """
+    LRU cache of solved games keyed by their `canonical_form`
+    The same games come up again from re-sent requests, forced switches and endgames that are common across battles
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def get(self, matrices, priors):
+        """
+        Returns the row strategy and a column strategy for each matrix, in the order that they were given in
+        or None if the game has not been solved
+        """
+        key, row_order, column_orders = canonical_form(matrices, priors)
+        try:
+            canonical_row_strategy, canonical_column_strategies = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._cache.move_to_end(key)
+        self.hits += 1
+
+        row_strategy = np.zeros(len(row_order))
+        row_strategy[row_order] = canonical_row_strategy
+        column_strategies = []
+        for column_order, canonical_column_strategy in zip(column_orders, canonical_column_strategies):
+            column_strategy = np.zeros(len(column_order))
+            column_strategy[column_order] = canonical_column_strategy
+            column_strategies.append(column_strategy)
+
+        return row_strategy, column_strategies
+
+    def put(self, matrices, priors, row_strategy, column_strategies):
+        key, row_order, column_orders = canonical_form(matrices, priors)
+        self._cache[key] = (
+            tuple(np.asarray(row_strategy)[row_order].tolist()),
+            tuple(
+                tuple(np.asarray(c)[column_order].tolist())
+                for c, column_order in zip(column_strategies, column_orders)
+            )
+        )
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0
+        return self.hits / lookups
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate(), 3),
+            'size': len(self._cache),
+            'maxsize': self.maxsize
+        }
+
+    def save(self, path):
+        # saved as JSON so that loading a file from somewhere else cannot run code, as unpickling could
+        # written to a temporary file first so that a crash while saving does not lose the previous file
+        temporary_path = "{}.tmp".format(path)
+        with open(temporary_path, 'w') as f:
+            json.dump(
+                {
+                    'version': EQUILIBRIUM_CACHE_FILE_VERSION,
+                    'games': [_game_to_json(key, value) for key, value in self._cache.items()]
+                },
+                f
+            )
+        os.replace(temporary_path, path)
+
+    def load(self, path):
+        # a file that cannot be read is logged and ignored so that the bot starts with an empty cache
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved['version'] != EQUILIBRIUM_CACHE_FILE_VERSION:
+                logger.warning("Ignoring equilibrium cache file {} with version {}".format(path, saved['version']))
+                return
+            games = [_game_from_json(game) for game in saved['games']]
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Could not load the equilibrium cache from {}: {!r}".format(path, e))
+            return
+
+        for key, value in games[-self.maxsize:]:
+            self._cache[key] = value
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        logger.info("Loaded {} solved games from {}".format(len(games), path))
+
+
+equilibrium_cache = EquilibriumCache(EQUILIBRIUM_CACHE_SIZE)
@@ -1,21 +1,25 @@
 import random
+import shutil
 import subprocess
 import logging
 from collections import defaultdict
+from collections import OrderedDict
 
 import numpy as np
-import pandas as pd
 from nashpy import Game
 
 import config
 from showdown.battle import Battle
-from showdown.engine.select_best_move import remove_guaranteed_opponent_moves
-from showdown.engine.objects import StateMutator
 from showdown.engine.select_best_move import pick_safest
-from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.payoff_matrix import PayoffMatrix
+from showdown.engine.payoff_matrix import dominated_rows
+from showdown.engine.payoff_matrix import dominated_columns
+from showdown.engine.search_stats import get_decision_stats
 
-from ..safest.main import pick_safest_move_from_battles
 from ..helpers import format_decision
+from ..helpers import search_battles
+from . import regret_matching
+from .equilibrium_cache import equilibrium_cache
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +31,16 @@ NFG_FORMAT_BASE = """NFG 1 R ""
 """
 
 
+# gambit enumerates every equilibrium which takes too long for large matrices
+# larger matrices are solved approximately by regret-matching within a fixed time
+MAX_GAMBIT_MATRIX_SIZE = 100
+
+# the last strategies found by regret-matching, keyed by the bot's options
+# they warm-start the solver when the same options come up again (usually on the next turn)
+PREVIOUS_STRATEGIES_SIZE = 256
+previous_strategies = OrderedDict()
+
+
 class CouldNotFindEquilibriumError(Exception):
     pass
 
@@ -49,8 +63,8 @@ def convert_from_list(my_list, num_rows):
     return [my_list[:num_rows], my_list[num_rows:]]
 
 
-def find_best_nash_equilibrium(equilibria, df):
-    game = Game(df)
+def find_best_nash_equilibrium(equilibria, matrix):
+    game = Game(matrix)
 
     score = float('-inf')
     best_eq = None
@@ -102,22 +116,138 @@ def find_all_equilibria(matrix):
     return np.array(equilibria, dtype=object)
 
 
-def find_nash_equilibrium(score_lookup):
-    modified_score_lookup = remove_guaranteed_opponent_moves(score_lookup)
-    if not modified_score_lookup:
-        modified_score_lookup = score_lookup
-
-    df = pd.Series(modified_score_lookup).unstack()
-
-    equilibria = find_all_equilibria(df)
-    best_eq, score = find_best_nash_equilibrium(equilibria, df)
-    bot_percentages = best_eq[0]
-    opponent_percentages = best_eq[1]
-
-    bot_choices = df.index
-    opponent_choices = df.columns
-
-    return bot_choices, opponent_choices, bot_percentages, opponent_percentages, score
+def get_warm_start(bot_choices, opponent_choices):
+    previous = previous_strategies.get(frozenset(bot_choices))
+    if previous is None:
+        return None, None
+
+    previous_bot_strategy, previous_opponent_strategy = previous
+    return (
+        [previous_bot_strategy.get(c, 0) for c in bot_choices],
+        [previous_opponent_strategy.get(c, 0) for c in opponent_choices]
+    )
+
+
+def save_strategies(bot_choices, opponent_choices, bot_percentages, opponent_percentages):
+    key = frozenset(bot_choices)
+    previous_strategies[key] = (
+        dict(zip(bot_choices, bot_percentages)),
+        dict(zip(opponent_choices, opponent_percentages))
+    )
+    previous_strategies.move_to_end(key)
+    if len(previous_strategies) > PREVIOUS_STRATEGIES_SIZE:
+        previous_strategies.popitem(last=False)
+
+
+def find_approximate_nash_equilibrium(payoff_matrix):
+    bot_choices = payoff_matrix.rows
+    opponent_choices = payoff_matrix.columns
+
+    row_warm_start, column_warm_start = get_warm_start(bot_choices, opponent_choices)
+    equilibrium = regret_matching.solve(
+        payoff_matrix.scores,
+        row_warm_start=row_warm_start,
+        column_warm_start=column_warm_start
+    )
+    logger.debug(
+        "Approximate equilibrium of a {}x{} matrix: {} iterations, exploitability {}, warm-started: {}".format(
+            len(bot_choices),
+            len(opponent_choices),
+            equilibrium.iterations,
+            round(equilibrium.exploitability, 3),
+            row_warm_start is not None
+        )
+    )
+    save_strategies(bot_choices, opponent_choices, equilibrium.row_strategy, equilibrium.column_strategy)
+
+    return bot_choices, opponent_choices, equilibrium.row_strategy, equilibrium.column_strategy, equilibrium.value
+
+
+def remove_guaranteed_opponent_moves(score_lookup):
+    # score-lookups can also be given as dictionaries of {(bot_choice, opponent_choice): score}
+    if isinstance(score_lookup, dict):
+        score_lookup = PayoffMatrix.from_dict(score_lookup)
+
+    payoff_matrix = score_lookup.remove_guaranteed_opponent_moves()
+    if payoff_matrix.is_empty():
+        payoff_matrix = score_lookup
+
+    return payoff_matrix
+
+
+def remove_dominated_choices(matrices):
+    """
+    Finds the bot's choices that are dominated against every one of the opponent's types
+    and each type's choices that are dominated, until there are none left.
+    None of these are played in an equilibrium so they do not need to be given to the solver
+
+    Returns a mask of the bot's choices that are kept and a mask of each type's choices that are kept
+    """
+    kept_rows = np.ones(matrices[0].shape[0], dtype=bool)
+    kept_columns = [np.ones(m.shape[1], dtype=bool) for m in matrices]
+    while True:
+        reduced = [m[kept_rows][:, c] for m, c in zip(matrices, kept_columns)]
+        dominated_bot_choices = dominated_rows(np.hstack(reduced))
+        dominated_opponent_choices = [dominated_columns(m) for m in reduced]
+        if not dominated_bot_choices.any() and not any(d.any() for d in dominated_opponent_choices):
+            break
+
+        kept_rows[np.flatnonzero(kept_rows)[dominated_bot_choices]] = False
+        for c, d in zip(kept_columns, dominated_opponent_choices):
+            c[np.flatnonzero(c)[d]] = False
+
+    logger.debug(
+        "Removed {}/{} dominated bot choices and {}/{} dominated opponent choices".format(
+            int((~kept_rows).sum()),
+            len(kept_rows),
+            sum(int((~c).sum()) for c in kept_columns),
+            sum(len(c) for c in kept_columns)
+        )
+    )
+    return kept_rows, kept_columns
+
+
+def expand_strategy(strategy, kept):
+    # the choices that were removed are never played
+    expanded = np.zeros(len(kept))
+    expanded[kept] = strategy
+    return expanded
+
+
+def find_nash_equilibrium(score_lookup, approximate=False):
+    payoff_matrix = remove_guaranteed_opponent_moves(score_lookup)
+    bot_choices = payoff_matrix.rows
+    opponent_choices = payoff_matrix.columns
+
+    kept_rows, (kept_columns,) = remove_dominated_choices([payoff_matrix.scores])
+    payoff_matrix = payoff_matrix.select_rows([c for c, keep in zip(bot_choices, kept_rows) if keep])
+    payoff_matrix = payoff_matrix.select_columns(kept_columns)
+    matrix = payoff_matrix.scores
+
+    cached = equilibrium_cache.get([matrix], [1])
+    if cached is not None:
+        bot_percentages, (opponent_percentages,) = cached
+        score = float(bot_percentages @ matrix @ opponent_percentages)
+    elif approximate or matrix.size > MAX_GAMBIT_MATRIX_SIZE or shutil.which("gambit-enummixed") is None:
+        _, _, bot_percentages, opponent_percentages, score = find_approximate_nash_equilibrium(payoff_matrix)
+    else:
+        try:
+            equilibria = find_all_equilibria(matrix)
+            (bot_percentages, opponent_percentages), score = find_best_nash_equilibrium(equilibria, matrix)
+        except CouldNotFindEquilibriumError as e:
+            logger.warning("Problem finding equilibria with gambit, approximating instead: {}".format(e))
+            _, _, bot_percentages, opponent_percentages, score = find_approximate_nash_equilibrium(payoff_matrix)
+
+    if cached is None:
+        equilibrium_cache.put([matrix], [1], bot_percentages, [opponent_percentages])
+
+    return (
+        bot_choices,
+        opponent_choices,
+        expand_strategy(bot_percentages, kept_rows),
+        expand_strategy(opponent_percentages, kept_columns),
+        score
+    )
 
 
 def log_nash_equilibria(bot_choices, opponent_choices, bot_percentages, opponent_percentages, payoff):
@@ -132,11 +262,11 @@ def log_nash_equilibria(bot_choices, opponent_choices, bot_percentages, opponent
             opponent_options.append((opponent_choices[i], percentage))
 
 
-def get_weighted_choices_from_multiple_score_lookups(score_lookups):
+def get_weighted_choices_from_multiple_score_lookups(score_lookups, approximate=False):
     bot_choice_percentages = defaultdict(lambda: 0)
     number_of_score_lookups = len(score_lookups)
     for sl in score_lookups:
-        eq = find_nash_equilibrium(sl)
+        eq = find_nash_equilibrium(sl, approximate=approximate)
         log_nash_equilibria(*eq)
         for i, bot_choice in enumerate(eq[0]):
             bot_choice_percentages[bot_choice] += eq[2][i]/number_of_score_lookups
@@ -144,17 +274,95 @@ def get_weighted_choices_from_multiple_score_lookups(score_lookups):
     return list(bot_choice_percentages.items())
 
 
-def pick_move_in_equilibrium_from_multiple_score_lookups(score_lookups):
-    # This is the WRONG way to find a Nash Equilibrium from different potential games
-    # ... but it is a simple way that works (with crappy results)
-    #
-    # The games should be modelled properly based on incomplete information (see Harsanyi Transform),
-    # however that would require the bot to keep track of what it has revealed to the opponent
-    try:
-        weighted_choices = get_weighted_choices_from_multiple_score_lookups(score_lookups)
-    except CouldNotFindEquilibriumError as e:
-        logger.warning("Problem finding equilibria: {}".format(e))
-        return random.choice([pick_safest(sl, remove_guaranteed=True)[0][0] for sl in score_lookups])
+def find_bayesian_nash_equilibrium(score_lookups, priors):
+    """
+    Finds one equilibrium of the Bayesian game where the opponent's type is which of the `score_lookups` it is in
+    The k-th type has a prior probability of `priors[k]` and the bot plays one strategy against all of them
+
+    Returns the bot's choices and their percentages,
+    or None if none of the bot's choices are possible in every score-lookup
+    """
+    payoff_matrices = [remove_guaranteed_opponent_moves(sl) for sl in score_lookups]
+
+    common_bot_choices = set.intersection(*(set(pm.rows) for pm in payoff_matrices))
+    bot_choices = [c for c in payoff_matrices[0].rows if c in common_bot_choices]
+    if not bot_choices:
+        return None
+
+    payoff_matrices = [pm.select_rows(bot_choices) for pm in payoff_matrices]
+    kept_rows, kept_columns = remove_dominated_choices([pm.scores for pm in payoff_matrices])
+    matrices = [pm.scores[kept_rows][:, c] for pm, c in zip(payoff_matrices, kept_columns)]
+
+    cached = equilibrium_cache.get(matrices, priors)
+    if cached is not None:
+        row_strategy, column_strategies = cached
+        logger.debug("Bayesian equilibrium found in the cache: {}".format(equilibrium_cache.info()))
+    else:
+        row_warm_start, column_warm_starts = get_warm_start(bot_choices, [])[0], []
+        if row_warm_start is not None:
+            row_warm_start = np.asarray(row_warm_start)[kept_rows]
+        for pm, c in zip(payoff_matrices, kept_columns):
+            column_warm_start = get_warm_start(bot_choices, pm.columns)[1]
+            if column_warm_start is not None:
+                column_warm_start = np.asarray(column_warm_start)[c]
+            column_warm_starts.append(column_warm_start)
+
+        equilibrium = regret_matching.solve_bayesian(
+            matrices,
+            priors,
+            row_warm_start=row_warm_start,
+            column_warm_starts=column_warm_starts
+        )
+        logger.debug(
+            "Bayesian equilibrium of {} {}-row matrices: {} iterations, exploitability {}, warm-started: {}".format(
+                len(payoff_matrices),
+                int(kept_rows.sum()),
+                equilibrium.iterations,
+                round(equilibrium.exploitability, 3),
+                row_warm_start is not None
+            )
+        )
+        row_strategy = equilibrium.row_strategy
+        column_strategies = equilibrium.column_strategies
+        equilibrium_cache.put(matrices, priors, row_strategy, column_strategies)
+
+    row_strategy = expand_strategy(row_strategy, kept_rows)
+    column_strategies = [expand_strategy(cs, c) for cs, c in zip(column_strategies, kept_columns)]
+
+    # the opponent's types are merged into one strategy to warm-start the next solve
+    total_prior = sum(priors)
+    opponent_percentages = defaultdict(lambda: 0)
+    for prior, pm, column_strategy in zip(priors, payoff_matrices, column_strategies):
+        for opponent_choice, percentage in zip(pm.columns, column_strategy):
+            opponent_percentages[opponent_choice] += percentage * prior / total_prior
+    save_strategies(
+        bot_choices,
+        list(opponent_percentages.keys()),
+        row_strategy,
+        list(opponent_percentages.values())
+    )
+
+    return bot_choices, row_strategy
+
+
+def pick_move_in_equilibrium_from_multiple_score_lookups(score_lookups, priors=None):
+    # The opponent's unknown set is modelled as its type in a Bayesian game (see Harsanyi Transform)
+    # and one equilibrium is found for the whole game, with each set weighted by how likely it is.
+    # The opponent is assumed to know everything about the bot
+    if priors is None:
+        priors = [1] * len(score_lookups)
+
+    equilibrium = find_bayesian_nash_equilibrium(score_lookups, priors)
+    if equilibrium is not None:
+        weighted_choices = list(zip(*equilibrium))
+    else:
+        # averaging the equilibrium of each game is not correct, but it can choose from all of the bot's options
+        logger.debug("None of the bot's options are possible in every battle - finding each battle's equilibrium")
+        try:
+            weighted_choices = get_weighted_choices_from_multiple_score_lookups(score_lookups)
+        except CouldNotFindEquilibriumError as e:
+            logger.warning("Problem finding equilibria: {}".format(e))
+            return random.choice([pick_safest(sl, remove_guaranteed=True)[0][0] for sl in score_lookups])
 
     s = sum([wc[1] for wc in weighted_choices])
     bot_choices = [wc[0] for wc in weighted_choices]
@@ -164,6 +372,7 @@ def pick_move_in_equilibrium_from_multiple_score_lookups(score_lookups):
 
     logger.debug("Choices: {}".format([w for w in weighted_choices if w[1]]))
     logger.debug("Choice: {}".format(choice))
+    logger.debug("Equilibrium cache: {}".format(equilibrium_cache.info()))
 
     return choice
 
@@ -175,19 +384,19 @@ class BattleBot(Battle):
     def find_best_move(self):
         battles = self.prepare_battles()
         if len(battles) > 7:
-            logger.debug("Not enough is known about the opponent's active pokemon - falling back to safest decision making")
+            # the opponent's possible moves are joined together so that fewer battles need to be searched
+            logger.debug("Not enough is known about the opponent's active pokemon - joining its possible moves together")
             battles = self.prepare_battles(join_moves_together=True)
-            decision = pick_safest_move_from_battles(battles)
-        else:
-            list_of_payoffs = list()
-            for b in battles:
-                state = b.create_state()
-                mutator = StateMutator(state)
-                logger.debug("Attempting to find best move from: {}".format(mutator.state))
-                user_options, opponent_options = b.get_all_options()
-                scores = get_payoff_matrix(mutator, user_options, opponent_options, prune=False)
-                list_of_payoffs.append(scores)
-
-            decision = pick_move_in_equilibrium_from_multiple_score_lookups(list_of_payoffs)
+
+        list_of_payoffs = search_battles(
+            battles,
+            prune=False,
+            eliminate_dominated=config.ShowdownConfig.eliminate_dominated
+        )
+        with get_decision_stats().timer('solving'):
+            decision = pick_move_in_equilibrium_from_multiple_score_lookups(
+                list_of_payoffs,
+                priors=[b.prior_weight for b in battles]
+            )
 
         return format_decision(self, decision)
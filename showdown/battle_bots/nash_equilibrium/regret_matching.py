@@ -0,0 +1,184 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+
+# the solver stops early once neither player can gain more than this by deviating
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MAX_ITERATIONS = 10000
+DEFAULT_TIME_LIMIT = 0.25
+
+# the exploitability and time budget are only checked this often because checking costs two matrix products
+CHECK_EVERY = 50
+
+
+@dataclass
+class ApproximateEquilibrium:
+    row_strategy: np.ndarray
+    column_strategy: np.ndarray
+    value: float
+    exploitability: float
+    iterations: int
+
+
+@dataclass
+class BayesianEquilibrium:
+    row_strategy: np.ndarray
+    column_strategies: list
+    value: float
+    exploitability: float
+    iterations: int
+
+
+def exploitability(matrix, row_strategy, column_strategy):
+    """
+    The sum of what each player could gain by switching to a best-response
+    The row player maximizes and the column player minimizes `matrix`.
+    This is 0 at an exact equilibrium, and the strategies' value is within this of the game's value
+    """
+    return bayesian_exploitability([matrix], [1], row_strategy, [column_strategy])
+
+
+def bayesian_exploitability(matrices, priors, row_strategy, column_strategies):
+    # each of the column player's types best-responds on its own
+    best_row_payoff = np.max(sum(p * (m @ c) for p, m, c in zip(priors, matrices, column_strategies)))
+    best_column_payoff = sum(p * np.min(row_strategy @ m) for p, m in zip(priors, matrices))
+    return float(best_row_payoff - best_column_payoff)
+
+
+def _initial_strategy(size, warm_start):
+    if warm_start is None:
+        return np.full(size, 1 / size)
+
+    warm_start = np.asarray(warm_start, dtype=float)
+    total = warm_start.sum()
+    if warm_start.shape != (size,) or total <= 0:
+        return np.full(size, 1 / size)
+    return warm_start / total
+
+
+def _regret_matching_strategy(regrets):
+    total = regrets.sum()
+    if total <= 0:
+        return np.full(len(regrets), 1 / len(regrets))
+    return regrets / total
+
+
+def solve(
+    matrix,
+    max_iterations=DEFAULT_MAX_ITERATIONS,
+    time_limit=DEFAULT_TIME_LIMIT,
+    tolerance=DEFAULT_TOLERANCE,
+    row_warm_start=None,
+    column_warm_start=None
+):
+    """
+    Approximates a Nash-Equilibrium of the zero-sum game where the row player maximizes `matrix`
+    using regret-matching+ with alternating updates and linearly weighted averages
+
+    This is an anytime solver: it stops after `max_iterations`, after `time_limit` seconds
+    or once the average strategies are within `tolerance` of an equilibrium, whichever comes first.
+    A warm-start (e.g. last turn's strategy) is where the iterations start from.
+    It does not change the answer, but a good warm-start reaches the tolerance sooner
+    """
+    equilibrium = solve_bayesian(
+        [matrix],
+        [1],
+        max_iterations=max_iterations,
+        time_limit=time_limit,
+        tolerance=tolerance,
+        row_warm_start=row_warm_start,
+        column_warm_starts=[column_warm_start]
+    )
+    return ApproximateEquilibrium(
+        row_strategy=equilibrium.row_strategy,
+        column_strategy=equilibrium.column_strategies[0],
+        value=equilibrium.value,
+        exploitability=equilibrium.exploitability,
+        iterations=equilibrium.iterations
+    )
+
+
+def solve_bayesian(
+    matrices,
+    priors,
+    max_iterations=DEFAULT_MAX_ITERATIONS,
+    time_limit=DEFAULT_TIME_LIMIT,
+    tolerance=DEFAULT_TOLERANCE,
+    row_warm_start=None,
+    column_warm_starts=None
+):
+    """
+    Approximates a Nash-Equilibrium of a zero-sum Bayesian game
+
+    The column player has one of several types, the k-th type being played with probability `priors[k]`.
+    The row player does not know the type, so it plays one strategy against all of them.
+    Each type knows itself and plays its own strategy against `matrices[k]`.
+    Every matrix must have the same rows, but each type can have different columns.
+    This is the same as `solve`, which is the game with one type
+    """
+    matrices = [np.asarray(m, dtype=float) for m in matrices]
+    priors = np.asarray(priors, dtype=float)
+    priors = priors / priors.sum()
+    num_rows = matrices[0].shape[0]
+    if column_warm_starts is None:
+        column_warm_starts = [None] * len(matrices)
+    start_time = time.time()
+
+    row_strategy = _initial_strategy(num_rows, row_warm_start)
+    column_strategies = [_initial_strategy(m.shape[1], w) for m, w in zip(matrices, column_warm_starts)]
+
+    # seeding the regrets with the warm-start makes it the first strategy that is played
+    # it is scaled by the range of the payoffs so that it is not washed out by the first update
+    payoff_range = max(max(float(m.max() - m.min()) for m in matrices), 1.0)
+    row_regrets = row_strategy * payoff_range if row_warm_start is not None else np.zeros(num_rows)
+    column_regrets = [
+        c * payoff_range if w is not None else np.zeros(len(c))
+        for c, w in zip(column_strategies, column_warm_starts)
+    ]
+
+    row_strategy_sum = np.zeros(num_rows)
+    column_strategy_sums = [np.zeros(len(c)) for c in column_strategies]
+    average_row_strategy = row_strategy
+    average_column_strategies = list(column_strategies)
+    current_exploitability = bayesian_exploitability(matrices, priors, row_strategy, column_strategies)
+
+    iteration = 0
+    while iteration < max_iterations and current_exploitability > tolerance:
+        iteration += 1
+
+        row_payoffs = sum(p * (m @ c) for p, m, c in zip(priors, matrices, column_strategies))
+        row_regrets = np.maximum(row_regrets + row_payoffs - row_strategy @ row_payoffs, 0)
+        row_strategy = _regret_matching_strategy(row_regrets)
+        row_strategy_sum += iteration * row_strategy
+
+        for k, m in enumerate(matrices):
+            column_payoffs = -(row_strategy @ m)
+            column_regrets[k] = np.maximum(
+                column_regrets[k] + column_payoffs - column_strategies[k] @ column_payoffs,
+                0
+            )
+            column_strategies[k] = _regret_matching_strategy(column_regrets[k])
+            column_strategy_sums[k] += iteration * column_strategies[k]
+
+        if iteration % CHECK_EVERY == 0 or iteration == max_iterations:
+            average_row_strategy = row_strategy_sum / row_strategy_sum.sum()
+            average_column_strategies = [c / c.sum() for c in column_strategy_sums]
+            current_exploitability = bayesian_exploitability(
+                matrices,
+                priors,
+                average_row_strategy,
+                average_column_strategies
+            )
+            if time_limit is not None and time.time() - start_time > time_limit:
+                break
+
+    value = sum(p * (average_row_strategy @ m @ c) for p, m, c in zip(priors, matrices, average_column_strategies))
+    return BayesianEquilibrium(
+        row_strategy=average_row_strategy,
+        column_strategies=list(average_column_strategies),
+        value=float(value),
+        exploitability=current_exploitability,
+        iterations=iteration
+    )
@@ -2,6 +2,7 @@ import re
 import json
 from copy import deepcopy
 import logging
+from collections import namedtuple
 
 import constants
 from data import all_move_json
@@ -103,7 +104,7 @@ def request(battle, split_msg):
        Also updates some battle meta-data such as rqid, force_switch, and wait"""
     if len(split_msg) >= 2:
         battle_json = json.loads(split_msg[2].strip('\''))
-        logger.debug("Received battle JSON from server: {}".format(battle_json))
+        logger.debug("Received battle JSON from server: %s", split_msg[2])
         battle.rqid = battle_json[constants.RQID]
 
         if battle_json.get(constants.FORCE_SWITCH):
@@ -188,7 +189,7 @@ def switch_or_drag(battle, split_msg):
     pkmn = find_pokemon_in_reserves(temp_pkmn.name, side.reserve)
 
     if pkmn is None:
-        pkmn = Pokemon.from_switch_string(split_msg[3], nickname=nickname)
+        pkmn = temp_pkmn
     else:
         pkmn.nickname = temp_pkmn.nickname
         side.reserve.remove(pkmn)
@@ -856,13 +857,14 @@ def check_speed_ranges(battle, msg_lines):
     ):
         return
 
-    battle_copy = deepcopy(battle)
-    battle_copy.user.from_json(battle_copy.request_json)
+    # only the user's side is changed by the request, so the rest of the battle is not copied
+    user = deepcopy(battle.user)
+    user.from_json(battle.request_json)
 
     speed_threshold = int(
-        boost_multiplier_lookup[battle_copy.user.active.boosts[constants.SPEED]] *
-        battle_copy.user.active.stats[constants.SPEED] /
-        boost_multiplier_lookup[battle_copy.opponent.active.boosts[constants.SPEED]]
+        boost_multiplier_lookup[user.active.boosts[constants.SPEED]] *
+        user.active.stats[constants.SPEED] /
+        boost_multiplier_lookup[battle.opponent.active.boosts[constants.SPEED]]
     )
 
     if battle.opponent.side_conditions[constants.TAILWIND]:
@@ -1012,14 +1014,14 @@ def check_choice_band_or_specs(battle, damage_dealt):
     max_damage_without_choice_item = float('-inf')
     potential_battles = battle.prepare_battles(guess_mega_evo_opponent=False, join_moves_together=True)
 
-    battle_copy = deepcopy(battle)
-    battle_copy.user.from_json(battle.request_json)
+    user = deepcopy(battle.user)
+    user.from_json(battle.request_json)
     for b in potential_battles:
 
         # if the item is not the choice item - use it to find the max damage roll possible for all items
         if b.opponent.active.item != choice_item:
             b.opponent.active.set_spread(*spread)
-            b.user.active.stats = battle_copy.user.active.stats
+            b.user.active.stats = user.active.stats
 
             state = b.create_state()
 
@@ -1029,7 +1031,7 @@ def check_choice_band_or_specs(battle, damage_dealt):
         # also find the min damage roll possible for the choice-item
         b.opponent.active.item = choice_item
         b.opponent.active.set_spread(*spread)
-        b.user.active.stats = battle_copy.user.active.stats
+        b.user.active.stats = user.active.stats
 
         state = b.create_state()
 
@@ -1175,63 +1177,75 @@ def check_heavydutyboots(battle, msg_lines):
             side_to_check.active.can_have_heavydutyboots = False
 
 
+BATTLE_MODIFIERS = {
+    'request': request,
+    'switch': switch_or_drag,
+    'faint': faint,
+    'drag': switch_or_drag,
+    '-heal': heal_or_damage,
+    '-damage': heal_or_damage,
+    'move': move,
+    '-boost': boost,
+    '-unboost': unboost,
+    '-status': status,
+    '-activate': activate,
+    '-prepare': prepare,
+    '-start': start_volatile_status,
+    '-end': end_volatile_status,
+    '-curestatus': curestatus,
+    '-cureteam': cureteam,
+    '-weather': weather,
+    '-fieldstart': fieldstart,
+    '-fieldend': fieldend,
+    '-sidestart': sidestart,
+    '-sideend': sideend,
+    '-swapsideconditions': swapsideconditions,
+    '-item': set_item,
+    '-enditem': remove_item,
+    '-immune': set_ability,
+    '-ability': set_opponent_ability_from_ability_tag,
+    'detailschange': form_change,
+    'replace': form_change,
+    '-formechange': form_change,
+    '-transform': transform,
+    '-mega': mega,
+    '-terastallize': terastallize,
+    '-zpower': zpower,
+    '-clearnegativeboost': clearnegativeboost,
+    '-clearallboost': clearallboost,
+    '-singleturn': singleturn,
+    'upkeep': upkeep,
+    'inactive': inactive,
+    'inactiveoff': inactiveoff,
+    'turn': turn,
+    'noinit': noinit,
+}
+
+
+SplitLine = namedtuple('SplitLine', ['line_number', 'action', 'split_msg'])
+
+
+def split_message(msg_lines):
+    """
+    Splits each line of a message from the websocket on '|' once, so that the line is not split again for each check
+    `split_msg` is what the functions in `BATTLE_MODIFIERS` are given, and they read their own fields from it.
+    Lines without an action are skipped
+    """
+    lines = []
+    for i, line in enumerate(msg_lines):
+        split_msg = line.split('|')
+        if len(split_msg) >= 2:
+            lines.append(SplitLine(i, split_msg[1].strip(), split_msg))
+    return lines
+
+
 def update_battle(battle, msg):
     msg_lines = msg.split('\n')
 
     action = None
     check_speed_ranges(battle, msg_lines)
-    for i, line in enumerate(msg_lines):
-        split_msg = line.split('|')
-        if len(split_msg) < 2:
-            continue
-
-        action = split_msg[1].strip()
-
-        battle_modifiers_lookup = {
-            'request': request,
-            'switch': switch_or_drag,
-            'faint': faint,
-            'drag': switch_or_drag,
-            '-heal': heal_or_damage,
-            '-damage': heal_or_damage,
-            'move': move,
-            '-boost': boost,
-            '-unboost': unboost,
-            '-status': status,
-            '-activate': activate,
-            '-prepare': prepare,
-            '-start': start_volatile_status,
-            '-end': end_volatile_status,
-            '-curestatus': curestatus,
-            '-cureteam': cureteam,
-            '-weather': weather,
-            '-fieldstart': fieldstart,
-            '-fieldend': fieldend,
-            '-sidestart': sidestart,
-            '-sideend': sideend,
-            '-swapsideconditions': swapsideconditions,
-            '-item': set_item,
-            '-enditem': remove_item,
-            '-immune': set_ability,
-            '-ability': set_opponent_ability_from_ability_tag,
-            'detailschange': form_change,
-            'replace': form_change,
-            '-formechange': form_change,
-            '-transform': transform,
-            '-mega': mega,
-            '-terastallize': terastallize,
-            '-zpower': zpower,
-            '-clearnegativeboost': clearnegativeboost,
-            '-clearallboost': clearallboost,
-            '-singleturn': singleturn,
-            'upkeep': upkeep,
-            'inactive': inactive,
-            'inactiveoff': inactiveoff,
-            'turn': turn,
-            'noinit': noinit,
-        }
-
-        function_to_call = battle_modifiers_lookup.get(action)
+    for i, action, split_msg in split_message(msg_lines):
+        function_to_call = BATTLE_MODIFIERS.get(action)
         if function_to_call is not None:
             function_to_call(battle, split_msg)
 
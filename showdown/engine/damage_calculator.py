@@ -1,9 +1,17 @@
+from collections import OrderedDict
+from collections.abc import Mapping
 from copy import copy
-from copy import deepcopy
+
+import numpy as np
 
 import constants
 from data import all_move_json
 from data import pokedex
+from showdown.engine.objects import MoveOverlay
+from showdown.engine.volatile_statuses import ATTACK_BOOSTING_VOLATILE_STATUSES
+from showdown.engine.volatile_statuses import DEFENSE_BOOSTING_VOLATILE_STATUSES
+from showdown.engine.volatile_statuses import SPECIAL_ATTACK_BOOSTING_VOLATILE_STATUSES
+from showdown.engine.volatile_statuses import SPECIAL_DEFENSE_BOOSTING_VOLATILE_STATUSES
 
 
 pokemon_type_indicies = {
@@ -67,6 +75,129 @@ SPECIAL_LOGIC_MOVES = {
 TERRAIN_DAMAGE_BOOST = 1.3
 
 
+# the multipliers applied to the final damage amount for each `calc_type`
+# these are the same multipliers used by `get_damage_rolls`
+DAMAGE_ROLL_MULTIPLIERS = {
+    'average': [0.925],
+    'min': [0.85],
+    'max': [1],
+    'min_max': [0.85, 1],
+    'min_max_average': [0.85, 0.925, 1],
+    'all': [0.85, 0.86, 0.87, 0.88, 0.89, 0.90, 0.91, 0.92, 0.93, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99, 1],
+}
+
+
+# volatile statuses that are read while calculating damage
+# a volatile status not in this list cannot change the result of `_calculate_damage`
+DAMAGE_VOLATILE_STATUSES = frozenset([
+    constants.ROOST,
+    'magnetrise',
+    'flashfire',
+    'tarshot',
+    'phantomforce',
+    'shadowforce',
+    'dive',
+    'dig',
+    'fly',
+    'bounce',
+    'glaiverush',
+    'quarkdriveatk',
+    'quarkdrivespa',
+    'quarkdrivedef',
+    'quarkdrivespd',
+    'protosynthesisatk',
+    'protosynthesisspa',
+    'protosynthesisdef',
+    'protosynthesisspd',
+])
+
+
+DAMAGE_CACHE_SIZE = 65536
+
+
+class _DamageCache:
+    """
+    LRU cache of damage rolls keyed by everything that `_calculate_damage` reads
+    The same attacker/defender/move combination is seen many times during a search with only the HP changing
+    Several battles' decisions can use it at the same time from different threads, so an entry that was just found
+    may be evicted before it is moved to the end
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def get(self, key):
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        try:
+            self._cache.move_to_end(key)
+        except KeyError:
+            # another thread's search evicted it since it was found
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.maxsize:
+            try:
+                self._cache.popitem(last=False)
+            except KeyError:
+                # another thread emptied the cache
+                pass
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0
+        return self.hits / lookups
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate(), 3),
+            'size': len(self._cache),
+            'maxsize': self.maxsize
+        }
+
+
+damage_cache = _DamageCache(DAMAGE_CACHE_SIZE)
+
+
+def pokemon_damage_signature(pkmn):
+    # HP is intentionally absent - the moves that depend on HP are handled before the cache is used
+    return (
+        pkmn.id,
+        pkmn.level,
+        tuple(pkmn.types),
+        pkmn.ability,
+        pkmn.item,
+        pkmn.status,
+        pkmn.terastallized,
+        pkmn.attack,
+        pkmn.defense,
+        pkmn.special_attack,
+        pkmn.special_defense,
+        pkmn.attack_boost,
+        pkmn.defense_boost,
+        pkmn.special_attack_boost,
+        pkmn.special_defense_boost,
+        DAMAGE_VOLATILE_STATUSES.intersection(pkmn.volatile_status)
+    )
+
+
 def _calculate_damage(attacker, defender, move, conditions=None, calc_type='average'):
     # This function assumes the `move` dictionary has already been updated to account for move/item/ability special-effects
     # You may want to use `calculate_damage`
@@ -100,6 +231,31 @@ def _calculate_damage(attacker, defender, move, conditions=None, calc_type='aver
     if conditions is None:
         conditions = {}
 
+    key = (
+        pokemon_damage_signature(attacker),
+        pokemon_damage_signature(defender),
+        attacking_move[constants.ID],
+        attacking_type,
+        attacking_move[constants.BASE_POWER],
+        attacking_move[constants.TYPE],
+        attacking_move.get(constants.PRIORITY),
+        conditions.get(constants.WEATHER),
+        conditions.get(constants.TERRAIN),
+        conditions.get(constants.REFLECT),
+        conditions.get(constants.LIGHT_SCREEN),
+        conditions.get(constants.AURORA_VEIL),
+        calc_type
+    )
+    damage_rolls = damage_cache.get(key)
+    if damage_rolls is None:
+        damage_rolls = tuple(_calculate_damage_rolls(attacker, defender, attacking_move, attack, defense, conditions, calc_type))
+        damage_cache.put(key, damage_rolls)
+
+    return list(damage_rolls)
+
+
+def _calculate_damage_rolls(attacker, defender, attacking_move, attack, defense, conditions, calc_type):
+    # the uncached core of `_calculate_damage`
     attacking_stats = attacker.calculate_boosted_stats()
     defending_stats = defender.calculate_boosted_stats()
 
@@ -183,10 +339,13 @@ def calculate_modifier(attacker, defender, defending_types, attacking_move, cond
 
 
 def get_move(move):
-    if isinstance(move, dict):
+    if isinstance(move, Mapping):
         return move
     if isinstance(move, str):
-        return deepcopy(all_move_json.get(move, None))
+        try:
+            return MoveOverlay(all_move_json[move])
+        except KeyError:
+            return None
     else:
         return None
 
@@ -367,19 +526,31 @@ def volatile_status_modifier(attacking_move, attacker, defender):
         modifier *= 0
     if 'glaiverush' in defender.volatile_status:
         modifier *= 2
-    if any(vs in attacker.volatile_status for vs in ['quarkdriveatk', "protosynthesisatk"]) and attacking_move[constants.CATEGORY] == constants.PHYSICAL:
+    if not ATTACK_BOOSTING_VOLATILE_STATUSES.isdisjoint(attacker.volatile_status) and attacking_move[constants.CATEGORY] == constants.PHYSICAL:
         modifier *= 1.3
-    if any(vs in attacker.volatile_status for vs in ['quarkdrivespa', "protosynthesisspa"]) and attacking_move[constants.CATEGORY] == constants.SPECIAL:
+    if not SPECIAL_ATTACK_BOOSTING_VOLATILE_STATUSES.isdisjoint(attacker.volatile_status) and attacking_move[constants.CATEGORY] == constants.SPECIAL:
         modifier *= 1.3
-    if any(vs in defender.volatile_status for vs in ['quarkdrivedef', "protosynthesisdef"]) and attacking_move[constants.CATEGORY] == constants.PHYSICAL:
+    if not DEFENSE_BOOSTING_VOLATILE_STATUSES.isdisjoint(defender.volatile_status) and attacking_move[constants.CATEGORY] == constants.PHYSICAL:
         modifier *= (1/1.3)
-    if any(vs in defender.volatile_status for vs in ['quarkdrivespd', "protosynthesisspd"]) and attacking_move[constants.CATEGORY] == constants.SPECIAL:
+    if not SPECIAL_DEFENSE_BOOSTING_VOLATILE_STATUSES.isdisjoint(defender.volatile_status) and attacking_move[constants.CATEGORY] == constants.SPECIAL:
         modifier *= (1/1.3)
     return modifier
 
 
 def calculate_damage(state, attacking_side_string, attacking_move, defending_move, calc_type='average'):
     # a wrapper for `_calculate_damage` that takes into account move/item/ability special-effects
+    attacking_side, defending_side, attacking_move_dict, conditions = get_attacking_move_and_conditions(
+        state,
+        attacking_side_string,
+        attacking_move,
+        defending_move
+    )
+
+    return _calculate_damage(attacking_side.active, defending_side.active, attacking_move_dict, conditions=conditions, calc_type=calc_type)
+
+
+def get_attacking_move_and_conditions(state, attacking_side_string, attacking_move, defending_move):
+    # returns the attacking move updated for move/item/ability special-effects along with the conditions it is used in
     from showdown.engine.find_state_instructions import update_attacking_move
     from showdown.engine.find_state_instructions import user_moves_first
 
@@ -411,7 +582,7 @@ def calculate_damage(state, attacking_side_string, attacking_move, defending_mov
     if constants.CHARGE in attacking_move_dict[constants.FLAGS]:
         attacking_move_dict = attacking_move_dict.copy()
         # a charge move doesn't need to charge when only calculating damage
-        attacking_move_dict[constants.FLAGS].pop(constants.CHARGE, None)
+        attacking_move_dict[constants.FLAGS] = {k: v for k, v in attacking_move_dict[constants.FLAGS].items() if k != constants.CHARGE}
 
     attacking_move_dict = update_attacking_move(
         attacking_side,
@@ -424,7 +595,186 @@ def calculate_damage(state, attacking_side_string, attacking_move, defending_mov
         state.field
     )
 
-    return _calculate_damage(attacking_side.active, defending_side.active, attacking_move_dict, conditions=conditions, calc_type=calc_type)
+    return attacking_side, defending_side, attacking_move_dict, conditions
+
+
+def damage_matrix(attacker, defenders, moves, conditions=None, calc_type='average'):
+    """
+    Calculates the damage of every move in `moves` against every pokemon in `defenders` in one pass
+
+    Returns a float array with the shape (len(moves), len(defenders), number of damage rolls)
+    where the damage rolls are the `DAMAGE_ROLL_MULTIPLIERS` for the given `calc_type`.
+    Each value is the same as the corresponding roll from `_calculate_damage`, except that
+    duplicate rolls are not removed and a move that does no damage (i.e. a status move) is NaN
+
+    Like `_calculate_damage`, this assumes the moves have already been updated to account for
+    move/item/ability special-effects
+    """
+    if calc_type not in DAMAGE_ROLL_MULTIPLIERS:
+        raise ValueError("{} is not one of {}".format(calc_type, list(DAMAGE_ROLL_MULTIPLIERS)))
+
+    if conditions is None:
+        conditions = {}
+
+    attacking_moves = []
+    for move in moves:
+        attacking_move = get_move(move)
+        if attacking_move is None:
+            raise TypeError("Invalid move: {}".format(move))
+        attacking_moves.append(attacking_move)
+
+    roll_multipliers = np.array(DAMAGE_ROLL_MULTIPLIERS[calc_type])
+    result = np.full((len(attacking_moves), len(defenders), len(roll_multipliers)), np.nan)
+    if not attacking_moves or not defenders:
+        return result
+
+    # move vectors
+    move_ids = [m[constants.ID] for m in attacking_moves]
+    move_types = [m[constants.TYPE] for m in attacking_moves]
+    categories = [m.get(constants.CATEGORY) for m in attacking_moves]
+    is_physical = np.array([c == constants.PHYSICAL for c in categories])
+    is_special = np.array([c == constants.SPECIAL for c in categories])
+    base_power = np.array([m[constants.BASE_POWER] if c in constants.DAMAGING_CATEGORIES else 0 for m, c in zip(attacking_moves, categories)], dtype=float)
+    type_indicies = np.array([pokemon_type_indicies[t] for t in move_types])
+
+    def move_is_type(move_type):
+        return np.array([t == move_type for t in move_types])
+
+    def move_is_one_of(ids):
+        return np.array([i in ids for i in move_ids])
+
+    has_priority = np.array([m.get(constants.PRIORITY, 0) > 0 for m in attacking_moves])
+
+    # defender vectors
+    defender_boosted_stats = [d.calculate_boosted_stats() for d in defenders]
+
+    def defender_has_volatile(volatile_status):
+        return np.array([volatile_status in d.volatile_status for d in defenders])
+
+    def defender_has_any_volatile(volatile_statuses):
+        return np.array([not volatile_statuses.isdisjoint(d.volatile_status) for d in defenders])
+
+    def defender_has_ability(ability):
+        return np.array([d.ability == ability for d in defenders])
+
+    defender_is_grounded = np.array([d.is_grounded() for d in defenders])
+    defender_is_flying = np.array(['flying' in d.types for d in defenders])
+
+    # defending stats
+    if attacker.ability == 'unaware':
+        defense = np.array([d.defense for d in defenders], dtype=float)
+        special_defense = np.array([d.special_defense for d in defenders], dtype=float)
+    else:
+        defense = np.array([s[constants.DEFENSE] for s in defender_boosted_stats], dtype=float)
+        special_defense = np.array([s[constants.SPECIAL_DEFENSE] for s in defender_boosted_stats], dtype=float)
+
+    weather = conditions.get(constants.WEATHER)
+    if weather == constants.SAND:
+        is_rock = np.array(['rock' in d.types for d in defenders])
+        special_defense = np.where(is_rock, np.floor(special_defense * 1.5), special_defense)
+    elif weather == constants.SNOW:
+        is_ice = np.array(['ice' in d.types for d in defenders])
+        defense = np.where(is_ice, np.floor(defense * 1.5), defense)
+
+    if attacker.ability == "swordofruin":
+        defense = defense * 0.75
+    elif attacker.ability == "beadsofruin":
+        special_defense = special_defense * 0.75
+
+    # attacking stats
+    attacking_stats = attacker.calculate_boosted_stats()
+    attack = np.where(defender_has_ability('unaware'), attacker.attack, attacking_stats[constants.ATTACK])
+    attack = np.where(defender_has_ability('tabletsofruin'), attack * 0.75, attack)
+    special_attack = np.where(defender_has_ability('vesselofruin'), attacking_stats[constants.SPECIAL_ATTACK] * 0.75, attacking_stats[constants.SPECIAL_ATTACK])
+
+    attacking_stat = np.where(is_physical[:, None], attack[None, :], special_attack[None, :])
+    defending_stat = np.where(is_physical[:, None], defense[None, :], special_defense[None, :])
+
+    # type effectiveness, with and without the defender's flying type
+    type_chart = np.array(damage_multipication_array)
+    type_effectiveness = np.ones((len(attacking_moves), len(defenders)))
+    grounded_type_effectiveness = np.ones((len(attacking_moves), len(defenders)))
+    for i, d in enumerate(defenders):
+        for pkmn_type in d.types:
+            multiplier = type_chart[type_indicies, pokemon_type_indicies[pkmn_type]]
+            type_effectiveness[:, i] *= multiplier
+            if pkmn_type != 'flying':
+                grounded_type_effectiveness[:, i] *= multiplier
+
+    remove_flying = (
+        (move_is_one_of(['thousandarrows'])[:, None] & defender_is_flying[None, :]) |
+        (move_is_type('ground')[:, None] & defender_has_volatile(constants.ROOST)[None, :])
+    )
+    modifier = np.where(remove_flying, grounded_type_effectiveness, type_effectiveness)
+
+    # modifiers that only depend on the attacker and the move
+    modifier = modifier * np.array([weather_modifier(m, weather) for m in attacking_moves])[:, None]
+    modifier = modifier * np.array([stab_modifier(attacker, m) for m in attacking_moves])[:, None]
+    modifier = modifier * np.array([burn_modifier(attacker, m) for m in attacking_moves])[:, None]
+
+    # terrain
+    terrain = conditions.get(constants.TERRAIN)
+    attacker_is_grounded = attacker.is_grounded()
+    terrain_conditions = [
+        np.broadcast_to((terrain == constants.ELECTRIC_TERRAIN and attacker_is_grounded) & move_is_type('electric')[:, None], modifier.shape),
+        np.broadcast_to((terrain == constants.GRASSY_TERRAIN and attacker_is_grounded) & move_is_type('grass')[:, None], modifier.shape),
+        np.broadcast_to((terrain == constants.GRASSY_TERRAIN) & move_is_one_of(['earthquake'])[:, None], modifier.shape),
+        (terrain == constants.MISTY_TERRAIN) & move_is_type('dragon')[:, None] & defender_is_grounded[None, :],
+        np.broadcast_to((terrain == constants.PSYCHIC_TERRAIN and attacker_is_grounded) & move_is_type('psychic')[:, None], modifier.shape),
+        (terrain == constants.PSYCHIC_TERRAIN) & has_priority[:, None] & defender_is_grounded[None, :],
+    ]
+    modifier = modifier * np.select(terrain_conditions, [TERRAIN_DAMAGE_BOOST, TERRAIN_DAMAGE_BOOST, 0.5, 0.5, TERRAIN_DAMAGE_BOOST, 0], default=1)
+
+    # volatile statuses
+    no_guard = np.array([attacker.ability == 'noguard' or d.ability == 'noguard' for d in defenders])
+    volatile_modifiers = [
+        (move_is_type('ground')[:, None] & ~move_is_one_of(['thousandarrows'])[:, None] & defender_has_volatile('magnetrise')[None, :], 0),
+        (move_is_type('fire')[:, None] & ('flashfire' in attacker.volatile_status), 1.5),
+        (move_is_type('fire')[:, None] & defender_has_volatile('tarshot')[None, :], 2),
+        (defender_has_volatile('phantomforce')[None, :], 0),
+        (defender_has_volatile('shadowforce')[None, :], 0),
+        (defender_has_volatile('dive')[None, :] & ~no_guard[None, :] & ~move_is_one_of(["surf", "whirlpool"])[:, None], 0),
+        (defender_has_volatile('dig')[None, :] & ~no_guard[None, :] & ~move_is_one_of(["earthquake", "magnitude", "fissure"])[:, None], 0),
+        (
+            defender_has_any_volatile(frozenset(["fly", "bounce"]))[None, :] & ~no_guard[None, :] &
+            ~move_is_one_of(["gust", "thunder", "twister", "skyuppercut", "hurricane", "thousandarrows", "smackdown"])[:, None],
+            0
+        ),
+        (defender_has_volatile('glaiverush')[None, :], 2),
+        (is_physical[:, None] & (not ATTACK_BOOSTING_VOLATILE_STATUSES.isdisjoint(attacker.volatile_status)), 1.3),
+        (is_special[:, None] & (not SPECIAL_ATTACK_BOOSTING_VOLATILE_STATUSES.isdisjoint(attacker.volatile_status)), 1.3),
+        (is_physical[:, None] & defender_has_any_volatile(DEFENSE_BOOSTING_VOLATILE_STATUSES)[None, :], 1/1.3),
+        (is_special[:, None] & defender_has_any_volatile(SPECIAL_DEFENSE_BOOSTING_VOLATILE_STATUSES)[None, :], 1/1.3),
+    ]
+    volatile_modifier = np.ones(modifier.shape)
+    for applies, multiplier in volatile_modifiers:
+        volatile_modifier = np.where(applies, volatile_modifier * multiplier, volatile_modifier)
+    modifier = modifier * volatile_modifier
+
+    if attacker.ability != 'infiltrator':
+        modifier = modifier * np.array([light_screen_modifier(m, conditions.get(constants.LIGHT_SCREEN)) for m in attacking_moves])[:, None]
+        modifier = modifier * np.array([reflect_modifier(m, conditions.get(constants.REFLECT)) for m in attacking_moves])[:, None]
+        modifier = modifier * aurora_veil_modifier(conditions.get(constants.AURORA_VEIL))
+
+    # the damage formula, truncating in the same places as `_calculate_damage`
+    damage = int(int((2 * attacker.level) / 5) + 2) * base_power[:, None]
+    damage = np.floor(damage * attacking_stat / defending_stat)
+    damage = np.floor(damage / 50) + 2
+    damage = damage * modifier
+    rolls = np.floor(damage[:, :, None] * roll_multipliers[None, None, :])
+
+    is_damaging = is_physical | is_special
+    result[is_damaging] = rolls[is_damaging]
+    result[is_damaging & (base_power == 0)] = 0
+
+    # moves with special logic don't use the damage formula
+    for i, move_id in enumerate(move_ids):
+        if is_damaging[i] and move_id in SPECIAL_LOGIC_MOVES:
+            for j, d in enumerate(defenders):
+                special_damage = SPECIAL_LOGIC_MOVES[move_id](attacker, d)
+                result[i, j, :] = np.nan if special_damage is None else special_damage[0]
+
+    return result
 
 
 def calculate_futuresight_damage(state, attacking_side_string, future_sight_user, calc_type='average'):
@@ -69,6 +69,9 @@ class Scoring:
     }
 
 
+SCORED_VOLATILE_STATUSES = frozenset(Scoring.POKEMON_VOLATILE_STATUSES)
+
+
 def evaluate_pokemon(pkmn):
     score = 0
     if pkmn.hp <= 0:
@@ -92,11 +95,12 @@ def evaluate_pokemon(pkmn):
         # KeyError only happens when the status is BURN
         score += Scoring.BURN(pkmn.burn_multiplier)
 
-    for vol_stat in pkmn.volatile_status:
-        try:
-            score += Scoring.POKEMON_VOLATILE_STATUSES[vol_stat]
-        except KeyError:
-            pass
+    if not SCORED_VOLATILE_STATUSES.isdisjoint(pkmn.volatile_status):
+        for vol_stat in pkmn.volatile_status:
+            try:
+                score += Scoring.POKEMON_VOLATILE_STATUSES[vol_stat]
+            except KeyError:
+                pass
 
     return round(score)
 
@@ -142,3 +146,108 @@ def evaluate(state):
         pass
 
     return int(score)
+
+
+class _SideEvaluation(object):
+    __slots__ = (
+        'pokemon_score',
+        'alive_count',
+        'static_condition_score',
+        'count_condition_score',
+    )
+
+    def __init__(self):
+        self.pokemon_score = 0
+        self.alive_count = 0
+        self.static_condition_score = 0
+        self.count_condition_score = 0
+
+
+class IncrementalEvaluation(object):
+    """
+    The parts of `evaluate` that only change when an instruction changes them
+
+    Pokemon that an instruction touched are marked as changed and only they are re-scored.
+    The difference between their before and after scores is applied to their side's total.
+    Side-condition scores are kept as running totals that are updated by the side-condition instructions.
+    `score()` always gives the same value as `evaluate(state)`
+    """
+    __slots__ = (
+        'state',
+        'user',
+        'opponent',
+        'pokemon_scores',
+        'changed_pokemon',
+    )
+
+    def __init__(self, state):
+        self.state = state
+        self.changed_pokemon = set()
+        self.reset()
+
+    def reset(self):
+        # re-scores everything from the state
+        # this must be called if the state was changed without letting this object know
+        self.user = _SideEvaluation()
+        self.opponent = _SideEvaluation()
+        self.pokemon_scores = dict()
+        self.changed_pokemon.clear()
+
+        for side, side_evaluation in ((self.state.user, self.user), (self.state.opponent, self.opponent)):
+            for pkmn in [side.active] + list(side.reserve.values()):
+                this_pkmn_score = evaluate_pokemon(pkmn)
+                alive = pkmn.hp > 0
+                self.pokemon_scores[pkmn] = (side_evaluation, this_pkmn_score, alive)
+                side_evaluation.pokemon_score += this_pkmn_score
+                side_evaluation.alive_count += alive
+
+            for condition, count in side.side_conditions.items():
+                self._add_side_condition(side_evaluation, condition, count)
+
+    def pokemon_changed(self, pkmn):
+        self.changed_pokemon.add(pkmn)
+
+    def side_condition_changed(self, side, condition, amount):
+        self._add_side_condition(getattr(self, side), condition, amount)
+
+    @staticmethod
+    def _add_side_condition(side_evaluation, condition, amount):
+        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
+            side_evaluation.static_condition_score += amount * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
+        elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
+            side_evaluation.count_condition_score += amount * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition]
+
+    def _rescore_changed_pokemon(self):
+        for pkmn in self.changed_pokemon:
+            side_evaluation, old_score, was_alive = self.pokemon_scores[pkmn]
+            new_score = evaluate_pokemon(pkmn)
+            alive = pkmn.hp > 0
+            side_evaluation.pokemon_score += new_score - old_score
+            side_evaluation.alive_count += alive - was_alive
+            self.pokemon_scores[pkmn] = (side_evaluation, new_score, alive)
+        self.changed_pokemon.clear()
+
+    def score(self):
+        if self.changed_pokemon:
+            self._rescore_changed_pokemon()
+
+        state = self.state
+        user = self.user
+        opponent = self.opponent
+
+        number_of_opponent_reserve_revealed = len(state.opponent.reserve) + 1
+        bot_alive_reserve_count = user.alive_count - (state.user.active.hp > 0)
+        opponent_alive_reserves_count = opponent.alive_count - (state.opponent.active.hp > 0) + (6-number_of_opponent_reserve_revealed)
+
+        score = user.pokemon_score - opponent.pokemon_score
+        score += user.static_condition_score + user.count_condition_score * bot_alive_reserve_count
+        score -= opponent.static_condition_score + opponent.count_condition_score * opponent_alive_reserves_count
+
+        try:
+            matchup_score = Scoring.MATCHUP_BONUS * effectiveness[state.user.active.id][state.opponent.active.id]
+            matchup_score -= Scoring.MATCHUP_BONUS * effectiveness[state.opponent.active.id][state.user.active.id]
+            score += matchup_score
+        except KeyError:
+            pass
+
+        return int(score)
@@ -8,7 +8,11 @@ from . import instruction_generator
 from .damage_calculator import _calculate_damage
 
 from .instruction_generator import get_pre_move_instructions
+from .move_records import move_records
 from .objects import MoveChoice
+from .objects import get_move_choice
+from .volatile_statuses import PROTECT_VOLATILE_STATUSES
+from .volatile_statuses import SPEED_BOOSTING_VOLATILE_STATUSES
 from .special_effects.abilities.modify_attack_against import ability_modify_attack_against
 from .special_effects.abilities.modify_attack_being_used import ability_modify_attack_being_used
 from .special_effects.items.modify_attack_against import item_modify_attack_against
@@ -31,22 +35,23 @@ def lookup_move(move_choice: MoveChoice):
 def get_effective_speed(state, side):
     boosted_speed = side.active.calculate_boosted_stats()[constants.SPEED]
 
-    if state.weather == constants.SUN and side.active.ability == 'chlorophyll':
-        boosted_speed *= 2
-    elif state.weather == constants.RAIN and side.active.ability == 'swiftswim':
-        boosted_speed *= 2
-    elif state.weather == constants.SAND and side.active.ability == 'sandrush':
-        boosted_speed *= 2
-    elif state.weather in constants.HAIL_OR_SNOW and side.active.ability == 'slushrush':
-        boosted_speed *= 2
+    if side.active.hooks.speed_ability:
+        if state.weather == constants.SUN and side.active.ability == 'chlorophyll':
+            boosted_speed *= 2
+        elif state.weather == constants.RAIN and side.active.ability == 'swiftswim':
+            boosted_speed *= 2
+        elif state.weather == constants.SAND and side.active.ability == 'sandrush':
+            boosted_speed *= 2
+        elif state.weather in constants.HAIL_OR_SNOW and side.active.ability == 'slushrush':
+            boosted_speed *= 2
 
-    if state.field == constants.ELECTRIC_TERRAIN and side.active.ability == 'surgesurfer':
-        boosted_speed *= 2
+        if state.field == constants.ELECTRIC_TERRAIN and side.active.ability == 'surgesurfer':
+            boosted_speed *= 2
 
-    if side.active.ability == 'unburden' and not side.active.item:
-        boosted_speed *= 2
-    elif side.active.ability == 'quickfeet' and side.active.status is not None:
-        boosted_speed *= 1.5
+        if side.active.ability == 'unburden' and not side.active.item:
+            boosted_speed *= 2
+        elif side.active.ability == 'quickfeet' and side.active.status is not None:
+            boosted_speed *= 1.5
 
     if side.side_conditions[constants.TAILWIND]:
         boosted_speed *= 2
@@ -57,7 +62,7 @@ def get_effective_speed(state, side):
     if constants.PARALYZED == side.active.status and side.active.ability != 'quickfeet':
         boosted_speed *= 0.5
 
-    if any(vs in side.active.volatile_status for vs in ["quarkdrivespe", "protosynthesisspe"]):
+    if not SPEED_BOOSTING_VOLATILE_STATUSES.isdisjoint(side.active.volatile_status):
         boosted_speed *= 1.5
 
     return int(boosted_speed)
@@ -65,24 +70,29 @@ def get_effective_speed(state, side):
 
 def get_effective_priority(side, move, field):
     priority = move[constants.PRIORITY]
-    if side.active.ability == 'prankster' and move[constants.CATEGORY] == constants.STATUS:
-        priority += 1
-    elif side.active.ability == 'galewings' and (side.active.hp == side.active.maxhp) and ('flying' in move[constants.TYPE]):
-        priority += 1
-    elif side.active.ability == 'triage' and constants.HEAL in move[constants.FLAGS]:
-        priority += 3
-    elif field == constants.GRASSY_TERRAIN and move[constants.ID] == 'grassyglide':
+    if side.active.hooks.priority_ability:
+        if side.active.ability == 'prankster' and move[constants.CATEGORY] == constants.STATUS:
+            return priority + 1
+        elif side.active.ability == 'galewings' and (side.active.hp == side.active.maxhp) and ('flying' in move[constants.TYPE]):
+            return priority + 1
+        elif side.active.ability == 'triage' and constants.HEAL in move[constants.FLAGS]:
+            return priority + 3
+
+    if field == constants.GRASSY_TERRAIN and move[constants.ID] == 'grassyglide':
         priority += 1
 
     return priority
 
 
-def user_moves_first(state, user_move, opponent_move):
-    user_effective_speed = get_effective_speed(state, state.user)
-    opponent_effective_speed = get_effective_speed(state, state.opponent)
+def get_effective_speeds(state):
+    return get_effective_speed(state, state.user), get_effective_speed(state, state.opponent)
 
+
+def user_moves_first(state, user_move, opponent_move, effective_speeds=None):
+    # `effective_speeds` can be given if the result of `get_effective_speeds` for this state is already known
     # both users selected a switch
     if constants.SWITCH_STRING in user_move and constants.SWITCH_STRING in opponent_move:
+        user_effective_speed, opponent_effective_speed = effective_speeds or get_effective_speeds(state)
         return user_effective_speed > opponent_effective_speed
 
     # user selected a switch
@@ -101,6 +111,7 @@ def user_moves_first(state, user_move, opponent_move):
     opponent_priority = get_effective_priority(state.opponent, opponent_move, state.field)
 
     if user_priority == opponent_priority:
+        user_effective_speed, opponent_effective_speed = effective_speeds or get_effective_speeds(state)
         user_is_faster = user_effective_speed > opponent_effective_speed
         if state.trick_room:
             return not user_is_faster
@@ -130,36 +141,41 @@ def update_attacking_move(attacking_side, attacking_pokemon, defending_pokemon,
         terrain
     )
 
-    attacking_move = ability_modify_attack_being_used(
-        attacking_pokemon.ability,
-        attacking_move,
-        defending_move,
-        attacking_pokemon,
-        defending_pokemon,
-        first_move,
-        weather
-    )
+    # the effect hooks are None when the ability/item has no effect here
+    if attacking_pokemon.hooks.ability_modify_attack_being_used is not None:
+        attacking_move = ability_modify_attack_being_used(
+            attacking_pokemon.ability,
+            attacking_move,
+            defending_move,
+            attacking_pokemon,
+            defending_pokemon,
+            first_move,
+            weather
+        )
 
-    attacking_move = item_modify_attack_being_used(
-        attacking_pokemon.item,
-        attacking_move,
-        attacking_pokemon,
-        defending_pokemon
-    )
+    if attacking_pokemon.hooks.item_modify_attack_being_used is not None:
+        attacking_move = item_modify_attack_being_used(
+            attacking_pokemon.item,
+            attacking_move,
+            attacking_pokemon,
+            defending_pokemon
+        )
 
-    attacking_move = ability_modify_attack_against(
-        defending_pokemon.ability,
-        attacking_move,
-        attacking_pokemon,
-        defending_pokemon
-    )
+    if defending_pokemon.hooks.ability_modify_attack_against is not None:
+        attacking_move = ability_modify_attack_against(
+            defending_pokemon.ability,
+            attacking_move,
+            attacking_pokemon,
+            defending_pokemon
+        )
 
-    attacking_move = item_modify_attack_against(
-        defending_pokemon.item,
-        attacking_move,
-        attacking_pokemon,
-        defending_pokemon
-    )
+    if defending_pokemon.hooks.item_modify_attack_against is not None:
+        attacking_move = item_modify_attack_against(
+            defending_pokemon.item,
+            attacking_move,
+            attacking_pokemon,
+            defending_pokemon
+        )
 
     if constants.CHARGE in attacking_move[constants.FLAGS] and attacking_move[constants.ID] not in attacking_pokemon.volatile_status:
         attacking_move = attacking_move.copy()
@@ -171,7 +187,7 @@ def update_attacking_move(attacking_side, attacking_pokemon, defending_pokemon,
 
     if (
             constants.PROTECT in attacking_move[constants.FLAGS] and
-            any(vs in constants.PROTECT_VOLATILE_STATUSES for vs in defending_pokemon.volatile_status) and
+            not PROTECT_VOLATILE_STATUSES.isdisjoint(defending_pokemon.volatile_status) and
             not (attacking_pokemon.ability == 'unseenfist' and constants.CONTACT in attacking_move[constants.FLAGS])
     ):
         attacking_move = attacking_move.copy()
@@ -237,7 +253,7 @@ def get_state_instructions_from_move(
     active_weather = mutator.state.weather
 
     if cannot_use_move(attacking_pokemon, attacking_move):
-        attacking_move = lookup_move(MoveChoice(constants.DO_NOTHING_MOVE))
+        attacking_move = lookup_move(get_move_choice(constants.DO_NOTHING_MOVE))
 
     conditions = {
         constants.REFLECT: defending_side.side_conditions[constants.REFLECT],
@@ -267,14 +283,16 @@ def get_state_instructions_from_move(
 
     instructions = instruction_generator.get_instructions_from_flinched(mutator, attacker, instructions)
 
-    ability_before_move_instructions = ability_before_move(
-        attacking_pokemon.ability,
-        mutator.state,
-        attacker,
-        attacking_move,
-        attacking_pokemon,
-        defending_pokemon
-    )
+    ability_before_move_instructions = None
+    if attacking_pokemon.hooks.ability_before_move is not None:
+        ability_before_move_instructions = ability_before_move(
+            attacking_pokemon.ability,
+            mutator.state,
+            attacker,
+            attacking_move,
+            attacking_pokemon,
+            defending_pokemon
+        )
     if ability_before_move_instructions is not None and not instructions.frozen:
         mutator.apply(ability_before_move_instructions)
         instructions.instructions += ability_before_move_instructions
@@ -298,7 +316,9 @@ def get_state_instructions_from_move(
     else:
         move_status_target = defender
 
-    if attacking_move[constants.ID] in constants.HAZARD_CLEARING_MOVES:
+    attacking_move_record = move_records[attacking_move[constants.ID]]
+
+    if attacking_move_record.is_hazard_clearing:
         hazard_clearing_move = attacking_move
 
     # move is a damaging move
@@ -416,7 +436,7 @@ def get_state_instructions_from_move(
             temp_instructions += instruction_generator.get_instructions_from_boosts(mutator, boosts_target, boosts, boosts_chance, instruction_set)
         all_instructions = temp_instructions
 
-    if attacking_move[constants.ID] in constants.BOOST_RESET_MOVES:
+    if attacking_move_record.is_boost_reset:
         temp_instructions = []
         for instruction_set in all_instructions:
             temp_instructions += instruction_generator.get_instructions_from_boost_reset_moves(mutator, attacking_move, attacker, instruction_set)
@@ -476,11 +496,12 @@ def end_of_turn_triggered(user_move: MoveChoice, opponent_move: MoveChoice):
     return True
 
 
-def get_all_state_instructions(mutator, user_move_choice: MoveChoice, opponent_move_choice: MoveChoice):
+def get_all_state_instructions(mutator, user_move_choice: MoveChoice, opponent_move_choice: MoveChoice, effective_speeds=None):
+    # `effective_speeds` can be given when the caller has already calculated them for this state
     user_move = lookup_move(user_move_choice)
     opponent_move = lookup_move(opponent_move_choice)
 
-    bot_moves_first = user_moves_first(mutator.state, user_move, opponent_move)
+    bot_moves_first = user_moves_first(mutator.state, user_move, opponent_move, effective_speeds)
 
     instructions = get_pre_move_instructions(mutator, user_move_choice, opponent_move_choice)
 
@@ -495,10 +516,14 @@ def get_all_state_instructions(mutator, user_move_choice: MoveChoice, opponent_m
             all_instructions += get_state_instructions_from_move(mutator, user_move, opponent_move, constants.USER, constants.OPPONENT, False, instruction)
 
     if end_of_turn_triggered(user_move_choice, opponent_move_choice):
-        temp_instructions = []
+        # the outcomes share the instructions from before they diverged
+        # so the state is moved directly from one outcome to the next instead of going back to the start each time
+        applied_instructions = []
         for instruction_set in all_instructions:
-            temp_instructions += instruction_generator.get_end_of_turn_instructions(mutator, instruction_set, user_move, opponent_move, bot_moves_first)
-        all_instructions = temp_instructions
+            mutator.move_to(applied_instructions, instruction_set.instructions)
+            instruction_generator.apply_end_of_turn_instructions(mutator, instruction_set, user_move, opponent_move, bot_moves_first)
+            applied_instructions = instruction_set.instructions
+        mutator.reverse(applied_instructions)
 
     all_instructions = remove_duplicate_instructions(all_instructions)
 
@@ -4,7 +4,9 @@ import constants
 import logging
 
 from .damage_calculator import type_effectiveness_modifier
+from .move_records import move_records
 from .objects import MoveChoice, TransposeInstruction
+from .volatile_statuses import PROTECT_VOLATILE_STATUSES
 from .special_effects.abilities.on_switch_in import ability_on_switch_in
 from .special_effects.items.on_switch_in import item_on_switch_in
 from .special_effects.items.end_of_turn import item_end_of_turn
@@ -159,23 +161,24 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
         mutator.apply_one(remove_disabled_instruction)
         instruction_additions.append(remove_disabled_instruction)
 
-    if attacking_side.active.ability == 'regenerator' and attacking_side.active.hp:
-        hp_missing = attacking_side.active.maxhp - attacking_side.active.hp
-        regenerator_instruction = (
-            constants.MUTATOR_HEAL,
-            attacker,
-            int(min(1 / 3 * attacking_side.active.maxhp, hp_missing))
-        )
-        mutator.apply_one(regenerator_instruction)
-        instruction_additions.append(regenerator_instruction)
-    elif attacking_side.active.ability == 'naturalcure' and attacking_side.active.status is not None:
-        naturalcure_instruction = (
-            constants.MUTATOR_REMOVE_STATUS,
-            attacker,
-            attacking_side.active.status
-        )
-        mutator.apply_one(naturalcure_instruction)
-        instruction_additions.append(naturalcure_instruction)
+    if attacking_side.active.hooks.switch_out_ability:
+        if attacking_side.active.ability == 'regenerator' and attacking_side.active.hp:
+            hp_missing = attacking_side.active.maxhp - attacking_side.active.hp
+            regenerator_instruction = (
+                constants.MUTATOR_HEAL,
+                attacker,
+                int(min(1 / 3 * attacking_side.active.maxhp, hp_missing))
+            )
+            mutator.apply_one(regenerator_instruction)
+            instruction_additions.append(regenerator_instruction)
+        elif attacking_side.active.ability == 'naturalcure' and attacking_side.active.status is not None:
+            naturalcure_instruction = (
+                constants.MUTATOR_REMOVE_STATUS,
+                attacker,
+                attacking_side.active.status
+            )
+            mutator.apply_one(naturalcure_instruction)
+            instruction_additions.append(naturalcure_instruction)
 
     switch_instruction = (
         constants.MUTATOR_SWITCH,
@@ -250,28 +253,32 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
                 instruction_additions.append(toxic_spike_instruction)
 
     # account for switch-in abilities
-    ability_switch_in_instructions = ability_on_switch_in(
-        switch_pkmn.ability,
-        mutator.state,
-        attacker,
-        attacking_side.active,
-        opposite_side[attacker],
-        defending_side.active
-    )
+    ability_switch_in_instructions = None
+    if switch_pkmn.hooks.ability_on_switch_in is not None:
+        ability_switch_in_instructions = ability_on_switch_in(
+            switch_pkmn.ability,
+            mutator.state,
+            attacker,
+            attacking_side.active,
+            opposite_side[attacker],
+            defending_side.active
+        )
     if ability_switch_in_instructions is not None:
         for i in ability_switch_in_instructions:
             mutator.apply_one(i)
             instruction_additions.append(i)
 
     # account for switch-in items
-    item_switch_in_instructions = item_on_switch_in(
-        switch_pkmn.item,
-        mutator.state,
-        attacker,
-        attacking_side.active,
-        opposite_side[attacker],
-        defending_side.active
-    )
+    item_switch_in_instructions = None
+    if switch_pkmn.hooks.item_on_switch_in is not None:
+        item_switch_in_instructions = item_on_switch_in(
+            switch_pkmn.item,
+            mutator.state,
+            attacker,
+            attacking_side.active,
+            opposite_side[attacker],
+            defending_side.active
+        )
     if item_switch_in_instructions is not None:
         for i in item_switch_in_instructions:
             mutator.apply_one(i)
@@ -906,14 +913,22 @@ def get_instructions_from_attacker_recovery(mutator, attacker_string, move, inst
 
 
 def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move, bot_moves_first):
+    mutator.apply(instruction.instructions)
+    apply_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move, bot_moves_first)
+    mutator.reverse(instruction.instructions)
+
+    return [instruction]
+
+
+def apply_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move, bot_moves_first):
+    # the state must already have `instruction` applied
+    # the end-of-turn instructions are added to `instruction` and left applied to the state
     # determine which goes first
     if bot_moves_first:
         sides = [constants.USER, constants.OPPONENT]
     else:
         sides = [constants.OPPONENT, constants.USER]
 
-    mutator.apply(instruction.instructions)
-
     # weather damage - sand and hail
     for attacker in sides:
         side = get_side_from_state(mutator.state, attacker)
@@ -993,12 +1008,15 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
         pkmn = side.active
         defending_pkmn = defending_side.active
 
-        item_instruction = item_end_of_turn(side.active.item, mutator.state, attacker, pkmn, defender, defending_pkmn)
-        if item_instruction is not None:
-            mutator.apply_one(item_instruction)
-            instruction.add_instruction(item_instruction)
+        if pkmn.hooks.item_end_of_turn is not None:
+            item_instruction = item_end_of_turn(side.active.item, mutator.state, attacker, pkmn, defender, defending_pkmn)
+            if item_instruction is not None:
+                mutator.apply_one(item_instruction)
+                instruction.add_instruction(item_instruction)
 
-        ability_instruction = ability_end_of_turn(side.active.ability, mutator.state, attacker, pkmn, defender, defending_pkmn)
+        ability_instruction = None
+        if pkmn.hooks.ability_end_of_turn is not None:
+            ability_instruction = ability_end_of_turn(side.active.ability, mutator.state, attacker, pkmn, defender, defending_pkmn)
         if ability_instruction is not None:
             mutator.apply_one(ability_instruction)
             instruction.add_instruction(ability_instruction)
@@ -1089,7 +1107,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
         side = get_side_from_state(mutator.state, attacker)
         pkmn = side.active
 
-        if any(vs in constants.PROTECT_VOLATILE_STATUSES for vs in pkmn.volatile_status):
+        if not PROTECT_VOLATILE_STATUSES.isdisjoint(pkmn.volatile_status):
             if constants.PROTECT in pkmn.volatile_status:
                 volatile_status_to_remove = constants.PROTECT
             elif constants.BANEFUL_BUNKER in pkmn.volatile_status:
@@ -1178,7 +1196,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
         if (
             constants.SWITCH_STRING not in move and
             constants.DRAG not in other_move.get(constants.FLAGS, {}) and
-            move[constants.ID] not in constants.SWITCH_OUT_MOVES and
+            not move_records[move[constants.ID]].is_switch_out and
             (pkmn.item in constants.CHOICE_ITEMS or locking_move or pkmn.ability == 'gorillatactics')
         ):
             move_used = move[constants.ID]
@@ -1191,10 +1209,6 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 mutator.apply_one(disable_instruction)
                 instruction.add_instruction(disable_instruction)
 
-    mutator.reverse(instruction.instructions)
-
-    return [instruction]
-
 
 def get_instructions_from_drag(mutator, attacking_side_string, move_target, instruction):
     if instruction.frozen:
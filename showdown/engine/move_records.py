@@ -0,0 +1,110 @@
+import constants
+from data import all_move_json
+
+from .damage_calculator import pokemon_type_indicies
+
+
+CATEGORY_PHYSICAL = 0
+CATEGORY_SPECIAL = 1
+CATEGORY_STATUS = 2
+
+category_indicies = {
+    constants.PHYSICAL: CATEGORY_PHYSICAL,
+    constants.SPECIAL: CATEGORY_SPECIAL,
+    constants.STATUS: CATEGORY_STATUS,
+}
+
+
+def compile_move_flag_bits(move_json):
+    all_flags = sorted({flag for move in move_json.values() for flag in move[constants.FLAGS]})
+    return {flag: 1 << i for i, flag in enumerate(all_flags)}
+
+
+# every flag seen in the move data is given a bit
+move_flag_bits = compile_move_flag_bits(all_move_json)
+
+
+def flag_bit(flag):
+    return move_flag_bits.get(flag, 0)
+
+
+class MoveRecord(object):
+    """
+    A compiled, read-only view of a move from `all_move_json`
+
+    Values that special-effects can change during a search (basePower, category, type, flags, ...)
+    must still be read from the move dictionary being used. The derived facts on a record only
+    depend on the id of the move so they hold for any modified copy of it
+    """
+    __slots__ = (
+        'id',
+        'base_power',
+        'accuracy',
+        'category',
+        'type',
+        'priority',
+        'target',
+        'pp',
+        'flags',
+        'is_damaging',
+        'makes_contact',
+        'is_sound',
+        'is_switch_out',
+        'is_hazard_clearing',
+        'is_boost_reset',
+        'thaws_user',
+        'thaws_target',
+        'move_dict',
+    )
+
+    def __init__(self, move_dict):
+        self.id = move_dict[constants.ID]
+        self.base_power = move_dict[constants.BASE_POWER]
+        self.accuracy = move_dict[constants.ACCURACY]
+        self.category = category_indicies[move_dict[constants.CATEGORY]]
+        self.type = pokemon_type_indicies[move_dict[constants.TYPE]]
+        self.priority = move_dict[constants.PRIORITY]
+        self.target = move_dict[constants.TARGET]
+        self.pp = move_dict.get(constants.PP)
+
+        self.flags = 0
+        for flag in move_dict[constants.FLAGS]:
+            self.flags |= move_flag_bits[flag]
+
+        self.is_damaging = self.category != CATEGORY_STATUS
+        self.makes_contact = self.has_flag(constants.CONTACT)
+        self.is_sound = self.has_flag(constants.SOUND)
+        self.is_switch_out = self.id in constants.SWITCH_OUT_MOVES
+        self.is_hazard_clearing = self.id in constants.HAZARD_CLEARING_MOVES
+        self.is_boost_reset = self.id in constants.BOOST_RESET_MOVES
+        self.thaws_user = self.id in constants.THAW_IF_USES
+        self.thaws_target = self.id in constants.THAW_IF_HIT_BY
+
+        # the dictionary form is kept for anything that needs the full move
+        self.move_dict = move_dict
+
+    def has_flag(self, flag):
+        bit = flag_bit(flag)
+        return bit != 0 and self.flags & bit == bit
+
+    def __repr__(self):
+        return "MoveRecord({})".format(self.id)
+
+
+def compile_move_records(move_json):
+    return {move_id: MoveRecord(move) for move_id, move in move_json.items()}
+
+
+move_records = compile_move_records(all_move_json)
+
+
+def recompile_move_records():
+    # must be called after `all_move_json` is modified (i.e. by `apply_mods`)
+    # the lookups are updated in-place so that existing references to them stay valid
+    new_flag_bits = compile_move_flag_bits(all_move_json)
+    move_flag_bits.clear()
+    move_flag_bits.update(new_flag_bits)
+
+    new_records = compile_move_records(all_move_json)
+    move_records.clear()
+    move_records.update(new_records)
@@ -1,9 +1,14 @@
 from collections import defaultdict
+from collections.abc import MutableMapping
 from copy import copy
 from dataclasses import dataclass
 
 import constants
 from data import all_move_json
+from showdown.engine.evaluate import evaluate
+from showdown.engine.evaluate import IncrementalEvaluation
+from showdown.engine.special_effects.effect_hooks import get_effect_hooks
+from showdown.engine.volatile_statuses import FORCED_MOVE_VOLATILE_STATUSES
 
 
 boost_multiplier_lookup = {
@@ -29,6 +34,99 @@ class MoveChoice:
     is_switch: bool = False
     terastallize: bool = False
 
+    def __post_init__(self):
+        # choices are hashed every time they are used as a key in a payoff matrix
+        # the hash is calculated once instead of by the generated `__hash__`
+        object.__setattr__(self, '_hash', hash((self.id, self.is_switch, self.terastallize)))
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # string hashes differ between processes so the cached hash is never pickled
+        return get_move_choice, (self.id, self.is_switch, self.terastallize)
+
+
+# the engine interns its choices so the same options are shared by every node of a search
+_move_choices = dict()
+
+
+def get_move_choice(identifier, is_switch=False, terastallize=False):
+    key = (identifier, is_switch, terastallize)
+    try:
+        return _move_choices[key]
+    except KeyError:
+        move_choice = MoveChoice(identifier, is_switch=is_switch, terastallize=terastallize)
+        _move_choices[key] = move_choice
+        return move_choice
+
+
+class MoveOverlay(MutableMapping):
+    """
+    A move that is a read-only base move (i.e. an entry in `all_move_json`) plus a small dictionary of overrides
+
+    Special-effects follow the pattern of `attacking_move = attacking_move.copy()` followed by changing a key.
+    Copying an overlay only copies the overrides so the base move is never copied or modified.
+    Nested values (flags, boosts, secondary, ...) belong to the base move and must be copied before being changed
+    """
+    __slots__ = ('base', 'overrides')
+
+    _DELETED = object()
+
+    def __init__(self, base, overrides=None):
+        self.base = base
+        self.overrides = overrides if overrides is not None else {}
+
+    def __getitem__(self, key):
+        try:
+            value = self.overrides[key]
+        except KeyError:
+            return self.base[key]
+        if value is self._DELETED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.overrides.get(key, default)
+        if key not in self.overrides:
+            return self.base.get(key, default)
+        if value is self._DELETED:
+            return default
+        return value
+
+    def __contains__(self, key):
+        if key in self.overrides:
+            return self.overrides[key] is not self._DELETED
+        return key in self.base
+
+    def __setitem__(self, key, value):
+        self.overrides[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.overrides[key] = self._DELETED
+
+    def __iter__(self):
+        for key in self.base:
+            if key in self:
+                yield key
+        for key, value in self.overrides.items():
+            if key not in self.base and value is not self._DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        return MoveOverlay(self.base, self.overrides.copy())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
 
 class State(object):
     __slots__ = ('user', 'opponent', 'weather', 'field', 'trick_room', 'tera_allowed')
@@ -44,18 +142,18 @@ class State(object):
     def get_self_options(self, force_switch):
         forced_move = self.user.active.forced_move()
         if forced_move:
-            return [MoveChoice(forced_move)]
+            return [get_move_choice(forced_move)]
 
         if force_switch:
             possible_moves = []
         else:
             possible_moves = [
-                MoveChoice(m[constants.ID]) for m in self.user.active.moves if not m[constants.DISABLED]
+                get_move_choice(m[constants.ID]) for m in self.user.active.moves if not m[constants.DISABLED]
             ]
 
         if not self.user.used_tera and self.tera_allowed:
             for mv in possible_moves[:]:
-                possible_moves.append(MoveChoice(mv.id, terastallize=True))
+                possible_moves.append(get_move_choice(mv.id, terastallize=True))
 
         if self.user.trapped(self.opponent.active):
             possible_switches = []
@@ -67,18 +165,18 @@ class State(object):
     def get_opponent_options(self):
         forced_move = self.opponent.active.forced_move()
         if forced_move:
-            return [MoveChoice(forced_move)]
+            return [get_move_choice(forced_move)]
 
         if self.opponent.active.hp <= 0:
             possible_moves = []
         else:
             possible_moves = [
-                MoveChoice(m[constants.ID]) for m in self.opponent.active.moves if not m[constants.DISABLED]
+                get_move_choice(m[constants.ID]) for m in self.opponent.active.moves if not m[constants.DISABLED]
             ]
 
         if not self.opponent.used_tera and self.tera_allowed:
             for mv in possible_moves[:]:
-                possible_moves.append(MoveChoice(mv.id, terastallize=True))
+                possible_moves.append(get_move_choice(mv.id, terastallize=True))
 
         if self.opponent.trapped(self.user.active):
             possible_switches = []
@@ -93,25 +191,25 @@ class State(object):
 
         # double faint or team preview
         if force_switch and wait:
-            user_options = self.get_self_options(force_switch) or [MoveChoice(id=constants.DO_NOTHING_MOVE)]
-            opponent_options = self.get_opponent_options() or [MoveChoice(id=constants.DO_NOTHING_MOVE)]
+            user_options = self.get_self_options(force_switch) or [get_move_choice(constants.DO_NOTHING_MOVE)]
+            opponent_options = self.get_opponent_options() or [get_move_choice(constants.DO_NOTHING_MOVE)]
             return user_options, opponent_options
 
         if force_switch:
-            opponent_options = [MoveChoice(id=constants.DO_NOTHING_MOVE)]
+            opponent_options = [get_move_choice(constants.DO_NOTHING_MOVE)]
         else:
             opponent_options = self.get_opponent_options()
 
         if wait:
-            user_options = [MoveChoice(id=constants.DO_NOTHING_MOVE)]
+            user_options = [get_move_choice(constants.DO_NOTHING_MOVE)]
         else:
             user_options = self.get_self_options(force_switch)
 
         if not user_options:
-            user_options = [MoveChoice(id=constants.DO_NOTHING_MOVE)]
+            user_options = [get_move_choice(constants.DO_NOTHING_MOVE)]
 
         if not opponent_options:
-            opponent_options = [MoveChoice(id=constants.DO_NOTHING_MOVE)]
+            opponent_options = [get_move_choice(constants.DO_NOTHING_MOVE)]
 
         return user_options, opponent_options
 
@@ -165,7 +263,7 @@ class Side(object):
         switches = []
         for pkmn_name, pkmn in self.reserve.items():
             if pkmn.hp > 0:
-                switches.append(MoveChoice(id=pkmn_name, is_switch=True))
+                switches.append(get_move_choice(pkmn_name, is_switch=True))
         return switches
 
     def trapped(self, opponent_active):
@@ -211,8 +309,9 @@ class Pokemon(object):
         'types',
         'hp',
         'maxhp',
-        'ability',
-        'item',
+        '_ability',
+        '_item',
+        'hooks',
         'attack',
         'defense',
         'special_attack',
@@ -269,8 +368,9 @@ class Pokemon(object):
         self.types = types
         self.hp = hp
         self.maxhp = maxhp
-        self.ability = ability
-        self.item = item
+        self._ability = ability
+        self._item = item
+        self.hooks = get_effect_hooks(ability, item)
         self.attack = attack
         self.defense = defense
         self.special_attack = special_attack
@@ -295,6 +395,25 @@ class Pokemon(object):
         # it is calculated here to save time during evaluation
         self.burn_multiplier = self.calculate_burn_multiplier()
 
+    @property
+    def ability(self):
+        return self._ability
+
+    @ability.setter
+    def ability(self, value):
+        # the effect hooks are rebound whenever the ability or item changes
+        self._ability = value
+        self.hooks = get_effect_hooks(value, self._item)
+
+    @property
+    def item(self):
+        return self._item
+
+    @item.setter
+    def item(self, value):
+        self._item = value
+        self.hooks = get_effect_hooks(self._ability, value)
+
     def calculate_burn_multiplier(self):
         # this will result in a positive evaluation for a burned pokemon
         if self.ability in ['guts', 'marvelscale', 'quickfeet']:
@@ -339,7 +458,9 @@ class Pokemon(object):
         raise ValueError("{} is not a valid boost".format(boost_string))
 
     def forced_move(self):
-        if "phantomforce" in self.volatile_status:
+        if FORCED_MOVE_VOLATILE_STATUSES.isdisjoint(self.volatile_status):
+            return None
+        elif "phantomforce" in self.volatile_status:
             return "phantomforce"
         elif "shadowforce" in self.volatile_status:
             return "shadowforce"
@@ -582,9 +703,24 @@ class StateMutator:
             method = self.reverse_instructions[instruction[0]]
             method(*instruction[1:])
 
+    def move_to(self, applied_instructions, instructions):
+        # changes the state from having `applied_instructions` applied to having `instructions` applied
+        # sibling outcomes share the instructions from before they diverged
+        # so only the instructions after the divergence point are reversed and applied
+        shared = 0
+        shared_limit = min(len(applied_instructions), len(instructions))
+        while shared < shared_limit and applied_instructions[shared] is instructions[shared]:
+            shared += 1
+
+        self.reverse(applied_instructions[shared:])
+        self.apply(instructions[shared:])
+
     def get_side(self, side):
         return getattr(self.state, side)
 
+    def evaluate(self):
+        return evaluate(self.state)
+
     def disable_move(self, side, move_name):
         side = self.get_side(side)
         try:
@@ -791,3 +927,84 @@ class StateMutator:
         side.active.terastallized = False
         side.active.types = previous_types
         side.used_tera = False
+
+
+class IncrementalStateMutator(StateMutator):
+    """
+    A StateMutator that keeps an `IncrementalEvaluation` of its state up to date as instructions
+    are applied and reversed, so `evaluate()` does not need to rescan both teams
+
+    The state must only be changed through this object once it is created.
+    `reset_evaluation()` must be called if the state is changed some other way.
+    With `debug=True` every evaluation is checked against the full `evaluate`
+    """
+
+    def __init__(self, state, debug=False):
+        super().__init__(state)
+        self.debug = debug
+        self.reset_evaluation()
+
+    def reset_evaluation(self):
+        self.evaluation = IncrementalEvaluation(self.state)
+        self._pokemon_changed = self.evaluation.changed_pokemon.add
+
+    def evaluate(self):
+        score = self.evaluation.score()
+        if self.debug:
+            full_score = evaluate(self.state)
+            assert score == full_score, "Incremental evaluation {} does not match evaluate: {}".format(score, full_score)
+        return score
+
+    def _active_changed(self, side):
+        self._pokemon_changed(getattr(self.state, side).active)
+
+    def apply_volatile_status(self, side, volatile_status):
+        super().apply_volatile_status(side, volatile_status)
+        self._active_changed(side)
+
+    def remove_volatile_status(self, side, volatile_status):
+        super().remove_volatile_status(side, volatile_status)
+        self._active_changed(side)
+
+    # damage and heal are the most common instructions so they do not go through the parent's methods
+    def damage(self, side, amount):
+        pkmn = getattr(self.state, side).active
+        pkmn.hp -= amount
+        self._pokemon_changed(pkmn)
+
+    def heal(self, side, amount):
+        pkmn = getattr(self.state, side).active
+        pkmn.hp += amount
+        self._pokemon_changed(pkmn)
+
+    def boost(self, side, stat, amount):
+        # `unboost` goes through this as well
+        super().boost(side, stat, amount)
+        self._active_changed(side)
+
+    def apply_status(self, side, status):
+        # `remove_status` goes through this as well
+        super().apply_status(side, status)
+        self._active_changed(side)
+
+    def side_start(self, side, effect, amount):
+        # `reverse_side_end` goes through this as well
+        super().side_start(side, effect, amount)
+        self.evaluation.side_condition_changed(side, effect, amount)
+
+    def reverse_side_start(self, side, effect, amount):
+        super().reverse_side_start(side, effect, amount)
+        self.evaluation.side_condition_changed(side, effect, -1*amount)
+
+    def side_end(self, side, effect, amount):
+        super().side_end(side, effect, amount)
+        self.evaluation.side_condition_changed(side, effect, -1*amount)
+
+    def change_stats(self, side, new_stats, old_stats):
+        # maxhp is part of a pokemon's score
+        super().change_stats(side, new_stats, old_stats)
+        self._active_changed(side)
+
+    def reverse_change_stats(self, side, new_stats, old_stats):
+        super().reverse_change_stats(side, new_stats, old_stats)
+        self._active_changed(side)
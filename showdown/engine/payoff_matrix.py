@@ -0,0 +1,175 @@
+import numpy as np
+
+
+def dominated_rows(scores):
+    """
+    A mask of the rows that are strictly worse than some other row in every column
+    Every comparison with NaN is False, so a row with a NaN is never dominated and never dominates another row
+    """
+    # element [k, i] is whether row k is greater than row i in every column
+    with np.errstate(invalid='ignore'):
+        return np.all(scores[:, None, :] > scores[None, :, :], axis=2).any(axis=0)
+
+
+def dominated_columns(scores):
+    """
+    A mask of the opponent's columns that are strictly worse for the opponent than some other column in every row
+    The opponent minimizes the bot's score, so a dominated column is greater in every row than another column
+    As with rows, a column with a NaN is never dominated and never dominates another column
+    """
+    # element [k, j] is whether column k is less than column j in every row
+    with np.errstate(invalid='ignore'):
+        return np.all(scores[:, :, None] < scores[:, None, :], axis=0).any(axis=0)
+
+
+class PayoffMatrix:
+    """
+    The bot's score for every pair of options, with the bot's options as the rows and the opponent's as the columns
+
+    A cell is NaN when it was not searched (i.e. it was pruned) or when its row or column does not exist
+    in every battle that the matrix was made from. NaN cells are ignored
+    """
+    __slots__ = ('scores', 'rows', 'columns')
+
+    def __init__(self, scores, rows, columns):
+        self.scores = scores
+        self.rows = rows
+        self.columns = columns
+
+    @classmethod
+    def empty(cls, rows, columns):
+        rows = list(dict.fromkeys(rows))
+        columns = list(dict.fromkeys(columns))
+        return cls(np.full((len(rows), len(columns)), np.nan), rows, columns)
+
+    @classmethod
+    def from_dict(cls, score_lookup):
+        rows = list(dict.fromkeys(k[0] for k in score_lookup))
+        columns = list(dict.fromkeys(k[1] for k in score_lookup))
+        row_indices = {r: i for i, r in enumerate(rows)}
+        column_indices = {c: j for j, c in enumerate(columns)}
+
+        scores = np.full((len(rows), len(columns)), np.nan)
+        for (row, column), score in score_lookup.items():
+            scores[row_indices[row], column_indices[column]] = score
+
+        return cls(scores, rows, columns)
+
+    @classmethod
+    def concatenate(cls, matrices):
+        """
+        Joins the columns of several matrices together
+        A column is labelled with the index of its matrix and its label in that matrix, so columns never collide.
+        The rows are every row in any of the matrices, and a row that is missing from a matrix is NaN in its columns
+        """
+        rows = list(dict.fromkeys(r for m in matrices for r in m.rows))
+        row_indices = {r: i for i, r in enumerate(rows)}
+        columns = [(i, c) for i, m in enumerate(matrices) for c in m.columns]
+
+        scores = np.full((len(rows), len(columns)), np.nan)
+        column_offset = 0
+        for m in matrices:
+            row_positions = [row_indices[r] for r in m.rows]
+            scores[row_positions, column_offset:column_offset + len(m.columns)] = m.scores
+            column_offset += len(m.columns)
+
+        return cls(scores, rows, columns)
+
+    def to_dict(self):
+        score_lookup = dict()
+        for i, row in enumerate(self.rows):
+            for j, column in enumerate(self.columns):
+                score = self.scores[i, j]
+                if not np.isnan(score):
+                    score_lookup[(row, column)] = float(score)
+        return score_lookup
+
+    @property
+    def shape(self):
+        return self.scores.shape
+
+    def is_empty(self):
+        return not self.rows or not self.columns
+
+    def select_rows(self, rows):
+        row_indices = {r: i for i, r in enumerate(self.rows)}
+        return PayoffMatrix(self.scores[[row_indices[r] for r in rows]], list(rows), self.columns)
+
+    def select_columns(self, mask):
+        return PayoffMatrix(self.scores[:, mask], self.rows, [c for c, keep in zip(self.columns, mask) if keep])
+
+    def worst_cases(self):
+        # the lowest score in each row ignoring NaNs, or -inf for a row that is all NaN
+        worst_cases = np.fmin.reduce(self.scores, axis=1)
+        all_nan = np.isnan(worst_cases)
+        if all_nan.any():
+            worst_cases = np.where(all_nan, -np.inf, worst_cases)
+        return worst_cases
+
+    def maximin(self):
+        """
+        Returns the (row, column) pair of the row with the best worst-case and its worst-case column, and their score
+        Ties go to the first row and column
+        """
+        row_index = int(np.argmax(self.worst_cases()))
+        column_index = int(np.nanargmin(self.scores[row_index]))
+        return (self.rows[row_index], self.columns[column_index]), float(self.scores[row_index, column_index])
+
+    def remove_guaranteed_opponent_moves(self):
+        """
+        Removes the opponent's columns that do not give the bot a choice, i.e. every row that was searched
+        has the same score as the first row. The matrix is unchanged if either player has only one option.
+
+        For example - if the bot has 1 pokemon left, the opponent is faster, and can kill your active pokemon
+        with move X then move X for the opponent will be removed.
+        The bot behaves much better when it cannot see these types of decisions
+        """
+        if len(self.rows) == 1 or len(self.columns) == 1:
+            return self
+
+        first_row = self.scores[0]
+        rest = self.scores[1:]
+        with np.errstate(invalid='ignore'):
+            bot_has_a_choice = ((rest != first_row) & ~np.isnan(rest)).any(axis=0)
+
+        return self.select_columns(bot_has_a_choice)
+
+    def dominated_rows(self):
+        return dominated_rows(self.scores)
+
+    def dominated_columns(self):
+        return dominated_columns(self.scores)
+
+    def remove_dominated(self, rows=True, columns=True):
+        """
+        Removes strictly dominated rows and/or columns until none are left
+        Removing one can make another dominated. The maximin and the equilibria of the matrix are unchanged
+        """
+        payoff_matrix = self
+        while True:
+            kept_rows = np.ones(len(payoff_matrix.rows), dtype=bool)
+            kept_columns = np.ones(len(payoff_matrix.columns), dtype=bool)
+            if rows:
+                kept_rows = ~payoff_matrix.dominated_rows()
+            if columns:
+                kept_columns = ~payoff_matrix.dominated_columns()
+            if kept_rows.all() and kept_columns.all():
+                return payoff_matrix
+
+            payoff_matrix = PayoffMatrix(
+                payoff_matrix.scores[kept_rows][:, kept_columns],
+                [r for r, keep in zip(payoff_matrix.rows, kept_rows) if keep],
+                [c for c, keep in zip(payoff_matrix.columns, kept_columns) if keep]
+            )
+
+    def __eq__(self, other):
+        if not isinstance(other, PayoffMatrix):
+            return NotImplemented
+        return (
+            self.rows == other.rows and
+            self.columns == other.columns and
+            np.array_equal(self.scores, other.scores, equal_nan=True)
+        )
+
+    def __repr__(self):
+        return "PayoffMatrix({})".format(self.to_dict())
@@ -0,0 +1,150 @@
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from .damage_calculator import damage_cache
+
+
+TIMERS = ('instruction_generation', 'mutation', 'evaluation', 'solving')
+
+
+class SearchStats:
+    """
+    Counters and timers for searching with `get_payoff_matrix`
+
+    The engine only updates them while `enabled` is True, so a search that is not being measured only pays
+    for one check per pair of options. Measuring the time of each step adds to the time of the search
+    """
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.searches = 0
+        self.nodes_by_depth = defaultdict(lambda: 0)
+        self.transitions = 0
+        self.outcomes = 0
+        self.max_outcomes = 0
+        self.pruned = 0
+        self.damage_cache_hits = 0
+        self.damage_cache_misses = 0
+        self.seconds = dict.fromkeys(TIMERS, 0.0)
+        self.seconds['search'] = 0.0
+        self._lap_start = 0.0
+
+    def start_lap(self):
+        self._lap_start = time.perf_counter()
+
+    def lap(self, name):
+        # adds the time since the last lap to `name`
+        now = time.perf_counter()
+        self.seconds[name] += now - self._lap_start
+        self._lap_start = now
+
+    def record_transition(self, outcomes):
+        # one pair of options and the number of chance outcomes that it can have
+        self.transitions += 1
+        self.outcomes += outcomes
+        if outcomes > self.max_outcomes:
+            self.max_outcomes = outcomes
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def summary(self):
+        return {
+            'searches': self.searches,
+            'nodes_by_depth': dict(self.nodes_by_depth),
+            'transitions': self.transitions,
+            'outcomes': self.outcomes,
+            'max_outcomes': self.max_outcomes,
+            'outcomes_per_transition': round(self.outcomes / self.transitions, 3) if self.transitions else 0,
+            'pruned': self.pruned,
+            'damage_cache_hits': self.damage_cache_hits,
+            'damage_cache_misses': self.damage_cache_misses,
+            'seconds': {k: round(v, 6) for k, v in self.seconds.items()},
+        }
+
+    def merge(self, summary):
+        # adds the summary of a search that was measured somewhere else (e.g. a search worker)
+        self.searches += summary['searches']
+        for depth, nodes in summary['nodes_by_depth'].items():
+            self.nodes_by_depth[depth] += nodes
+        self.transitions += summary['transitions']
+        self.outcomes += summary['outcomes']
+        self.max_outcomes = max(self.max_outcomes, summary['max_outcomes'])
+        self.pruned += summary['pruned']
+        self.damage_cache_hits += summary['damage_cache_hits']
+        self.damage_cache_misses += summary['damage_cache_misses']
+        for name, seconds in summary['seconds'].items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+
+# each thread has its own stats because several battles' decisions can be searched at the same time
+_local = threading.local()
+
+
+def get_search_stats():
+    """
+    The stats that the engine updates during a search on this thread
+    """
+    stats = getattr(_local, 'search_stats', None)
+    if stats is None:
+        stats = _local.search_stats = SearchStats()
+    return stats
+
+
+def get_decision_stats():
+    """
+    Everything measured for the decision being made on this thread, which may be several searches in several processes
+    Outside of `measure_decision` these are disabled
+    """
+    stats = getattr(_local, 'decision_stats', None)
+    if stats is None:
+        stats = _local.decision_stats = SearchStats()
+    return stats
+
+
+@contextmanager
+def measure_decision(enabled):
+    """
+    Gives the decision made in this block its own stats, which are enabled by the SEARCH_STATS setting
+    """
+    stats = SearchStats()
+    stats.enabled = enabled
+    _local.decision_stats = stats
+    try:
+        yield stats
+    finally:
+        _local.decision_stats = None
+
+
+@contextmanager
+def measure_search(enabled):
+    """
+    Measures the searches in this block with this thread's search stats if `enabled`
+    The damage cache's hits and misses during the block are included
+    """
+    search_stats = get_search_stats()
+    search_stats.reset()
+    search_stats.enabled = enabled
+    hits, misses = damage_cache.hits, damage_cache.misses
+    start = time.perf_counter()
+    try:
+        yield search_stats
+    finally:
+        search_stats.enabled = False
+        search_stats.searches += 1
+        search_stats.seconds['search'] += time.perf_counter() - start
+        search_stats.damage_cache_hits += damage_cache.hits - hits
+        search_stats.damage_cache_misses += damage_cache.misses - misses
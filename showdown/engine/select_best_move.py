@@ -1,59 +1,72 @@
-import math
-from collections import defaultdict
+import threading
+
+import numpy as np
 
 import constants
 
-from .evaluate import evaluate
+from .payoff_matrix import PayoffMatrix
 from .find_state_instructions import get_all_state_instructions
+from .find_state_instructions import get_effective_speeds
+from .search_stats import get_search_stats
 
 
 WON_BATTLE = 100
 
 
-def remove_guaranteed_opponent_moves(score_lookup):
-    """This method removes enemy moves from the score-lookup that do not give the bot a choice.
-       For example - if the bot has 1 pokemon left, the opponent is faster, and can kill your active pokemon with move X
-       then move X for the opponent will be removed from the score_lookup
+class DominanceStats:
+    """
+    Counts the options that `remove_dominated_options` has removed since it was last reset
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.rows = 0
+        self.rows_removed = 0
+        self.columns = 0
+        self.columns_removed = 0
+
+    def record(self, before, after):
+        self.nodes += 1
+        self.rows += len(before.rows)
+        self.rows_removed += len(before.rows) - len(after.rows)
+        self.columns += len(before.columns)
+        self.columns_removed += len(before.columns) - len(after.columns)
+
+    def info(self):
+        return {
+            'nodes': self.nodes,
+            'rows_removed': "{}/{}".format(self.rows_removed, self.rows),
+            'columns_removed': "{}/{}".format(self.columns_removed, self.columns),
+        }
 
-       The bot behaves much better when it cannot see these types of decisions"""
-    move_combinations = list(score_lookup.keys())
-    if len(set(k[0] for k in move_combinations)) == 1:
-        return score_lookup
-    elif len(set(k[1] for k in move_combinations)) == 1:
-        return score_lookup
 
-    # find the opponent's moves where the bot has a choice
-    opponent_move_scores = dict()
-    opponent_decisions = set()
-    for k, score in score_lookup.items():
-        opponent_move = k[1]
-        if opponent_move not in opponent_move_scores:
-            opponent_move_scores[opponent_move] = score
-        elif opponent_move in opponent_move_scores and score != opponent_move_scores[opponent_move] and not math.isnan(score):
-            opponent_decisions.add(opponent_move)
+_local = threading.local()
 
-    # re-create score_lookup with only the opponent's move acquired above
-    new_opponent_decisions = dict()
-    for k, v in score_lookup.items():
-        if k[1] in opponent_decisions:
-            new_opponent_decisions[k] = v
 
-    return new_opponent_decisions
+def get_dominance_stats():
+    # each thread has its own because several battles' decisions can be searched at the same time
+    stats = getattr(_local, 'dominance_stats', None)
+    if stats is None:
+        stats = _local.dominance_stats = DominanceStats()
+    return stats
 
 
-def pick_safest(score_lookup, remove_guaranteed=False):
-    modified_score_lookup = score_lookup
+def pick_safest(payoff_matrix, remove_guaranteed=False):
+    """
+    Returns the (bot option, opponent option) pair with the bot's best worst-case and that worst-case's score
+    `remove_guaranteed` removes the opponent's options where the bot does not have a choice before picking
+    """
+    if isinstance(payoff_matrix, dict):
+        payoff_matrix = PayoffMatrix.from_dict(payoff_matrix)
+
     if remove_guaranteed:
-        modified_score_lookup = remove_guaranteed_opponent_moves(score_lookup)
-        if not modified_score_lookup:
-            modified_score_lookup = score_lookup
-    worst_case = defaultdict(lambda: (tuple(), float('inf')))
-    for move_pair, result in modified_score_lookup.items():
-        if worst_case[move_pair[0]][1] > result:
-            worst_case[move_pair[0]] = move_pair, result
+        modified_payoff_matrix = payoff_matrix.remove_guaranteed_opponent_moves()
+        if not modified_payoff_matrix.is_empty():
+            payoff_matrix = modified_payoff_matrix
 
-    safest = max(worst_case, key=lambda x: worst_case[x][1])
-    return worst_case[safest]
+    return payoff_matrix.maximin()
 
 
 def move_item_to_front_of_list(l, item):
@@ -64,19 +77,44 @@ def move_item_to_front_of_list(l, item):
     return [l[i] for i in all_indicies]
 
 
-def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=True):
+def remove_dominated_options(mutator, user_options, opponent_options, remove_user_options=True):
+    """
+    Removes the options that are strictly dominated when looking one turn ahead
+    A one turn search is cheap compared to searching every pair of options deeper,
+    but an option that is dominated after one turn is not always dominated after more
+    """
+    if len(user_options) == 1 and len(opponent_options) == 1:
+        return user_options, opponent_options
+
+    shallow_payoff_matrix = get_payoff_matrix(mutator, user_options, opponent_options, depth=1, prune=False)
+    payoff_matrix = shallow_payoff_matrix.remove_dominated(rows=remove_user_options)
+    get_dominance_stats().record(shallow_payoff_matrix, payoff_matrix)
+    return payoff_matrix.rows, payoff_matrix.columns
+
+
+def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=True, eliminate_dominated=False):
     """
     :param mutator: a StateMutator object representing the state of the battle
     :param user_options: options for the bot
     :param opponent_options: options for the opponent
     :param depth: the remaining depth before the state is evaluated
     :param prune: specify whether or not to prune the tree
-    :return: a dictionary representing the potential move combinations and their associated scores
+    :param eliminate_dominated: remove the options that are dominated after one turn at every node below this one
+    :return: a PayoffMatrix of the scores of every pair of options. Pruned pairs are NaN
     """
+    stats = get_search_stats()
+    if not stats.enabled:
+        stats = None
+    if stats is not None:
+        stats.nodes_by_depth[depth] += 1
 
     winner = mutator.state.battle_is_finished()
     if winner:
-        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate(mutator.state) + WON_BATTLE*depth*winner}
+        return PayoffMatrix(
+            np.array([[mutator.evaluate() + WON_BATTLE*depth*winner]]),
+            [constants.DO_NOTHING_MOVE],
+            [constants.DO_NOTHING_MOVE]
+        )
 
     depth -= 1
 
@@ -84,41 +122,88 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
     # this is a special case in a random battle where the opponent's pokemon has fainted, but the opponent still
     # has reserves left that are unseen
     if opponent_options == [constants.DO_NOTHING_MOVE] and mutator.state.opponent.active.hp == 0:
-        return {(user_option, constants.DO_NOTHING_MOVE): evaluate(mutator.state) for user_option in user_options}
+        payoff_matrix = PayoffMatrix.empty(user_options, [constants.DO_NOTHING_MOVE])
+        payoff_matrix.scores[:] = mutator.evaluate()
+        return payoff_matrix
 
-    state_scores = dict()
+    # the scores start as NaN so that the pairs that are pruned are left as NaN
+    payoff_matrix = PayoffMatrix.empty(user_options, opponent_options)
+    state_scores = payoff_matrix.scores
+    row_indices = {o: i for i, o in enumerate(payoff_matrix.rows)}
+    column_indices = {o: j for j, o in enumerate(payoff_matrix.columns)}
+
+    # the state is the same at the start of every move pair so the turn order only needs the speeds once
+    effective_speeds = get_effective_speeds(mutator.state)
 
     best_score = float('-inf')
-    for i, user_move in enumerate(user_options):
+    for user_move in user_options:
+        row = row_indices[user_move]
         worst_score_for_this_row = float('inf')
         skip = False
 
         # opponent_options can change during the loop
         # using opponent_options[:] makes a copy when iterating to ensure no funny-business
-        for j, opponent_move in enumerate(opponent_options[:]):
+        for opponent_move in opponent_options[:]:
             if skip:
-                state_scores[(user_move, opponent_move)] = float('nan')
+                if stats is not None:
+                    stats.pruned += 1
                 continue
 
             score = 0
-            state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
+            if stats is not None:
+                stats.start_lap()
+            state_instructions = get_all_state_instructions(mutator, user_move, opponent_move, effective_speeds)
+            if stats is not None:
+                stats.lap('instruction_generation')
+                stats.record_transition(len(state_instructions))
+
+            # the state is moved directly from one outcome to the next
+            applied_instructions = []
             if depth == 0:
                 for instructions in state_instructions:
-                    mutator.apply(instructions.instructions)
-                    t_score = evaluate(mutator.state)
+                    mutator.move_to(applied_instructions, instructions.instructions)
+                    applied_instructions = instructions.instructions
+                    if stats is not None:
+                        stats.lap('mutation')
+                    t_score = mutator.evaluate()
+                    if stats is not None:
+                        stats.lap('evaluation')
                     score += (t_score * instructions.percentage)
-                    mutator.reverse(instructions.instructions)
 
             else:
                 for instructions in state_instructions:
                     this_percentage = instructions.percentage
-                    mutator.apply(instructions.instructions)
+                    mutator.move_to(applied_instructions, instructions.instructions)
+                    applied_instructions = instructions.instructions
+                    if stats is not None:
+                        stats.lap('mutation')
                     next_turn_user_options, next_turn_opponent_options = mutator.state.get_all_options()
-                    safest = pick_safest(get_payoff_matrix(mutator, next_turn_user_options, next_turn_opponent_options, depth=depth, prune=prune))
+                    if eliminate_dominated and depth > 1 and not mutator.state.battle_is_finished():
+                        next_turn_user_options, next_turn_opponent_options = remove_dominated_options(
+                            mutator,
+                            next_turn_user_options,
+                            next_turn_opponent_options
+                        )
+                    next_turn_payoff_matrix = get_payoff_matrix(
+                        mutator,
+                        next_turn_user_options,
+                        next_turn_opponent_options,
+                        depth=depth,
+                        prune=prune,
+                        eliminate_dominated=eliminate_dominated
+                    )
+                    if stats is not None:
+                        stats.start_lap()
+                    safest = pick_safest(next_turn_payoff_matrix)
+                    if stats is not None:
+                        stats.lap('solving')
                     score += safest[1] * this_percentage
-                    mutator.reverse(instructions.instructions)
 
-            state_scores[(user_move, opponent_move)] = score
+            mutator.reverse(applied_instructions)
+            if stats is not None:
+                stats.lap('mutation')
+
+            state_scores[row, column_indices[opponent_move]] = score
 
             if score < worst_score_for_this_row:
                 worst_score_for_this_row = score
@@ -133,4 +218,4 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
         if worst_score_for_this_row > best_score:
             best_score = worst_score_for_this_row
 
-    return state_scores
+    return payoff_matrix
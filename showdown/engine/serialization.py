@@ -0,0 +1,430 @@
+# A compact, versioned binary encoding of engine States and instruction lists
+#
+# A payload is a header (magic bytes and the format version), a table of every string in the payload and the body.
+# The body refers to strings by their 2-byte index in that table so each pokemon, move, item, ability
+# and instruction name is written once per payload. The ids are local to the payload rather than to the data files
+# so a stored payload can still be read after the data is updated or modded
+import struct
+from collections import defaultdict
+from sys import intern
+
+import constants
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.special_effects.effect_hooks import get_effect_hooks
+
+
+VERSION = 1
+
+STATE_MAGIC = b'SDS'
+INSTRUCTIONS_MAGIC = b'SDI'
+
+_header = struct.Struct('<3sB')
+_u16 = struct.Struct('<H')
+_i32 = struct.Struct('<i')
+_i64 = struct.Struct('<q')
+_f64 = struct.Struct('<d')
+
+# level, hp, maxhp, attack, defense, special-attack, special-defense, speed as doubles,
+# a bitmask of which of those were ints, the 7 boosts, the burn multiplier, the terastallized flag
+# and the string ids of the id, ability, item, nature, status and tera-type
+_pokemon = struct.Struct('<8dH7bb?6H')
+_POKEMON_NUMBER_COUNT = 8
+
+# a move's id, whether it is disabled and its pp
+# moves with other keys or a non-int pp are written as tagged values instead
+_move = struct.Struct('<H?i')
+_MOVE_KEYS = {constants.ID, constants.DISABLED, constants.CURRENT_PP}
+_PACKED_MOVES = 0
+_TAGGED_MOVES = 1
+
+_NONE = 0
+_TRUE = 1
+_FALSE = 2
+_INT32 = 3
+_INT64 = 4
+_FLOAT = 5
+_STR = 6
+_LIST = 7
+_TUPLE = 8
+_DICT = 9
+_STR_LIST = 10
+_STR_TUPLE = 11
+_INT32_LIST = 12
+_INT32_TUPLE = 13
+
+_INT32_MIN = -2 ** 31
+_INT32_MAX = 2 ** 31 - 1
+
+# string id 0 is a None in place of an optional string
+_NO_STRING = 0
+_MAX_STRINGS = 2 ** 16
+
+_struct_cache = {}
+
+
+def _array_struct(code, length):
+    # lists of only strings or only small ints are packed with one struct per length
+    try:
+        return _struct_cache[(code, length)]
+    except KeyError:
+        s = struct.Struct('<{}{}'.format(length, code))
+        _struct_cache[(code, length)] = s
+        return s
+
+
+class SerializationError(Exception):
+    pass
+
+
+class _Encoder(object):
+    __slots__ = ('body', 'strings')
+
+    def __init__(self):
+        self.body = bytearray()
+        self.strings = {}
+
+    def string_id(self, s):
+        try:
+            return self.strings[s]
+        except KeyError:
+            string_id = len(self.strings) + 1
+            if string_id >= _MAX_STRINGS:
+                raise SerializationError("Too many strings to serialize: {}".format(string_id))
+            self.strings[s] = string_id
+            return string_id
+
+    def optional_string_id(self, s):
+        if s is None:
+            return _NO_STRING
+        elif not isinstance(s, str):
+            raise SerializationError("Expected a string or None but got {}".format(s))
+        return self.string_id(s)
+
+    def write_string(self, s):
+        self.body += _u16.pack(self.string_id(s))
+
+    def write_value(self, value):
+        body = self.body
+
+        # bool is checked before int because it is a subclass of int
+        if value is None:
+            body.append(_NONE)
+        elif value is True:
+            body.append(_TRUE)
+        elif value is False:
+            body.append(_FALSE)
+        elif isinstance(value, str):
+            body.append(_STR)
+            body += _u16.pack(self.string_id(value))
+        elif isinstance(value, int):
+            if _INT32_MIN <= value <= _INT32_MAX:
+                body.append(_INT32)
+                body += _i32.pack(value)
+            else:
+                body.append(_INT64)
+                body += _i64.pack(value)
+        elif isinstance(value, float):
+            body.append(_FLOAT)
+            body += _f64.pack(value)
+        elif isinstance(value, (list, tuple)):
+            is_tuple = isinstance(value, tuple)
+            if value and all(type(v) is str for v in value):
+                body.append(_STR_TUPLE if is_tuple else _STR_LIST)
+                body += _u16.pack(len(value))
+                body += _array_struct('H', len(value)).pack(*[self.string_id(v) for v in value])
+            elif value and all(type(v) is int and _INT32_MIN <= v <= _INT32_MAX for v in value):
+                body.append(_INT32_TUPLE if is_tuple else _INT32_LIST)
+                body += _u16.pack(len(value))
+                body += _array_struct('i', len(value)).pack(*value)
+            else:
+                body.append(_TUPLE if is_tuple else _LIST)
+                body += _u16.pack(len(value))
+                for v in value:
+                    self.write_value(v)
+        elif isinstance(value, dict):
+            body.append(_DICT)
+            body += _u16.pack(len(value))
+            for k, v in value.items():
+                self.write_value(k)
+                self.write_value(v)
+        else:
+            raise SerializationError("Cannot serialize {}: {}".format(type(value).__name__, value))
+
+    def write_pokemon(self, pkmn):
+        numbers = (
+            pkmn.level,
+            pkmn.hp,
+            pkmn.maxhp,
+            pkmn.attack,
+            pkmn.defense,
+            pkmn.special_attack,
+            pkmn.special_defense,
+            pkmn.speed,
+        )
+        int_mask = 0
+        for i, n in enumerate(numbers):
+            if isinstance(n, int):
+                int_mask |= 1 << i
+
+        self.body += _pokemon.pack(
+            *numbers,
+            int_mask,
+            pkmn.attack_boost,
+            pkmn.defense_boost,
+            pkmn.special_attack_boost,
+            pkmn.special_defense_boost,
+            pkmn.speed_boost,
+            pkmn.accuracy_boost,
+            pkmn.evasion_boost,
+            pkmn.burn_multiplier,
+            pkmn.terastallized,
+            self.string_id(pkmn.id),
+            self.optional_string_id(pkmn.ability),
+            self.optional_string_id(pkmn.item),
+            self.optional_string_id(pkmn.nature),
+            self.optional_string_id(pkmn.status),
+            self.optional_string_id(pkmn.tera_type)
+        )
+        self.write_value(pkmn.types)
+        self.write_value(pkmn.evs)
+        self.write_value(list(pkmn.volatile_status))
+        self.write_moves(pkmn.moves)
+
+    def write_moves(self, moves):
+        body = self.body
+        if all(m.keys() == _MOVE_KEYS and type(m[constants.CURRENT_PP]) is int for m in moves):
+            body.append(_PACKED_MOVES)
+            body += _u16.pack(len(moves))
+            for m in moves:
+                body += _move.pack(self.string_id(m[constants.ID]), m[constants.DISABLED], m[constants.CURRENT_PP])
+        else:
+            body.append(_TAGGED_MOVES)
+            self.write_value(moves)
+
+    def write_side(self, side):
+        self.write_pokemon(side.active)
+        self.body += _u16.pack(len(side.reserve))
+        for name, pkmn in side.reserve.items():
+            self.write_string(name)
+            self.write_pokemon(pkmn)
+        self.write_value(side.wish)
+        self.write_value(dict(side.side_conditions))
+        self.write_value(side.future_sight)
+        self.write_value(side.used_tera)
+
+    def write_state(self, state):
+        self.write_side(state.user)
+        self.write_side(state.opponent)
+        self.write_value(state.weather)
+        self.write_value(state.field)
+        self.write_value(state.trick_room)
+        self.write_value(state.tera_allowed)
+
+    def to_bytes(self, magic):
+        payload = bytearray(_header.pack(magic, VERSION))
+        payload += _u16.pack(len(self.strings))
+        for s in self.strings:
+            encoded = s.encode('utf-8')
+            payload += _u16.pack(len(encoded))
+            payload += encoded
+        payload += self.body
+        return bytes(payload)
+
+
+class _Decoder(object):
+    __slots__ = ('data', 'offset', 'strings')
+
+    def __init__(self, data, magic):
+        self.data = memoryview(data)
+        try:
+            payload_magic, version = _header.unpack_from(self.data, 0)
+        except struct.error:
+            raise SerializationError("Payload is too short to have a header")
+        if payload_magic != magic:
+            raise SerializationError("Expected a payload starting with {} but got {}".format(magic, payload_magic))
+        if version != VERSION:
+            raise SerializationError("Cannot read version {} payloads, only version {}".format(version, VERSION))
+
+        self.offset = _header.size
+        string_count = self.read_u16()
+        strings = [None]
+        for _ in range(string_count):
+            length = self.read_u16()
+            strings.append(intern(str(self.data[self.offset:self.offset + length], 'utf-8')))
+            self.offset += length
+        self.strings = strings
+
+    def read_u16(self):
+        value = _u16.unpack_from(self.data, self.offset)[0]
+        self.offset += 2
+        return value
+
+    def read_string(self):
+        return self.strings[self.read_u16()]
+
+    def read_value(self):
+        data = self.data
+        tag = data[self.offset]
+        self.offset += 1
+
+        if tag == _STR:
+            return self.read_string()
+        elif tag == _INT32:
+            value = _i32.unpack_from(data, self.offset)[0]
+            self.offset += 4
+            return value
+        elif tag == _NONE:
+            return None
+        elif tag == _TRUE:
+            return True
+        elif tag == _FALSE:
+            return False
+        elif tag == _FLOAT:
+            value = _f64.unpack_from(data, self.offset)[0]
+            self.offset += 8
+            return value
+        elif tag == _STR_LIST or tag == _STR_TUPLE:
+            array_struct = _array_struct('H', self.read_u16())
+            strings = self.strings
+            value = [strings[i] for i in array_struct.unpack_from(data, self.offset)]
+            self.offset += array_struct.size
+            return tuple(value) if tag == _STR_TUPLE else value
+        elif tag == _INT32_LIST or tag == _INT32_TUPLE:
+            array_struct = _array_struct('i', self.read_u16())
+            value = array_struct.unpack_from(data, self.offset)
+            self.offset += array_struct.size
+            return value if tag == _INT32_TUPLE else list(value)
+        elif tag == _LIST:
+            return [self.read_value() for _ in range(self.read_u16())]
+        elif tag == _TUPLE:
+            return tuple([self.read_value() for _ in range(self.read_u16())])
+        elif tag == _DICT:
+            d = {}
+            for _ in range(self.read_u16()):
+                key = self.read_value()
+                d[key] = self.read_value()
+            return d
+        elif tag == _INT64:
+            value = _i64.unpack_from(data, self.offset)[0]
+            self.offset += 8
+            return value
+        raise SerializationError("Unknown value tag {} at offset {}".format(tag, self.offset - 1))
+
+    def read_pokemon(self):
+        (
+            level, hp, maxhp, attack, defense, special_attack, special_defense, speed,
+            int_mask,
+            attack_boost, defense_boost, special_attack_boost, special_defense_boost,
+            speed_boost, accuracy_boost, evasion_boost,
+            burn_multiplier, terastallized,
+            id_index, ability_index, item_index, nature_index, status_index, tera_type_index
+        ) = _pokemon.unpack_from(self.data, self.offset)
+        self.offset += _pokemon.size
+
+        if int_mask:
+            level, hp, maxhp, attack, defense, special_attack, special_defense, speed = (
+                int(n) if int_mask & (1 << i) else n
+                for i, n in enumerate((level, hp, maxhp, attack, defense, special_attack, special_defense, speed))
+            )
+
+        strings = self.strings
+
+        # the constructor is skipped so the burn multiplier is not re-calculated from the move data
+        pkmn = Pokemon.__new__(Pokemon)
+        pkmn.id = strings[id_index]
+        pkmn.level = level
+        pkmn.hp = hp
+        pkmn.maxhp = maxhp
+        pkmn.attack = attack
+        pkmn.defense = defense
+        pkmn.special_attack = special_attack
+        pkmn.special_defense = special_defense
+        pkmn.speed = speed
+        pkmn.attack_boost = attack_boost
+        pkmn.defense_boost = defense_boost
+        pkmn.special_attack_boost = special_attack_boost
+        pkmn.special_defense_boost = special_defense_boost
+        pkmn.speed_boost = speed_boost
+        pkmn.accuracy_boost = accuracy_boost
+        pkmn.evasion_boost = evasion_boost
+        pkmn.burn_multiplier = burn_multiplier
+        pkmn.terastallized = terastallized
+        pkmn._ability = strings[ability_index]
+        pkmn._item = strings[item_index]
+        pkmn.hooks = get_effect_hooks(pkmn._ability, pkmn._item)
+        pkmn.nature = strings[nature_index]
+        pkmn.status = strings[status_index]
+        pkmn.tera_type = strings[tera_type_index]
+        pkmn.types = self.read_value()
+        pkmn.evs = self.read_value()
+        pkmn.volatile_status = set(self.read_value())
+        pkmn.moves = self.read_moves()
+        return pkmn
+
+    def read_moves(self):
+        data = self.data
+        kind = data[self.offset]
+        self.offset += 1
+        if kind == _TAGGED_MOVES:
+            return self.read_value()
+
+        strings = self.strings
+        moves = []
+        for _ in range(self.read_u16()):
+            string_id, disabled, current_pp = _move.unpack_from(data, self.offset)
+            self.offset += _move.size
+            moves.append({constants.ID: strings[string_id], constants.DISABLED: disabled, constants.CURRENT_PP: current_pp})
+        return moves
+
+    def read_side(self):
+        active = self.read_pokemon()
+        reserve = {}
+        for _ in range(self.read_u16()):
+            name = self.read_string()
+            reserve[name] = self.read_pokemon()
+        wish = self.read_value()
+        side_conditions = defaultdict(int, self.read_value())
+        future_sight = self.read_value()
+        used_tera = self.read_value()
+        return Side(active, reserve, wish, side_conditions, future_sight, used_tera=used_tera)
+
+    def read_state(self):
+        user = self.read_side()
+        opponent = self.read_side()
+        weather = self.read_value()
+        field = self.read_value()
+        trick_room = self.read_value()
+        tera_allowed = self.read_value()
+        return State(user, opponent, weather, field, trick_room, tera_allowed=tera_allowed)
+
+    def check_finished(self):
+        if self.offset != len(self.data):
+            raise SerializationError("{} bytes were left over after decoding".format(len(self.data) - self.offset))
+
+
+def encode_state(state):
+    encoder = _Encoder()
+    encoder.write_state(state)
+    return encoder.to_bytes(STATE_MAGIC)
+
+
+def decode_state(data):
+    decoder = _Decoder(data, STATE_MAGIC)
+    state = decoder.read_state()
+    decoder.check_finished()
+    return state
+
+
+def encode_instructions(instructions):
+    encoder = _Encoder()
+    encoder.write_value(list(instructions))
+    return encoder.to_bytes(INSTRUCTIONS_MAGIC)
+
+
+def decode_instructions(data):
+    decoder = _Decoder(data, INSTRUCTIONS_MAGIC)
+    instructions = decoder.read_value()
+    decoder.check_finished()
+    return instructions
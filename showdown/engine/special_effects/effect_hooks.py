@@ -0,0 +1,97 @@
+from types import FunctionType
+
+
+# abilities that are checked by `get_effective_speed`
+SPEED_ABILITIES = {
+    'chlorophyll',
+    'swiftswim',
+    'sandrush',
+    'slushrush',
+    'surgesurfer',
+    'unburden',
+    'quickfeet',
+}
+
+# abilities that are checked by `get_effective_priority`
+PRIORITY_ABILITIES = {
+    'prankster',
+    'galewings',
+    'triage',
+}
+
+# abilities that do something when the pokemon switches out
+SWITCH_OUT_ABILITIES = {
+    'regenerator',
+    'naturalcure',
+}
+
+
+class EffectHooks(object):
+    """
+    The special-effect handlers for one ability/item combination
+
+    A handler is None when the ability or item does nothing at that point,
+    which lets the engine skip the lookup and the call entirely
+    """
+    __slots__ = (
+        'ability_modify_attack_being_used',
+        'ability_modify_attack_against',
+        'ability_before_move',
+        'ability_on_switch_in',
+        'ability_end_of_turn',
+        'item_modify_attack_being_used',
+        'item_modify_attack_against',
+        'item_on_switch_in',
+        'item_end_of_turn',
+        'speed_ability',
+        'priority_ability',
+        'switch_out_ability',
+    )
+
+    def __init__(self, ability, item):
+        from .abilities import modify_attack_being_used as ability_modify_attack_being_used
+        from .abilities import modify_attack_against as ability_modify_attack_against
+        from .abilities import before_move as ability_before_move
+        from .abilities import on_switch_in as ability_on_switch_in
+        from .abilities import end_of_turn as ability_end_of_turn
+        from .items import modify_attack_being_used as item_modify_attack_being_used
+        from .items import modify_attack_against as item_modify_attack_against
+        from .items import on_switch_in as item_on_switch_in
+        from .items import end_of_turn as item_end_of_turn
+
+        self.ability_modify_attack_being_used = ability_modify_attack_being_used.ability_lookup.get(ability)
+        self.ability_modify_attack_against = ability_modify_attack_against.ability_lookup.get(ability)
+        self.ability_before_move = module_function(ability_before_move, ability)
+        self.ability_on_switch_in = ability_on_switch_in.ability_lookup.get(ability)
+        self.ability_end_of_turn = module_function(ability_end_of_turn, ability)
+        self.item_modify_attack_being_used = module_function(item_modify_attack_being_used, item)
+        self.item_modify_attack_against = item_modify_attack_against.item_lookup.get(item)
+        self.item_on_switch_in = module_function(item_on_switch_in, item)
+        self.item_end_of_turn = module_function(item_end_of_turn, item)
+        self.speed_ability = ability in SPEED_ABILITIES
+        self.priority_ability = ability in PRIORITY_ABILITIES
+        self.switch_out_ability = ability in SWITCH_OUT_ABILITIES
+
+
+def module_function(module, name):
+    # some special-effect modules dispatch with `globals()[name]`
+    # this resolves a name the same way without calling anything
+    if not isinstance(name, str):
+        return None
+    func = vars(module).get(name)
+    if isinstance(func, FunctionType):
+        return func
+    return None
+
+
+# hooks only depend on the ability and item so pokemon with the same ability and item share them
+_effect_hooks_lookup = {}
+
+
+def get_effect_hooks(ability, item):
+    try:
+        return _effect_hooks_lookup[(ability, item)]
+    except KeyError:
+        hooks = EffectHooks(ability, item)
+        _effect_hooks_lookup[(ability, item)] = hooks
+        return hooks
@@ -1,9 +1,12 @@
+import numpy as np
+
 import constants
-from showdown.engine.objects import MoveChoice
+from showdown.engine.move_records import move_records
+from showdown.engine.objects import get_move_choice
 
 
 def switch_out_move_triggered(move, damage_amounts):
-    if move[constants.ID] in constants.SWITCH_OUT_MOVES:
+    if move_records[move[constants.ID]].is_switch_out:
         if move[constants.ID] in ['partingshot', 'teleport', 'chillyreception'] and move[constants.ACCURACY]:
             return True
         else:
@@ -18,13 +21,15 @@ def get_best_switch_pokemon(mutator, instructions, attacker, attacking_side, def
         return None
 
     if first_move:
-        other_move = MoveChoice(defending_move[constants.ID])
+        other_move = get_move_choice(defending_move[constants.ID])
     else:
-        other_move = MoveChoice(constants.DO_NOTHING_MOVE)
+        other_move = get_move_choice(constants.DO_NOTHING_MOVE)
 
     if attacker == constants.USER:
-        best_switch = max(get_payoff_matrix(mutator, switches, [other_move], depth=1).items(), key=lambda x: x[1])[0][0]
+        payoff_matrix = get_payoff_matrix(mutator, switches, [other_move], depth=1)
+        best_switch = payoff_matrix.rows[int(np.argmax(payoff_matrix.scores[:, 0]))]
     else:
-        best_switch = min(get_payoff_matrix(mutator, [other_move], switches, depth=1).items(), key=lambda x: x[1])[0][1]
+        payoff_matrix = get_payoff_matrix(mutator, [other_move], switches, depth=1)
+        best_switch = payoff_matrix.columns[int(np.argmin(payoff_matrix.scores[0]))]
 
     return best_switch.id
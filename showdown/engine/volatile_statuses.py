@@ -0,0 +1,12 @@
+import constants
+
+
+# groups of volatile-statuses that are checked for together
+# `not group.isdisjoint(pkmn.volatile_status)` checks for any of them in one call, which runs in C
+PROTECT_VOLATILE_STATUSES = frozenset(constants.PROTECT_VOLATILE_STATUSES)
+ATTACK_BOOSTING_VOLATILE_STATUSES = frozenset(['quarkdriveatk', 'protosynthesisatk'])
+DEFENSE_BOOSTING_VOLATILE_STATUSES = frozenset(['quarkdrivedef', 'protosynthesisdef'])
+SPECIAL_ATTACK_BOOSTING_VOLATILE_STATUSES = frozenset(['quarkdrivespa', 'protosynthesisspa'])
+SPECIAL_DEFENSE_BOOSTING_VOLATILE_STATUSES = frozenset(['quarkdrivespd', 'protosynthesisspd'])
+SPEED_BOOSTING_VOLATILE_STATUSES = frozenset(['quarkdrivespe', 'protosynthesisspe'])
+FORCED_MOVE_VOLATILE_STATUSES = frozenset(['phantomforce', 'shadowforce', 'dive', 'dig', 'bounce', 'fly'])
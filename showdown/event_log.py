@@ -0,0 +1,117 @@
+"""
+A compact, structured log of what happens in each battle, written on a background thread
+
+Every event is one line of JSON e.g.
+
+    Event: {"battle": "battle-gen9ou-1", "turn": 3, "event": "decision", "seconds": 1.25, "choice": "move thunderbolt"}
+
+Logging is done by a `logging.handlers.QueueListener` thread, so writing to stdout or a file does not add to
+the time that a decision takes. The queue is bounded and records are dropped when it is full instead of
+making the bot wait for the writer. The websocket messages are the most frequent records,
+so only one in every `MESSAGE_SAMPLING` of them is kept
+"""
+import json
+import queue
+import logging
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# below DEBUG, for the logs that are too expensive to format at every decision, like the state being searched
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+# the records that are sampled. There is one for every message, so they are only logged at DEBUG
+MESSAGE = "message"
+
+EVENT_LEVELS = {MESSAGE: logging.DEBUG}
+
+
+class Event:
+    """
+    The message of an event's record
+    The fields are only turned into JSON when the record is written, which is on the writer's thread
+    They must not be changed after the event is logged, so only numbers and strings should be given
+    """
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return "Event: {}".format(json.dumps(self.fields, separators=(', ', ': ')))
+
+
+def log_event(event, battle_tag=None, turn=None, **fields):
+    level = EVENT_LEVELS.get(event, logging.INFO)
+    if not logger.isEnabledFor(level):
+        return
+
+    record = {'battle': battle_tag, 'turn': turn, 'event': event}
+    record.update(fields)
+    logger.log(level, Event(record), extra={'event': event})
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every `rate` records of each event in `rates`
+    An event is set with `extra={'event': ...}` when logging. Records that are not events are all kept
+    """
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.counts = dict.fromkeys(rates, 0)
+        self.dropped = 0
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        rate = self.rates.get(event, 1)
+        if rate <= 1:
+            return True
+
+        self.counts[event] += 1
+        if self.counts[event] % rate == 1:
+            return True
+        self.dropped += 1
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue for a `QueueListener` to write
+    Records are dropped when the queue is full, and the number dropped is counted
+    """
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # events are formatted by the writer
+        # other messages are formatted now, on the caller's thread, because their arguments may change
+        if isinstance(record.msg, Event):
+            return record
+        return super().prepare(record)
+
+
+def start_background_logging(handler, queue_size=DEFAULT_QUEUE_SIZE, message_sampling=1):
+    """
+    Sends the root logger's records to `handler` from a background thread
+    Returns the listener, which must be stopped to write the records that are still queued
+    """
+    queue_handler = BoundedQueueHandler(queue_size)
+    queue_handler.addFilter(SamplingFilter({MESSAGE: message_sampling}))
+    listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    logging.getLogger().addHandler(queue_handler)
+    listener.start()
+    return listener
@@ -1,7 +1,9 @@
 import importlib
 import json
 import asyncio
+import functools
 import concurrent.futures
+import time
 from copy import deepcopy
 import logging
 
@@ -13,6 +15,10 @@ from showdown.engine.evaluate import Scoring
 from showdown.battle import Pokemon
 from showdown.battle import LastUsedMove
 from showdown.battle_modifier import async_update_battle
+from showdown.engine.search_stats import measure_decision
+from showdown.slow_decisions import profile_decision
+from showdown.event_log import log_event
+from showdown.event_log import MESSAGE
 
 from showdown.websocket_client import PSWebsocketClient
 
@@ -27,17 +33,40 @@ def battle_is_finished(battle_tag, msg):
     )
 
 
+def log_decision_stats(battle, decision_stats, seconds):
+    # one record per decision so that slow turns can be found and compared
+    record = decision_stats.summary()
+    record['battle_tag'] = battle.battle_tag
+    record['turn'] = battle.turn
+    record['seconds']['decision'] = round(seconds, 6)
+    logger.info("Decision stats: {}".format(json.dumps(record, sort_keys=True)))
+
+
+def find_best_move(battle):
+    # runs in an executor thread, which keeps the stats of this decision apart from other battles' decisions
+    with measure_decision(ShowdownConfig.search_stats) as decision_stats:
+        if ShowdownConfig.slow_decision_seconds:
+            best_move = profile_decision(battle, ShowdownConfig.slow_decision_seconds)
+        else:
+            best_move = battle.find_best_move()
+    return best_move, decision_stats
+
+
 async def async_pick_move(battle):
     battle_copy = deepcopy(battle)
     if battle_copy.request_json:
         battle_copy.user.from_json(battle_copy.request_json)
 
+    start_time = time.perf_counter()
     loop = asyncio.get_event_loop()
     with concurrent.futures.ThreadPoolExecutor() as pool:
-        best_move = await loop.run_in_executor(
-            pool, battle_copy.find_best_move
-        )
+        best_move, decision_stats = await loop.run_in_executor(pool, find_best_move, battle_copy)
+    seconds = time.perf_counter() - start_time
+    if decision_stats.enabled:
+        log_decision_stats(battle, decision_stats, seconds)
+
     choice = best_move[0]
+    log_event("decision", battle.battle_tag, battle.turn, seconds=round(seconds, 6), choice=choice)
     if constants.SWITCH_STRING in choice:
         battle.user.last_used_move = LastUsedMove(battle.user.active.name, "switch {}".format(choice.split()[-1]), battle.turn)
     else:
@@ -91,6 +120,7 @@ async def initialize_battle_with_tag(ps_websocket_client: PSWebsocketClient, set
             if set_request_json:
                 battle.request_json = user_json
 
+            log_event("start", battle_tag, opponent=opponent_name)
             return battle, opponent_id, user_json
 
 
@@ -152,9 +182,15 @@ async def start_standard_battle(ps_websocket_client: PSWebsocketClient, pokemon_
         battle.initialize_team_preview(user_json, opponent_pokemon, pokemon_battle_type)
         battle.during_team_preview()
 
-        smogon_usage_data = get_standard_battle_sets(
-            pokemon_battle_type,
-            pokemon_names=set(p.name for p in battle.opponent.reserve + battle.user.reserve)
+        # fetching the stats blocks, so it is done in another thread to let the other battles carry on
+        loop = asyncio.get_event_loop()
+        smogon_usage_data = await loop.run_in_executor(
+            None,
+            functools.partial(
+                get_standard_battle_sets,
+                pokemon_battle_type,
+                pokemon_names=set(p.name for p in battle.opponent.reserve + battle.user.reserve)
+            )
         )
         data.pokemon_sets = smogon_usage_data
         for pkmn, values in smogon_usage_data.items():
@@ -188,11 +224,14 @@ async def pokemon_battle(ps_websocket_client, pokemon_battle_type):
             else:
                 winner = None
             logger.debug("Winner: {}".format(winner))
+            log_event("finish", battle.battle_tag, battle.turn, winner=winner)
             await ps_websocket_client.send_message(battle.battle_tag, ["gg"])
             await ps_websocket_client.leave_battle(battle.battle_tag, save_replay=ShowdownConfig.save_replay)
             return winner
         else:
+            start_time = time.perf_counter()
             action_required = await async_update_battle(battle, msg)
+            log_event(MESSAGE, battle.battle_tag, battle.turn, seconds=round(time.perf_counter() - start_time, 6), size=len(msg))
             if action_required and not battle.wait:
                 best_move = await async_pick_move(battle)
                 await ps_websocket_client.send_message(battle.battle_tag, best_move)
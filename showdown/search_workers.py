@@ -0,0 +1,324 @@
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# how often `map` checks that the workers are alive while it waits for their results
+# and how often the thread that hands out the results checks that the pool is still running
+RESULT_POLL_SECONDS = 1
+
+
+@dataclass(frozen=True)
+class WorkerReport:
+    worker_index: int
+    pid: int
+    spawn_seconds: float
+    rss_kb: int
+    private_kb: Optional[int]
+
+
+def _read_proc_kb(path, field):
+    # returns None where /proc is not available
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def get_rss_kb():
+    rss_kb = _read_proc_kb("/proc/self/status", "VmRSS:")
+    if rss_kb is None:
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss_kb
+
+
+def get_private_kb():
+    # memory that is no longer shared with the parent
+    # copy-on-write pages only show up here once a worker writes to them
+    private_clean_kb = _read_proc_kb("/proc/self/smaps_rollup", "Private_Clean:")
+    private_dirty_kb = _read_proc_kb("/proc/self/smaps_rollup", "Private_Dirty:")
+    if private_clean_kb is None or private_dirty_kb is None:
+        return None
+    return private_clean_kb + private_dirty_kb
+
+
+class _TaskFailed(object):
+    def __init__(self, formatted_traceback):
+        self.formatted_traceback = formatted_traceback
+
+
+class _ParentLogHandler(logging.Handler):
+    # logs a worker's records with the parent's loggers, which send them to the parent's handlers
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def _log_to_queue(log_queue):
+    # the handlers inherited from the parent put records on a queue that only the parent's listener thread reads
+    # and that thread may have been holding the queue's lock when this process was forked
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+
+def _worker_main(worker_index, fork_time, task_queue, result_queue, log_queue):
+    _log_to_queue(log_queue)
+
+    # the frozen objects from the parent are never examined by this process' garbage collector
+    # so collections do not write to (and un-share) their pages
+    gc.enable()
+    result_queue.put((
+        None,
+        WorkerReport(
+            worker_index=worker_index,
+            pid=os.getpid(),
+            spawn_seconds=time.time() - fork_time,
+            rss_kb=get_rss_kb(),
+            private_kb=get_private_kb(),
+        )
+    ))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        call_id, task_id, func, args = task
+        try:
+            result = func(*args)
+        except Exception:
+            result = _TaskFailed(traceback.format_exc())
+        result_queue.put((call_id, (task_id, result)))
+
+
+class SearchWorkerPool(object):
+    """
+    Worker processes that are forked after the game data is loaded and modded
+
+    The parent freezes everything it has allocated before forking (`gc.freeze`),
+    so the data (`all_move_json`, `pokedex`, compiled move records, ...) stays in copy-on-write pages
+    that every worker shares instead of each worker importing its own copy.
+    The workers' log records are sent back to this process and written by its handlers.
+    Forking is required - on a platform without it, `map` runs in this process
+
+    Several threads (i.e. battles) can call `map` at once. Every call's tasks are tagged with the call's id,
+    and a thread in this process hands each result to the call that it belongs to
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.reports = []
+        self._workers = []
+        self._task_queue = None
+        self._result_queue = None
+        self._log_listener = None
+        self._result_thread = None
+        self._running = threading.Event()
+        self._call_ids = itertools.count()
+        # the queue that each `map` call's results are handed to, by call id
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return bool(self._workers)
+
+    def start(self):
+        if self.started:
+            return self.reports
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logger.warning("Forking is not available - searches will not be run in worker processes")
+            return self.reports
+
+        context = multiprocessing.get_context("fork")
+        self._task_queue = context.SimpleQueue()
+        self._result_queue = context.Queue()
+        log_queue = context.Queue()
+
+        gc.collect()
+        gc.freeze()
+
+        start_time = time.time()
+        for i in range(self.processes):
+            worker = context.Process(
+                target=_worker_main,
+                args=(i, time.time(), self._task_queue, self._result_queue, log_queue),
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+        # the workers' records are written by this process' handlers
+        self._log_listener = QueueListener(log_queue, _ParentLogHandler())
+        self._log_listener.start()
+
+        reports = [self._get_result(self._result_queue) for _ in self._workers]
+        if None in reports:
+            logger.error("A search worker died while starting - searches will not be run in worker processes")
+            self.terminate()
+            return self.reports
+        self.reports = sorted((report for _, report in reports), key=lambda r: r.worker_index)
+
+        self._running.set()
+        self._result_thread = threading.Thread(target=self._hand_out_results, daemon=True)
+        self._result_thread.start()
+
+        logger.info(
+            "Started {} search workers in {}s. Parent RSS: {}kB".format(
+                len(self._workers),
+                round(time.time() - start_time, 3),
+                get_rss_kb()
+            )
+        )
+        for report in self.reports:
+            logger.info(
+                "Search worker {}: pid={} spawn={}s rss={}kB private={}kB".format(
+                    report.worker_index,
+                    report.pid,
+                    round(report.spawn_seconds, 3),
+                    report.rss_kb,
+                    report.private_kb
+                )
+            )
+
+        return self.reports
+
+    def _get_result(self, results):
+        # returns None if a worker has died, or the pool has been stopped, while waiting
+        while True:
+            try:
+                return results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                workers = self._workers
+                if not workers or not all(worker.is_alive() for worker in workers):
+                    return None
+
+    def _hand_out_results(self):
+        # runs on its own thread until the pool is stopped
+        while self._running.is_set():
+            try:
+                call_id, result = self._result_queue.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+            # the call has gone if it stopped waiting for its results because a worker died
+            results = self._calls.get(call_id)
+            if results is not None:
+                results.put(result)
+
+    def map(self, func, list_of_args):
+        """
+        Calls `func(*args)` for each `args` in `list_of_args` and returns the results in the same order
+        `func` must be a module-level function so that it can be sent to the workers
+
+        If a worker dies (e.g. it is killed for using too much memory) the pool is closed
+        and the calls that did not finish are made in this process, as are all later calls.
+        A dead worker may have been holding the task queue's lock, so the other workers cannot be used,
+        and forking new ones from this process while its other threads are running is not safe
+        """
+        list_of_args = list(list_of_args)
+        results = {}
+        with self._lock:
+            # the lock is only held while the tasks are queued, so the calls from other threads can queue theirs
+            # while this one waits for its results
+            started = self.started
+            if started:
+                call_id = next(self._call_ids)
+                call_results = queue.Queue()
+                self._calls[call_id] = call_results
+                for task_id, args in enumerate(list_of_args):
+                    self._task_queue.put((call_id, task_id, func, args))
+
+        if started:
+            try:
+                for _ in list_of_args:
+                    result = self._get_result(call_results)
+                    if result is None:
+                        logger.error(
+                            "A search worker died - searching in this process from now on. Exit codes: {}".format(
+                                [worker.exitcode for worker in self._workers]
+                            )
+                        )
+                        self.terminate()
+                        break
+                    task_id, result = result
+                    results[task_id] = result
+            finally:
+                del self._calls[call_id]
+
+        for task_id, args in enumerate(list_of_args):
+            if task_id not in results:
+                results[task_id] = func(*args)
+
+        results = [results[task_id] for task_id in range(len(list_of_args))]
+        for result in results:
+            if isinstance(result, _TaskFailed):
+                raise RuntimeError("A search worker failed:\n{}".format(result.formatted_traceback))
+
+        return results
+
+    def terminate(self):
+        # every call that is waiting when a worker dies terminates the pool, so only the first one stops it
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        if workers:
+            self._stop_threads()
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            for _ in workers:
+                self._task_queue.put(None)
+        for worker in workers:
+            worker.join()
+        if workers:
+            self._stop_threads()
+
+    def _stop_threads(self):
+        self._running.clear()
+        if self._result_thread is not None:
+            self._result_thread.join()
+            self._result_thread = None
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# the pool used by the battle-bots
+# it is only started if SEARCH_PROCESSES is greater than 1
+search_worker_pool = SearchWorkerPool(0)
+
+
+def start_search_workers(processes):
+    search_worker_pool.processes = processes
+    return search_worker_pool.start()
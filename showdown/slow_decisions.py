@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from showdown.engine.serialization import encode_state
+from showdown.engine.search_stats import get_decision_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+SLOW_DECISIONS_DIR = os.path.join("logs", "slow")
+DEFAULT_SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 25
+
+# the searches made by the decision that is being profiled on each thread
+_searches = threading.local()
+
+# slow decisions are saved on this thread so that saving them does not delay the bot's choice
+saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-decisions")
+
+
+def record_search(state, user_options, opponent_options, depth):
+    """
+    Called by the battle-bots with each state that they search and the options that they search it with
+    These are saved with a slow decision so that the same searches can be made again by the benchmarks
+    The state must not be changed afterwards because it is only encoded once the decision is finished
+    """
+    searches = getattr(_searches, 'searches', None)
+    if searches is not None:
+        searches.append((state, user_options, opponent_options, depth))
+
+
+class StackSampler:
+    """
+    Records the stack of one thread every `interval` seconds from a background thread
+
+    Unlike a tracing profiler this does not slow down the thread being sampled,
+    so it is cheap enough to run for every decision and only keep the slow ones.
+    Time spent in search worker processes shows up as the thread waiting for their results
+    """
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        # the stack from the outermost call to the innermost one, e.g. "run:main;search:get_payoff_matrix"
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append("{}:{}".format(os.path.splitext(os.path.basename(code.co_filename))[0], code.co_name))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self):
+        # one line per stack with the number of times it was seen - the input that flame graph tools expect
+        return "".join("{} {}\n".format(stack, count) for stack, count in self.samples.most_common())
+
+    def top_functions(self, n=TOP_FUNCTIONS):
+        # the functions that were running when the samples were taken, not including their callers
+        functions = Counter()
+        for stack, count in self.samples.items():
+            functions[stack.rsplit(";", 1)[-1]] += count
+        return functions.most_common(n)
+
+
+def options_to_json(options):
+    return [[o.id, o.is_switch, o.terastallize] for o in options]
+
+
+def save_slow_decision(battle, seconds, threshold, sampler, searches, search_stats=None, directory=SLOW_DECISIONS_DIR):
+    """
+    Saves the samples and the searches made by a decision that took longer than `threshold` seconds
+    Each searched state is saved in its own file with the options that it was searched with in the summary.
+    The searches can be made again with `python -m benchmarks.run --state <directory>`
+    """
+    path = os.path.join(
+        directory,
+        "{}-turn{}-{}".format(battle.battle_tag, battle.turn, datetime.now().strftime("%Y-%m-%dT%H-%M-%S"))
+    )
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, "profile.txt"), 'w') as f:
+        f.write(sampler.collapsed())
+
+    saved_searches = []
+    try:
+        if not searches:
+            # a bot that does not search, e.g. most_damage
+            searches = [(battle.create_state(), None, None, None)]
+        for i, (state, user_options, opponent_options, depth) in enumerate(searches):
+            state_file = "state.bin" if i == 0 else "state-{}.bin".format(i)
+            with open(os.path.join(path, state_file), 'wb') as f:
+                f.write(encode_state(state))
+            if user_options is not None:
+                saved_searches.append({
+                    'state': state_file,
+                    'depth': depth,
+                    'user_options': options_to_json(user_options),
+                    'opponent_options': options_to_json(opponent_options),
+                })
+    except Exception as e:
+        logger.warning("Could not save the state of a slow decision: {}".format(e))
+
+    summary = {
+        'battle_tag': battle.battle_tag,
+        'turn': battle.turn,
+        'mode': battle.pokemon_mode,
+        'seconds': round(seconds, 6),
+        'threshold': threshold,
+        'sample_interval': sampler.interval,
+        'samples': sum(sampler.samples.values()),
+        'top_functions': sampler.top_functions(),
+        'searches': saved_searches,
+    }
+    if search_stats is not None:
+        summary['search_stats'] = search_stats
+    with open(os.path.join(path, "summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    logger.warning("Decision took {}s, saved its profile to {}".format(round(seconds, 2), path))
+    return path
+
+
+def _save_slow_decision(*args):
+    try:
+        save_slow_decision(*args)
+    except Exception:
+        logger.exception("Could not save a slow decision")
+
+
+def profile_decision(battle, threshold, directory=SLOW_DECISIONS_DIR):
+    """
+    Calls `battle.find_best_move()` while sampling the thread that it runs in
+    The samples and searches are only saved when the decision takes longer than `threshold` seconds.
+    They are saved by the `saver` thread after the decision is returned
+    """
+    sampler = StackSampler(threading.get_ident())
+    _searches.searches = []
+    sampler.start()
+    start_time = time.perf_counter()
+    try:
+        best_move = battle.find_best_move()
+    finally:
+        seconds = time.perf_counter() - start_time
+        sampler.stop()
+        searches = _searches.searches
+        _searches.searches = None
+
+    if seconds > threshold:
+        decision_stats = get_decision_stats()
+        search_stats = decision_stats.summary() if decision_stats.enabled else None
+        saver.submit(_save_slow_decision, battle, seconds, threshold, sampler, searches, search_stats, directory)
+
+    return best_move
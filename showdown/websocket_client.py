@@ -1,13 +1,21 @@
 import asyncio
+import functools
 import websockets
 import requests
 import json
 import time
 
 import logging
+
+from showdown.event_log import MESSAGE
+
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_LOGIN_URI = "https://play.pokemonshowdown.com/action.php"
+LOGIN_TIMEOUT = 10
+
+
 class LoginError(Exception):
     pass
 
@@ -25,15 +33,17 @@ class PSWebsocketClient:
     password = None
     last_message = None
     last_challenge_time = 0
+    session = None
 
     @classmethod
-    async def create(cls, username, password, address):
+    async def create(cls, username, password, address, login_uri=None):
         self = PSWebsocketClient()
         self.username = username
         self.password = password
         self.address = "ws://{}/showdown/websocket".format(address)
         self.websocket = await websockets.connect(self.address)
-        self.login_uri = "https://play.pokemonshowdown.com/action.php"
+        self.login_uri = login_uri or DEFAULT_LOGIN_URI
+        self.session = requests.Session()
         return self
 
     async def join_room(self, room_name):
@@ -43,12 +53,12 @@ class PSWebsocketClient:
 
     async def receive_message(self):
         message = await self.websocket.recv()
-        logger.debug("Received message from websocket: {}".format(message))
+        logger.debug("Received message from websocket: %s", message, extra={'event': MESSAGE})
         return message
 
     async def send_message(self, room, message_list):
         message = room + "|" + "|".join(message_list)
-        logger.debug("Sending message to websocket: {}".format(message))
+        logger.debug("Sending message to websocket: %s", message, extra={'event': MESSAGE})
         await self.websocket.send(message)
         self.last_message = message
 
@@ -59,13 +69,24 @@ class PSWebsocketClient:
             if split_message[1] == 'challstr':
                 return split_message[2], split_message[3]
 
+    async def post_to_login_server(self, data):
+        # the request is blocking, so it is made in another thread to let the other battles carry on
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                None,
+                functools.partial(self.session.post, self.login_uri, data=data, timeout=LOGIN_TIMEOUT)
+            )
+        except requests.RequestException as e:
+            logger.error("Could not log-in\nDetails:\n{}".format(e))
+            raise LoginError("Could not log-in")
+
     async def login(self):
         logger.debug("Logging in...")
         client_id, challstr = await self.get_id_and_challstr()
         if self.password:
-            response = requests.post(
-                self.login_uri,
-                data={
+            response = await self.post_to_login_server(
+                {
                     'act': 'login',
                     'name': self.username,
                     'pass': self.password,
@@ -74,9 +95,8 @@ class PSWebsocketClient:
             )
 
         else:
-            response = requests.post(
-                self.login_uri,
-                data={
+            response = await self.post_to_login_server(
+                {
                     'act': 'getassertion',
                     'userid': self.username,
                     'challstr': '|'.join([client_id, challstr]),
@@ -1605,3 +1605,37 @@ class TestBattle(unittest.TestCase):
         )
 
         self.assertEqual(expected_options, self.battle.get_all_options())
+
+
+class TestPrepareBattlesPriorWeight(unittest.TestCase):
+    def setUp(self):
+        self.battle = Battle(None)
+        self.battle.generation = "gen9"
+        self.battle.battle_type = constants.STANDARD_BATTLE
+        self.battle.user.active = Pokemon('pikachu', 100)
+        self.battle.opponent.active = Pokemon('pikachu', 100)
+
+        self.get_pokemon_sets_patch = mock.patch('showdown.battle.get_pokemon_sets')
+        self.addCleanup(self.get_pokemon_sets_patch.stop)
+        self.get_pokemon_sets_mock = self.get_pokemon_sets_patch.start()
+
+    def test_battles_are_weighted_by_how_often_their_set_is_used(self):
+        self.get_pokemon_sets_mock.return_value = {
+            'spreads': [['serious', '85,85,85,85,85,85', 100.0]],
+            'items': [['choicescarf', 60.0], ['lifeorb', 40.0]],
+            'abilities': [['static', 100.0]],
+            'moves': [['thunderbolt', 100.0], ['voltswitch', 90.0], ['surf', 80.0], ['nuzzle', 70.0]],
+        }
+
+        battles = self.battle.prepare_battles(guess_mega_evo_opponent=False)
+
+        weights = {b.opponent.active.item: b.prior_weight for b in battles}
+        self.assertEqual({'choicescarf', 'lifeorb'}, set(weights))
+        self.assertAlmostEqual(1.5, weights['choicescarf'] / weights['lifeorb'])
+
+    def test_battle_has_a_prior_weight_of_1_when_there_are_no_sets(self):
+        self.get_pokemon_sets_mock.side_effect = KeyError
+
+        battles = self.battle.prepare_battles(guess_mega_evo_opponent=False)
+
+        self.assertEqual([1], [b.prior_weight for b in battles])
@@ -16,6 +16,7 @@ from showdown.engine.find_state_instructions import get_all_state_instructions
 from showdown.engine.find_state_instructions import remove_duplicate_instructions
 from showdown.engine.find_state_instructions import lookup_move
 from showdown.engine.find_state_instructions import user_moves_first
+from showdown.engine.find_state_instructions import get_effective_speeds
 from showdown.engine.objects import State
 from showdown.engine.objects import Pokemon
 from showdown.engine.objects import Side
@@ -14174,3 +14175,25 @@ class TestUserMovesFirst(unittest.TestCase):
         self.state.user.active.volatile_status = {"protosynthesisspe"}
 
         self.assertTrue(user_moves_first(self.state, user_move, opponent_move))
+
+    def test_get_effective_speeds_returns_user_then_opponent_speed(self):
+        self.state.user.active.speed = 2
+        self.state.opponent.active.speed = 1
+        self.state.opponent.side_conditions[constants.TAILWIND] = 1
+
+        self.assertEqual((2, 2), get_effective_speeds(self.state))
+
+    def test_given_effective_speeds_are_used_instead_of_the_state(self):
+        user_move = lookup_move(MoveChoice('tackle'))
+        opponent_move = lookup_move(MoveChoice('tackle'))
+
+        self.state.user.active.speed = 2
+        self.state.opponent.active.speed = 1
+
+        self.assertFalse(user_moves_first(self.state, user_move, opponent_move, effective_speeds=(1, 2)))
+
+    def test_given_effective_speeds_are_not_needed_when_a_priority_move_is_used(self):
+        user_move = lookup_move(MoveChoice('quickattack'))
+        opponent_move = lookup_move(MoveChoice('tackle'))
+
+        self.assertTrue(user_moves_first(self.state, user_move, opponent_move, effective_speeds=(1, 2)))
@@ -41,6 +41,7 @@ from showdown.battle_modifier import transform
 from showdown.battle_modifier import update_battle
 from showdown.battle_modifier import upkeep
 from showdown.battle_modifier import inactive
+from showdown.battle_modifier import split_message
 
 from showdown.engine.objects import boost_multiplier_lookup
 
@@ -4193,3 +4194,24 @@ class TestCheckChoiceItem(unittest.TestCase):
         update_battle(self.battle, msg)
 
         self.assertEqual(None, self.battle.opponent.active.item)
+
+
+class TestSplitMessage(unittest.TestCase):
+    def test_each_line_is_split_once_with_its_action(self):
+        msg_lines = [
+            '>battle-gen9randombattle-1',
+            '|',
+            '|move|p1a: Caterpie|Tackle|p2a: Pikachu',
+            '|-damage|p2a: Pikachu|90/100',
+            '|turn|2',
+        ]
+
+        lines = split_message(msg_lines)
+
+        self.assertEqual(['', 'move', '-damage', 'turn'], [line.action for line in lines])
+        self.assertEqual(['', 'move', 'p1a: Caterpie', 'Tackle', 'p2a: Pikachu'], lines[1].split_msg)
+
+    def test_line_numbers_count_the_lines_without_an_action(self):
+        lines = split_message(['>battle-gen9randombattle-1', '|upkeep', '', '|turn|2'])
+
+        self.assertEqual([1, 3], [line.line_number for line in lines])
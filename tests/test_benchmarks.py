@@ -0,0 +1,114 @@
+import unittest
+
+from benchmarks.corpus import load_positions
+from benchmarks.corpus import build_state
+from benchmarks.run import compare
+from benchmarks.run import dominance_lines
+from benchmarks.replay import load_log
+from benchmarks.replay import log_paths
+from benchmarks.replay import load_snapshots
+from benchmarks.replay import replay
+from benchmarks.replay import snapshot
+from benchmarks.replay import differences
+from benchmarks.replay import timed_functions
+
+
+class TestBenchmarkCorpus(unittest.TestCase):
+    def test_every_position_builds_a_state_with_options(self):
+        for position in load_positions():
+            state = build_state(position)
+            user_options, opponent_options = state.get_all_options()
+            self.assertTrue(user_options, position['name'])
+            self.assertTrue(opponent_options, position['name'])
+
+    def test_position_names_are_unique(self):
+        names = [p['name'] for p in load_positions()]
+        self.assertEqual(len(names), len(set(names)))
+
+
+class TestCompareBenchmarks(unittest.TestCase):
+    def results(self, per_second, nodes_per_second):
+        return {
+            'positions': [
+                {
+                    'name': 'position',
+                    'benchmarks': {
+                        'evaluate': {'per_second': per_second},
+                        'get_payoff_matrix_depth_1': {'nodes_per_second': nodes_per_second},
+                    }
+                }
+            ]
+        }
+
+    def test_slower_throughput_is_a_regression(self):
+        lines, regressed = compare(self.results(100, 100), self.results(80, 100), 0.1)
+
+        self.assertTrue(regressed)
+        self.assertIn("REGRESSION", lines[0])
+        self.assertNotIn("REGRESSION", lines[1])
+
+    def test_throughput_within_the_threshold_is_not_a_regression(self):
+        lines, regressed = compare(self.results(100, 100), self.results(95, 120), 0.1)
+
+        self.assertFalse(regressed)
+        self.assertIn("improvement", lines[1])
+
+
+class TestDominanceLines(unittest.TestCase):
+    def result(self, searched, eliminated):
+        return {
+            'name': 'position',
+            'depth': 2,
+            'searched': {'decision': searched, 'payoff': 10.0, 'seconds': 2.0},
+            'eliminated': {'decision': eliminated, 'payoff': 10.0, 'seconds': 1.0},
+            'same_decision': searched == eliminated,
+        }
+
+    def test_a_different_decision_is_reported_as_changed(self):
+        lines, changed = dominance_lines(
+            {'dominance': [self.result("tackle", "tackle"), self.result("tackle", "switch pikachu")]}
+        )
+
+        self.assertTrue(changed)
+        self.assertNotIn("CHANGED", lines[0])
+        self.assertIn("CHANGED", lines[1])
+        self.assertIn("2.00x", lines[0])
+
+    def test_the_same_decisions_are_not_changed(self):
+        lines, changed = dominance_lines({'dominance': [self.result("tackle", "tackle")]})
+
+        self.assertFalse(changed)
+
+
+class TestReplay(unittest.TestCase):
+    def test_replayed_battles_match_their_snapshots(self):
+        snapshots = load_snapshots()
+        for path in log_paths([]):
+            log = load_log(path)
+            if log['format'] != "gen9randombattle":
+                continue
+            battle = replay(log)
+            self.assertEqual([], differences(snapshots[log['name']], snapshot(battle)), log['name'])
+
+    def test_the_replays_track_volatile_statuses(self):
+        timings = dict()
+        with timed_functions(timings):
+            for path in log_paths([]):
+                log = load_log(path)
+                if log['format'] == "gen9randombattle":
+                    replay(log)
+
+        for function in ('start_volatile_status', 'end_volatile_status', 'activate', 'prepare', 'singleturn'):
+            self.assertIn(function, timings)
+
+    def test_differences_are_reported_for_each_changed_value(self):
+        expected = {'turn': 3, 'user': {'active': {'hp': 100, 'moves': ['tackle', 'growl']}}}
+        actual = {'turn': 3, 'user': {'active': {'hp': 50, 'moves': ['tackle', 'ember']}}}
+
+        self.assertEqual(
+            [
+                'user.active.hp: expected 100, got 50',
+                'user.active.moves[1]: expected "growl", got "ember"',
+            ],
+            differences(expected, actual)
+        )
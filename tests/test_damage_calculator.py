@@ -1,9 +1,17 @@
 import unittest
 from collections import defaultdict
+from collections import OrderedDict
+
+import numpy as np
 
 import constants
 from showdown.engine.damage_calculator import _calculate_damage
 from showdown.engine.damage_calculator import calculate_damage
+from showdown.engine.damage_calculator import damage_cache
+from showdown.engine.damage_calculator import damage_matrix
+from showdown.engine.damage_calculator import get_move
+from showdown.engine.damage_calculator import _calculate_damage_rolls
+from showdown.engine.damage_calculator import _DamageCache
 from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
@@ -409,3 +417,181 @@ class TestCalculateDamage(unittest.TestCase):
         )
 
         self.assertNotEqual(0, damage_amounts[0])
+
+
+class TestDamageCache(unittest.TestCase):
+    def setUp(self):
+        damage_cache.clear()
+        self.charizard = Pokemon.from_state_pokemon_dict(StatePokemon("charizard", 100).to_dict())
+        self.venusaur = Pokemon.from_state_pokemon_dict(StatePokemon("venusaur", 100).to_dict())
+
+    def tearDown(self):
+        damage_cache.clear()
+
+    def uncached_damage(self, attacker, defender, move, conditions, calc_type):
+        attacking_move = get_move(move)
+        if attacking_move[constants.CATEGORY] == constants.PHYSICAL:
+            attack, defense = constants.ATTACK, constants.DEFENSE
+        else:
+            attack, defense = constants.SPECIAL_ATTACK, constants.SPECIAL_DEFENSE
+        return sorted(_calculate_damage_rolls(attacker, defender, attacking_move, attack, defense, conditions, calc_type))
+
+    def test_cached_damage_matches_uncached_damage(self):
+        moves = ['fireblast', 'sludgebomb', 'rockslide', 'earthquake', 'gigadrain', 'thunderbolt', 'psychic', 'dragonclaw']
+        conditions_list = [
+            {},
+            {constants.WEATHER: constants.SUN},
+            {constants.WEATHER: constants.SAND, constants.REFLECT: 1},
+            {constants.TERRAIN: constants.PSYCHIC_TERRAIN, constants.LIGHT_SCREEN: 1},
+            {constants.TERRAIN: constants.MISTY_TERRAIN, constants.AURORA_VEIL: 1},
+        ]
+        pokemon_modifiers = [
+            lambda p: None,
+            lambda p: setattr(p, 'attack_boost', 2),
+            lambda p: setattr(p, 'special_defense_boost', -1),
+            lambda p: setattr(p, 'status', constants.BURN),
+            lambda p: p.volatile_status.add('flashfire'),
+            lambda p: setattr(p, 'ability', 'unaware'),
+        ]
+
+        # run every combination twice so that the second pass is served from the cache
+        for _ in range(2):
+            for modifier in pokemon_modifiers:
+                attacker = Pokemon.from_state_pokemon_dict(StatePokemon("charizard", 100).to_dict())
+                defender = Pokemon.from_state_pokemon_dict(StatePokemon("venusaur", 100).to_dict())
+                modifier(attacker)
+                modifier(defender)
+                for move in moves:
+                    for conditions in conditions_list:
+                        for calc_type in ['average', 'min_max_average', 'all']:
+                            self.assertEqual(
+                                self.uncached_damage(attacker, defender, move, conditions, calc_type),
+                                sorted(_calculate_damage(attacker, defender, move, conditions=conditions, calc_type=calc_type))
+                            )
+
+        self.assertGreater(damage_cache.hits, 0)
+
+    def test_changing_hp_uses_cached_value(self):
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        self.venusaur.hp -= 100
+        self.charizard.hp -= 100
+        dmg = _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual([300], dmg)
+        self.assertEqual(1, damage_cache.hits)
+        self.assertEqual(1, damage_cache.misses)
+
+    def test_changing_boosts_does_not_use_cached_value(self):
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        self.charizard.special_attack_boost = 1
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual(0, damage_cache.hits)
+        self.assertEqual(2, damage_cache.misses)
+
+    def test_irrelevant_volatile_status_uses_cached_value(self):
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        self.charizard.volatile_status.add(constants.LEECH_SEED)
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual(1, damage_cache.hits)
+
+    def test_hp_dependent_moves_are_not_cached(self):
+        self.assertEqual([int(self.venusaur.hp / 2)], _calculate_damage(self.charizard, self.venusaur, 'superfang'))
+        self.venusaur.hp = 100
+        self.assertEqual([50], _calculate_damage(self.charizard, self.venusaur, 'superfang'))
+
+    def test_least_recently_used_value_is_evicted(self):
+        cache = _DamageCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_value_evicted_by_another_thread_after_it_is_found_is_still_returned(self):
+        class EvictedAfterLookup(OrderedDict):
+            def __getitem__(self, key):
+                value = super().__getitem__(key)
+                del self[key]
+                return value
+
+        cache = _DamageCache(2)
+        cache._cache = EvictedAfterLookup(a=1)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(1, cache.hits)
+
+    def test_hit_rate_is_reported(self):
+        cache = _DamageCache(2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.get('b')
+
+        self.assertEqual(0.5, cache.info()['hit_rate'])
+
+
+class TestDamageMatrix(unittest.TestCase):
+    def setUp(self):
+        self.attacker = Pokemon.from_state_pokemon_dict(StatePokemon("garchomp", 100).to_dict())
+        self.defenders = [
+            Pokemon.from_state_pokemon_dict(StatePokemon(name, 100).to_dict())
+            for name in ["charizard", "venusaur", "tyranitar", "gengar", "skarmory", "abomasnow"]
+        ]
+        self.moves = [
+            'earthquake', 'dragonclaw', 'fireblast', 'rockslide', 'thousandarrows', 'outrage',
+            'swordsdance', 'seismictoss', 'superfang', 'quickattack', 'iceshard', 'surf'
+        ]
+
+    def assert_matches_calculate_damage(self, conditions, calc_type='average'):
+        matrix = damage_matrix(self.attacker, self.defenders, self.moves, conditions, calc_type=calc_type)
+        for i, move in enumerate(self.moves):
+            for j, defender in enumerate(self.defenders):
+                expected = _calculate_damage(self.attacker, defender, move, conditions=dict(conditions), calc_type=calc_type)
+                if expected is None:
+                    self.assertTrue(np.isnan(matrix[i, j]).all())
+                else:
+                    self.assertEqual(sorted(expected), sorted(set(matrix[i, j])), "{} vs {}".format(move, defender.id))
+
+    def test_matrix_has_a_value_for_every_move_defender_and_roll(self):
+        matrix = damage_matrix(self.attacker, self.defenders, self.moves, calc_type='min_max_average')
+        self.assertEqual((len(self.moves), len(self.defenders), 3), matrix.shape)
+
+    def test_status_move_is_nan(self):
+        matrix = damage_matrix(self.attacker, self.defenders, ['swordsdance'])
+        self.assertTrue(np.isnan(matrix).all())
+
+    def test_matrix_matches_calculate_damage_without_conditions(self):
+        for calc_type in ['average', 'min', 'max', 'min_max', 'min_max_average', 'all']:
+            self.assert_matches_calculate_damage({}, calc_type=calc_type)
+
+    def test_matrix_matches_calculate_damage_with_weather_and_screens(self):
+        self.assert_matches_calculate_damage({constants.WEATHER: constants.SAND, constants.REFLECT: 1})
+        self.assert_matches_calculate_damage({constants.WEATHER: constants.SNOW, constants.LIGHT_SCREEN: 1})
+        self.assert_matches_calculate_damage({constants.WEATHER: constants.SUN, constants.AURORA_VEIL: 1})
+
+    def test_matrix_matches_calculate_damage_with_terrain(self):
+        for terrain in [constants.GRASSY_TERRAIN, constants.MISTY_TERRAIN, constants.PSYCHIC_TERRAIN, constants.ELECTRIC_TERRAIN]:
+            self.assert_matches_calculate_damage({constants.TERRAIN: terrain})
+
+    def test_matrix_matches_calculate_damage_with_boosts_and_statuses(self):
+        self.attacker.attack_boost = 2
+        self.attacker.status = constants.BURN
+        self.attacker.volatile_status.add('protosynthesisatk')
+        self.defenders[0].defense_boost = -1
+        self.defenders[1].volatile_status.add(constants.ROOST)
+        self.defenders[2].volatile_status.add('dig')
+        self.defenders[3].volatile_status.add('magnetrise')
+        self.defenders[4].volatile_status.add(constants.ROOST)
+        self.defenders[5].volatile_status.add('quarkdrivedef')
+        self.assert_matches_calculate_damage({})
+
+    def test_matrix_matches_calculate_damage_with_abilities(self):
+        for attacker_ability, defender_ability in [('unaware', 'unaware'), ('swordofruin', 'tabletsofruin'), ('infiltrator', 'noguard')]:
+            self.attacker.ability = attacker_ability
+            for defender in self.defenders:
+                defender.ability = defender_ability
+            self.assert_matches_calculate_damage({constants.REFLECT: 1})
@@ -1,8 +1,15 @@
 import unittest
 from unittest import mock
 
+import numpy as np
+
 from showdown.engine.select_best_move import pick_safest
 from showdown.battle_bots.nash_equilibrium.main import get_weighted_choices_from_multiple_score_lookups
+from showdown.battle_bots.nash_equilibrium.main import find_nash_equilibrium
+from showdown.battle_bots.nash_equilibrium.main import find_bayesian_nash_equilibrium
+from showdown.battle_bots.nash_equilibrium.main import previous_strategies
+from showdown.battle_bots.nash_equilibrium.main import equilibrium_cache
+from showdown.battle_bots.nash_equilibrium.main import remove_dominated_choices
 
 
 class TestPickSafest(unittest.TestCase):
@@ -165,3 +172,151 @@ class TestGetWeightedChoices(unittest.TestCase):
         expected_choices = [('a', 0.75), ('b', 0.25)]
 
         self.assertEqual(expected_choices, choices)
+
+
+class TestFindApproximateNashEquilibrium(unittest.TestCase):
+    def setUp(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+        self.score_lookup = {
+            ('a', 'c'): 3,
+            ('a', 'd'): -1,
+            ('b', 'c'): -1,
+            ('b', 'd'): 1,
+        }
+
+    def tearDown(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+
+    def test_approximate_equilibrium_is_found(self):
+        bot_choices, opponent_choices, bot_percentages, opponent_percentages, score = find_nash_equilibrium(
+            self.score_lookup,
+            approximate=True
+        )
+
+        self.assertEqual(['a', 'b'], list(bot_choices))
+        self.assertEqual(['c', 'd'], list(opponent_choices))
+        self.assertAlmostEqual(1/3, bot_percentages[0], places=1)
+        self.assertAlmostEqual(1/3, opponent_percentages[0], places=1)
+        self.assertAlmostEqual(1/3, score, places=1)
+
+    def test_strategies_are_saved_to_warm_start_the_next_solve(self):
+        find_nash_equilibrium(self.score_lookup, approximate=True)
+
+        bot_strategy, opponent_strategy = previous_strategies[frozenset(['a', 'b'])]
+        self.assertEqual({'a', 'b'}, set(bot_strategy))
+        self.assertEqual({'c', 'd'}, set(opponent_strategy))
+
+
+class TestFindBayesianNashEquilibrium(unittest.TestCase):
+    def setUp(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+
+    def tearDown(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+
+    def test_bot_choice_is_weighted_by_the_priors(self):
+        # 'a' is best against the first opponent set and 'b' is best against the second
+        sl1 = {
+            ('a', 'c'): 10,
+            ('b', 'c'): 0,
+        }
+        sl2 = {
+            ('a', 'd'): 0,
+            ('b', 'd'): 10,
+        }
+
+        bot_choices, bot_percentages = find_bayesian_nash_equilibrium([sl1, sl2], [1, 3])
+
+        self.assertEqual(['a', 'b'], bot_choices)
+        self.assertAlmostEqual(0, bot_percentages[0], places=2)
+        self.assertAlmostEqual(1, bot_percentages[1], places=2)
+
+    def test_only_bot_choices_in_every_score_lookup_are_used(self):
+        sl1 = {
+            ('a', 'c'): 10,
+            ('b', 'c'): 0,
+            ('z', 'c'): 100,
+        }
+        sl2 = {
+            ('a', 'd'): 10,
+            ('b', 'd'): 0,
+        }
+
+        bot_choices, bot_percentages = find_bayesian_nash_equilibrium([sl1, sl2], [1, 1])
+
+        self.assertEqual(['a', 'b'], bot_choices)
+
+    def test_returns_none_when_no_bot_choice_is_in_every_score_lookup(self):
+        sl1 = {
+            ('a', 'c'): 10,
+        }
+        sl2 = {
+            ('b', 'd'): 10,
+        }
+
+        self.assertIsNone(find_bayesian_nash_equilibrium([sl1, sl2], [1, 1]))
+
+    def test_same_game_is_found_in_the_cache(self):
+        sl1 = {
+            ('a', 'c'): 10,
+            ('b', 'c'): 0,
+        }
+        sl2 = {
+            ('a', 'd'): 0,
+            ('b', 'd'): 10,
+        }
+
+        first = find_bayesian_nash_equilibrium([sl1, sl2], [1, 3])
+        second = find_bayesian_nash_equilibrium([sl1, sl2], [1, 3])
+
+        self.assertEqual(1, equilibrium_cache.hits)
+        self.assertEqual(first[0], second[0])
+        np.testing.assert_allclose(first[1], second[1])
+
+
+class TestRemoveDominatedChoices(unittest.TestCase):
+    def setUp(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+
+    def tearDown(self):
+        previous_strategies.clear()
+        equilibrium_cache.clear()
+
+    def test_bot_choice_is_only_removed_when_dominated_against_every_type(self):
+        first = np.array([
+            [5.0, 1.0],
+            [4.0, 0.0],
+            [3.0, -1.0],
+        ])
+        second = np.array([
+            [0.0],
+            [1.0],
+            [-1.0],
+        ])
+
+        kept_rows, kept_columns = remove_dominated_choices([first, second])
+
+        np.testing.assert_array_equal([True, True, False], kept_rows)
+        np.testing.assert_array_equal([False, True], kept_columns[0])
+        np.testing.assert_array_equal([True], kept_columns[1])
+
+    def test_removed_choices_have_no_percentage(self):
+        score_lookup = {
+            ('a', 'c'): 10,
+            ('a', 'd'): 0,
+            ('b', 'c'): 0,
+            ('b', 'd'): 10,
+            ('z', 'c'): -5,
+            ('z', 'd'): -5,
+        }
+
+        bot_choices, _, bot_percentages, _, _ = find_nash_equilibrium(score_lookup, approximate=True)
+
+        self.assertEqual(['a', 'b', 'z'], list(bot_choices))
+        self.assertEqual(0, bot_percentages[2])
+        self.assertAlmostEqual(1, sum(bot_percentages))
@@ -0,0 +1,134 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from showdown.battle_bots.nash_equilibrium.equilibrium_cache import EquilibriumCache
+from showdown.battle_bots.nash_equilibrium.equilibrium_cache import canonical_form
+
+
+class TestCanonicalForm(unittest.TestCase):
+    def test_permuted_rows_and_columns_have_the_same_key(self):
+        matrix = np.array([
+            [1, 2, 3],
+            [4, 5, 6],
+        ])
+        permuted = matrix[[1, 0]][:, [2, 0, 1]]
+
+        self.assertEqual(canonical_form([matrix], [1])[0], canonical_form([permuted], [1])[0])
+
+    def test_matrices_that_round_to_the_same_values_have_the_same_key(self):
+        self.assertEqual(
+            canonical_form([[[1.2, -0.3]]], [1])[0],
+            canonical_form([[[0.9, 0.4]]], [1])[0]
+        )
+
+    def test_different_matrices_have_different_keys(self):
+        self.assertNotEqual(
+            canonical_form([[[1, 2]]], [1])[0],
+            canonical_form([[[1, 3]]], [1])[0]
+        )
+
+    def test_different_priors_have_different_keys(self):
+        matrices = [[[1, 2]], [[3, 4]]]
+        self.assertNotEqual(canonical_form(matrices, [1, 1])[0], canonical_form(matrices, [1, 2])[0])
+
+    def test_priors_are_normalized(self):
+        matrices = [[[1, 2]], [[3, 4]]]
+        self.assertEqual(canonical_form(matrices, [1, 1])[0], canonical_form(matrices, [5, 5])[0])
+
+
+class TestEquilibriumCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = EquilibriumCache(10)
+        self.matrix = np.array([
+            [1, 2, 3],
+            [4, 5, 6],
+        ])
+
+    def test_miss_returns_none(self):
+        self.assertIsNone(self.cache.get([self.matrix], [1]))
+        self.assertEqual(1, self.cache.misses)
+
+    def test_hit_returns_the_strategies_in_the_order_they_were_given(self):
+        self.cache.put([self.matrix], [1], [0.25, 0.75], [[0.1, 0.2, 0.7]])
+
+        row_strategy, column_strategies = self.cache.get([self.matrix], [1])
+
+        np.testing.assert_allclose([0.25, 0.75], row_strategy)
+        np.testing.assert_allclose([0.1, 0.2, 0.7], column_strategies[0])
+        self.assertEqual(1, self.cache.hits)
+
+    def test_hit_for_a_permuted_matrix_returns_permuted_strategies(self):
+        self.cache.put([self.matrix], [1], [0.25, 0.75], [[0.1, 0.2, 0.7]])
+        permuted = self.matrix[[1, 0]][:, [2, 0, 1]]
+
+        row_strategy, column_strategies = self.cache.get([permuted], [1])
+
+        np.testing.assert_allclose([0.75, 0.25], row_strategy)
+        np.testing.assert_allclose([0.7, 0.1, 0.2], column_strategies[0])
+
+    def test_hit_rate(self):
+        self.cache.put([self.matrix], [1], [0.5, 0.5], [[0.2, 0.3, 0.5]])
+        self.cache.get([self.matrix], [1])
+        self.cache.get([self.matrix + 10], [1])
+
+        self.assertEqual(0.5, self.cache.hit_rate())
+        self.assertEqual(0.5, self.cache.info()['hit_rate'])
+
+    def test_least_recently_used_game_is_removed(self):
+        cache = EquilibriumCache(2)
+        cache.put([[[1]]], [1], [1], [[1]])
+        cache.put([[[2]]], [1], [1], [[1]])
+        cache.get([[[1]]], [1])
+        cache.put([[[3]]], [1], [1], [[1]])
+
+        self.assertIsNotNone(cache.get([[[1]]], [1]))
+        self.assertIsNone(cache.get([[[2]]], [1]))
+
+    def test_saved_cache_can_be_loaded(self):
+        self.cache.put([self.matrix], [1], [0.25, 0.75], [[0.1, 0.2, 0.7]])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "equilibrium_cache")
+            self.cache.save(path)
+
+            loaded = EquilibriumCache(10)
+            loaded.load(path)
+
+        row_strategy, column_strategies = loaded.get([self.matrix], [1])
+        np.testing.assert_allclose([0.25, 0.75], row_strategy)
+
+    def test_loading_a_missing_file_does_nothing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.cache.load(os.path.join(directory, "does_not_exist"))
+
+        self.assertEqual(0, self.cache.info()['size'])
+
+    def test_loading_a_file_that_is_not_a_saved_cache_does_nothing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "equilibrium_cache")
+            for contents in (b"", b"[1, 2, 3]", b'{"version": 2, "games": [[1]]}', pickle.dumps((1, []))):
+                with open(path, 'wb') as f:
+                    f.write(contents)
+                self.cache.load(path)
+
+        self.assertEqual(0, self.cache.info()['size'])
+
+    def test_loading_a_different_version_does_nothing(self):
+        self.cache.put([self.matrix], [1], [0.25, 0.75], [[0.1, 0.2, 0.7]])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "equilibrium_cache")
+            self.cache.save(path)
+            with open(path) as f:
+                saved = f.read().replace('"version": 2', '"version": 1')
+            with open(path, 'w') as f:
+                f.write(saved)
+
+            loaded = EquilibriumCache(10)
+            loaded.load(path)
+
+        self.assertEqual(0, loaded.info()['size'])
@@ -0,0 +1,97 @@
+import logging
+import unittest
+
+from showdown.event_log import Event
+from showdown.event_log import MESSAGE
+from showdown.event_log import TRACE
+from showdown.event_log import SamplingFilter
+from showdown.event_log import BoundedQueueHandler
+from showdown.event_log import log_event
+
+
+def make_record(msg, event=None):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+    if event is not None:
+        record.event = event
+    return record
+
+
+class TestLogEvent(unittest.TestCase):
+    def setUp(self):
+        # the tests disable logging
+        self.disabled = logging.root.manager.disable
+        logging.disable(logging.NOTSET)
+        self.logger = logging.getLogger("showdown.event_log")
+        self.level = self.logger.level
+        self.handler = BoundedQueueHandler()
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+        logging.disable(self.disabled)
+
+    def test_event_is_queued_as_compact_json_without_being_formatted(self):
+        log_event("decision", "battle-gen9ou-1", 3, seconds=1.25, choice="/choose move thunderbolt")
+
+        record = self.handler.queue.get_nowait()
+
+        self.assertIsInstance(record.msg, Event)
+        self.assertEqual("decision", record.event)
+        self.assertEqual(
+            'Event: {"battle": "battle-gen9ou-1", "turn": 3, "event": "decision", "seconds": 1.25, "choice": "/choose move thunderbolt"}',
+            record.getMessage()
+        )
+
+    def test_message_events_are_not_logged_above_debug(self):
+        log_event(MESSAGE, "battle-gen9ou-1", 3, seconds=0.001, size=100)
+
+        self.assertTrue(self.handler.queue.empty())
+
+    def test_other_records_are_formatted_when_they_are_queued(self):
+        self.logger.info("Options: %s", [1, 2])
+
+        record = self.handler.queue.get_nowait()
+
+        self.assertEqual("Options: [1, 2]", record.msg)
+        self.assertIsNone(record.args)
+
+
+class TestBoundedQueueHandler(unittest.TestCase):
+    def test_records_are_dropped_when_the_queue_is_full(self):
+        handler = BoundedQueueHandler(maxsize=2)
+
+        for i in range(5):
+            handler.handle(make_record("message {}".format(i)))
+
+        self.assertEqual(2, handler.queue.qsize())
+        self.assertEqual(3, handler.dropped)
+
+
+class TestSamplingFilter(unittest.TestCase):
+    def test_one_in_every_rate_records_of_an_event_are_kept(self):
+        sampling_filter = SamplingFilter({MESSAGE: 3})
+
+        kept = [sampling_filter.filter(make_record("message", MESSAGE)) for _ in range(7)]
+
+        self.assertEqual([True, False, False, True, False, False, True], kept)
+        self.assertEqual(4, sampling_filter.dropped)
+
+    def test_records_that_are_not_sampled_are_kept(self):
+        sampling_filter = SamplingFilter({MESSAGE: 3})
+
+        kept = [sampling_filter.filter(make_record("decision", "decision")) for _ in range(3)]
+        kept.append(sampling_filter.filter(make_record("not an event")))
+
+        self.assertEqual([True] * 4, kept)
+
+
+class TestTraceLevel(unittest.TestCase):
+    def test_trace_can_be_set_by_name_and_is_below_debug(self):
+        logger = logging.getLogger("tests.trace")
+        logger.setLevel("TRACE")
+        self.addCleanup(logger.setLevel, logging.NOTSET)
+
+        self.assertEqual(TRACE, logger.level)
+        self.assertLess(TRACE, logging.DEBUG)
@@ -0,0 +1,178 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+import websockets
+
+from config import ShowdownConfig
+from local_server.battles import rename
+from local_server.server import LocalServer
+from local_server.server import load_transcript
+from showdown.run_battle import pokemon_battle
+from showdown.websocket_client import PSWebsocketClient
+from showdown.websocket_client import LoginError
+
+
+BATTLE_FORMAT = "gen9randombattle"
+
+
+async def play_battle(server, name):
+    ps_websocket_client = await PSWebsocketClient.create(name, None, server.address, server.login_uri)
+    await ps_websocket_client.login()
+    await ps_websocket_client.search_for_match(BATTLE_FORMAT, None)
+    winner = await asyncio.wait_for(pokemon_battle(ps_websocket_client, BATTLE_FORMAT), 60)
+    await ps_websocket_client.websocket.close()
+    return winner
+
+
+async def connect(server, name):
+    websocket = await websockets.connect("ws://{}/showdown/websocket".format(server.address))
+    await websocket.send("|/trn {},0,assertion".format(name))
+    return websocket
+
+
+async def receive_until(websocket, text):
+    while True:
+        message = await asyncio.wait_for(websocket.recv(), 10)
+        if text in message:
+            return message
+
+
+class TestLocalServer(unittest.TestCase):
+    def setUp(self):
+        self.config = dict(vars(ShowdownConfig))
+        ShowdownConfig.battle_bot_module = "most_damage"
+        ShowdownConfig.pokemon_mode = BATTLE_FORMAT
+        ShowdownConfig.damage_calc_type = "average"
+        ShowdownConfig.save_replay = False
+        ShowdownConfig.slow_decision_seconds = None
+        ShowdownConfig.search_stats = False
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        vars(ShowdownConfig).clear()
+        vars(ShowdownConfig).update(self.config)
+        shutil.rmtree(self.directory)
+
+    def test_bot_plays_a_battle_against_the_server(self):
+        async def run():
+            async with LocalServer(port=0, login_port=0, seed=1) as server:
+                winner = await play_battle(server, "bot")
+                return winner, server.metrics.summary()
+
+        winner, metrics = asyncio.run(run())
+
+        self.assertIn(winner, ["bot", "house"])
+        self.assertEqual(1, metrics['battles_finished'])
+        self.assertGreater(metrics['turns'], 0)
+        self.assertGreater(metrics['choices'], 0)
+        self.assertEqual(0, metrics['invalid_choices'])
+
+    def test_recorded_battle_is_replayed(self):
+        async def record():
+            async with LocalServer(port=0, login_port=0, seed=2, record_dir=self.directory) as server:
+                return await play_battle(server, "bot")
+
+        async def replay(transcript):
+            async with LocalServer(port=0, login_port=0, transcripts=[transcript]) as server:
+                winner = await play_battle(server, "another-bot")
+                return winner, server.metrics.summary()
+
+        recorded_winner = asyncio.run(record())
+        transcript_file, = os.listdir(self.directory)
+        transcript = load_transcript(os.path.join(self.directory, transcript_file))
+        winner, metrics = asyncio.run(replay(transcript))
+
+        self.assertEqual("bot", transcript['player'])
+        self.assertEqual(recorded_winner.replace("bot", "another-bot"), winner)
+        self.assertGreater(metrics['recorded_choices'], 0)
+        self.assertEqual(metrics['recorded_choices'], metrics['recorded_choices_matched'])
+
+    def test_player_that_does_not_choose_loses_when_the_timeout_passes(self):
+        async def run():
+            async with LocalServer(port=0, login_port=0, seed=3, choice_timeout=0.1) as server:
+                websocket = await connect(server, "slowbot")
+                await websocket.send("|/search {}".format(BATTLE_FORMAT))
+                message = await receive_until(websocket, "|win|")
+                await websocket.close()
+                return message, server.metrics.summary()
+
+        message, metrics = asyncio.run(run())
+
+        self.assertIn("|win|house", message)
+        self.assertEqual(1, metrics['timeouts'])
+
+    def test_challenge_starts_a_battle_between_two_players(self):
+        async def run():
+            async with LocalServer(port=0, login_port=0, seed=4) as server:
+                challenger = await connect(server, "alice")
+                challenged = await connect(server, "bob")
+                await receive_until(challenged, "|updateuser|")
+                await challenger.send("|/challenge bob,{}".format(BATTLE_FORMAT))
+                challenge = await receive_until(challenged, "|pm|")
+                await challenged.send("|/accept alice")
+                first = await receive_until(challenger, "|init|battle")
+                second = await receive_until(challenged, "|init|battle")
+                request = await receive_until(challenged, "|request|")
+                return challenge, first, second, request
+
+        challenge, first, second, request = asyncio.run(run())
+
+        self.assertEqual(9, len(challenge.split('|')))
+        self.assertEqual(first.split('\n')[0], second.split('\n')[0])
+        self.assertIn("|title|alice vs. bob", first)
+        self.assertEqual("p2", json.loads(request.split("|request|")[1])['side']['id'])
+
+
+class TestLoginToLocalServer(unittest.TestCase):
+    def test_the_event_loop_carries_on_while_logging_in(self):
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            async with LocalServer(port=0, login_port=0, login_delay=0.5) as server:
+                ps_websocket_client = await PSWebsocketClient.create("bot", None, server.address, server.login_uri)
+                ticker = asyncio.ensure_future(tick())
+                await ps_websocket_client.login()
+                ticker.cancel()
+                message = await receive_until(ps_websocket_client.websocket, "|updateuser|")
+                await ps_websocket_client.websocket.close()
+                return message
+
+        message = asyncio.run(run())
+
+        self.assertIn("bot", message)
+        self.assertGreater(len(ticks), 10)
+
+    @mock.patch('showdown.websocket_client.LOGIN_TIMEOUT', 0.1)
+    def test_login_that_times_out_raises_a_login_error(self):
+        async def run():
+            async with LocalServer(port=0, login_port=0, login_delay=1) as server:
+                ps_websocket_client = await PSWebsocketClient.create("bot", None, server.address, server.login_uri)
+                try:
+                    await ps_websocket_client.login()
+                finally:
+                    await ps_websocket_client.websocket.close()
+
+        with self.assertRaises(LoginError):
+            asyncio.run(run())
+
+
+class TestRename(unittest.TestCase):
+    def test_rename_replaces_the_battle_tag_and_the_players_name(self):
+        frame = ">battle-1\n|j|☆bot\n|title|bot vs. house\n|c|☆house|bot is here\n|win|bot"
+
+        renamed = rename(frame, "battle-1", "battle-7", "bot", "other")
+
+        self.assertEqual(
+            ">battle-7\n|j|☆other\n|title|other vs. house\n|c|☆house|bot is here\n|win|other",
+            renamed
+        )
@@ -0,0 +1,44 @@
+import unittest
+from unittest import mock
+
+import constants
+from config import ShowdownConfig
+from showdown.battle import Pokemon
+from showdown.engine import damage_calculator
+from showdown.battle_bots.most_damage.main import BattleBot
+
+
+class TestMostDamageBot(unittest.TestCase):
+    def setUp(self):
+        ShowdownConfig.pokemon_mode = "gen9ou"
+        ShowdownConfig.damage_calc_type = "average"
+        self.battle = BattleBot(None)
+        self.battle.generation = "gen9"
+        self.battle.battle_type = constants.STANDARD_BATTLE
+        self.battle.rqid = 1
+        self.battle.user.active = Pokemon('pikachu', 100)
+        for move in ('thunderbolt', 'quickattack', 'growl'):
+            self.battle.user.active.add_move(move)
+        self.battle.opponent.active = Pokemon('gyarados', 100)
+
+        get_pokemon_sets_patch = mock.patch('showdown.battle.get_pokemon_sets')
+        self.addCleanup(get_pokemon_sets_patch.stop)
+        get_pokemon_sets_patch.start().return_value = {
+            'spreads': [['serious', '85,85,85,85,85,85', 100.0]],
+            'items': [['lifeorb', 60.0], ['choiceband', 40.0]],
+            'abilities': [['intimidate', 100.0]],
+            'moves': [['waterfall', 100.0], ['earthquake', 100.0], ['dragondance', 100.0], ['taunt', 100.0]],
+        }
+
+    def test_the_most_damaging_move_is_chosen(self):
+        self.assertEqual(["/choose move thunderbolt", "1"], self.battle.find_best_move())
+
+    def test_each_of_the_opponents_sets_is_a_defender_in_one_damage_matrix(self):
+        with mock.patch(
+            'showdown.battle_bots.most_damage.main.damage_matrix', wraps=damage_calculator.damage_matrix
+        ) as damage_matrix:
+            self.battle.find_best_move()
+
+        damage_matrix.assert_called_once()
+        defenders = damage_matrix.call_args[0][1]
+        self.assertEqual(['lifeorb', 'choiceband'], [d.item for d in defenders])
@@ -0,0 +1,56 @@
+import unittest
+
+import constants
+from data import all_move_json
+from showdown.engine.move_records import CATEGORY_PHYSICAL
+from showdown.engine.move_records import CATEGORY_STATUS
+from showdown.engine.move_records import compile_move_records
+from showdown.engine.move_records import move_records
+from showdown.engine.move_records import recompile_move_records
+from showdown.engine.damage_calculator import pokemon_type_indicies
+
+
+class TestMoveRecords(unittest.TestCase):
+    def test_every_move_has_a_record(self):
+        self.assertEqual(set(all_move_json), set(move_records))
+
+    def test_record_has_same_values_as_move_dict(self):
+        record = move_records['earthquake']
+        self.assertEqual(100, record.base_power)
+        self.assertEqual(CATEGORY_PHYSICAL, record.category)
+        self.assertEqual(pokemon_type_indicies['ground'], record.type)
+        self.assertIs(all_move_json['earthquake'], record.move_dict)
+
+    def test_flags_are_a_bitmask_of_the_move_flags(self):
+        for move_id in ['earthquake', 'closecombat', 'boomburst', 'solarbeam']:
+            record = move_records[move_id]
+            for flag in ['contact', 'sound', 'charge', 'nonsky', 'protect']:
+                self.assertEqual(flag in all_move_json[move_id][constants.FLAGS], record.has_flag(flag), "{} {}".format(move_id, flag))
+
+    def test_unknown_flag_is_not_set(self):
+        self.assertFalse(move_records['tackle'].has_flag('not_a_flag'))
+
+    def test_derived_facts(self):
+        self.assertTrue(move_records['uturn'].is_switch_out)
+        self.assertTrue(move_records['rapidspin'].is_hazard_clearing)
+        self.assertTrue(move_records['haze'].is_boost_reset)
+        self.assertTrue(move_records['scald'].thaws_user)
+        self.assertTrue(move_records['closecombat'].makes_contact)
+        self.assertTrue(move_records['boomburst'].is_sound)
+        self.assertFalse(move_records['swordsdance'].is_damaging)
+        self.assertEqual(CATEGORY_STATUS, move_records['swordsdance'].category)
+
+    def test_compiling_a_modified_move_uses_the_modified_values(self):
+        modified_moves = {'tackle': {**all_move_json['tackle'], constants.BASE_POWER: 35}}
+        self.assertEqual(35, compile_move_records(modified_moves)['tackle'].base_power)
+
+    def test_recompiling_updates_the_existing_lookup(self):
+        original_base_power = all_move_json['tackle'][constants.BASE_POWER]
+        lookup = move_records
+        try:
+            all_move_json['tackle'][constants.BASE_POWER] = 35
+            recompile_move_records()
+            self.assertEqual(35, lookup['tackle'].base_power)
+        finally:
+            all_move_json['tackle'][constants.BASE_POWER] = original_base_power
+            recompile_move_records()
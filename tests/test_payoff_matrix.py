@@ -0,0 +1,149 @@
+import unittest
+
+import numpy as np
+
+from showdown.engine.payoff_matrix import PayoffMatrix
+from showdown.engine.select_best_move import pick_safest
+
+
+class TestPayoffMatrix(unittest.TestCase):
+    def setUp(self):
+        self.score_lookup = {
+            ("a", "x"): 100,
+            ("a", "y"): -100,
+            ("c", "x"): 200,
+            ("c", "y"): -200,
+        }
+
+    def test_from_dict_keeps_the_order_of_the_options(self):
+        payoff_matrix = PayoffMatrix.from_dict(self.score_lookup)
+
+        self.assertEqual(["a", "c"], payoff_matrix.rows)
+        self.assertEqual(["x", "y"], payoff_matrix.columns)
+        np.testing.assert_array_equal([[100, -100], [200, -200]], payoff_matrix.scores)
+
+    def test_missing_pairs_are_nan_and_are_not_in_the_dictionary(self):
+        del self.score_lookup[("c", "y")]
+        payoff_matrix = PayoffMatrix.from_dict(self.score_lookup)
+
+        self.assertTrue(np.isnan(payoff_matrix.scores[1, 1]))
+        self.assertEqual(self.score_lookup, payoff_matrix.to_dict())
+
+    def test_maximin_ignores_nan(self):
+        payoff_matrix = PayoffMatrix(np.array([[10, -100], [20, np.nan]]), ["a", "c"], ["x", "y"])
+
+        self.assertEqual((("c", "x"), 20), payoff_matrix.maximin())
+
+    def test_maximin_does_not_pick_a_row_that_is_all_nan(self):
+        payoff_matrix = PayoffMatrix(np.array([[np.nan, np.nan], [-20, 5]]), ["a", "c"], ["x", "y"])
+
+        self.assertEqual((("c", "x"), -20), payoff_matrix.maximin())
+
+    def test_remove_guaranteed_opponent_moves_removes_columns_where_the_bot_has_no_choice(self):
+        payoff_matrix = PayoffMatrix(
+            np.array([
+                [10, -50, 3],
+                [20, -50, np.nan],
+            ]),
+            ["a", "c"],
+            ["x", "y", "z"]
+        )
+
+        modified = payoff_matrix.remove_guaranteed_opponent_moves()
+
+        self.assertEqual(["x"], modified.columns)
+        np.testing.assert_array_equal([[10], [20]], modified.scores)
+
+    def test_remove_guaranteed_opponent_moves_does_nothing_with_one_opponent_option(self):
+        payoff_matrix = PayoffMatrix(np.array([[-50], [-50]]), ["a", "c"], ["x"])
+
+        self.assertIs(payoff_matrix, payoff_matrix.remove_guaranteed_opponent_moves())
+
+    def test_concatenate_labels_columns_by_matrix_and_fills_missing_rows_with_nan(self):
+        first = PayoffMatrix(np.array([[1.0, 2.0], [3.0, 4.0]]), ["a", "c"], ["x", "y"])
+        second = PayoffMatrix(np.array([[5.0]]), ["c"], ["x"])
+
+        payoff_matrix = PayoffMatrix.concatenate([first, second])
+
+        self.assertEqual(["a", "c"], payoff_matrix.rows)
+        self.assertEqual([(0, "x"), (0, "y"), (1, "x")], payoff_matrix.columns)
+        np.testing.assert_array_equal([[1, 2, np.nan], [3, 4, 5]], payoff_matrix.scores)
+
+    def test_dominated_rows_and_columns(self):
+        payoff_matrix = PayoffMatrix(
+            np.array([
+                [1.0, 5.0, 10.0],
+                [2.0, 6.0, 3.0],
+                [0.0, 4.0, -1.0],
+            ]),
+            ["a", "b", "c"],
+            ["x", "y", "z"]
+        )
+
+        np.testing.assert_array_equal([False, False, True], payoff_matrix.dominated_rows())
+        np.testing.assert_array_equal([False, True, False], payoff_matrix.dominated_columns())
+
+    def test_options_with_nan_are_never_dominated_and_never_dominate(self):
+        payoff_matrix = PayoffMatrix(
+            np.array([
+                [10.0, 10.0],
+                [0.0, np.nan],
+                [np.nan, 20.0],
+            ]),
+            ["a", "b", "c"],
+            ["x", "y"]
+        )
+
+        np.testing.assert_array_equal([False, False, False], payoff_matrix.dominated_rows())
+        np.testing.assert_array_equal([False, False], payoff_matrix.dominated_columns())
+
+    def test_remove_dominated_removes_options_until_none_are_dominated(self):
+        # "c" is only dominated once the opponent's "y" has been removed
+        payoff_matrix = PayoffMatrix(
+            np.array([
+                [3.0, 5.0],
+                [2.0, 7.0],
+                [1.0, 9.0],
+            ]),
+            ["a", "b", "c"],
+            ["x", "y"]
+        )
+
+        reduced = payoff_matrix.remove_dominated()
+
+        self.assertEqual(["a"], reduced.rows)
+        self.assertEqual(["x"], reduced.columns)
+        self.assertEqual(payoff_matrix.maximin()[1], reduced.maximin()[1])
+
+    def test_remove_dominated_can_keep_the_rows(self):
+        payoff_matrix = PayoffMatrix(np.array([[3.0, 5.0], [2.0, 7.0]]), ["a", "b"], ["x", "y"])
+
+        reduced = payoff_matrix.remove_dominated(rows=False)
+
+        self.assertEqual(["a", "b"], reduced.rows)
+        self.assertEqual(["x"], reduced.columns)
+
+    def test_select_rows(self):
+        payoff_matrix = PayoffMatrix.from_dict(self.score_lookup).select_rows(["c"])
+
+        self.assertEqual(["c"], payoff_matrix.rows)
+        np.testing.assert_array_equal([[200, -200]], payoff_matrix.scores)
+
+
+class TestPickSafestWithPayoffMatrix(unittest.TestCase):
+    def test_pick_safest_matches_the_dictionary(self):
+        score_lookup = {
+            ("a", "x"): 100,
+            ("a", "y"): -100,
+            ("a", "z"): -500,
+            ("c", "x"): 200,
+            ("c", "y"): -200,
+            ("c", "z"): -400,
+        }
+
+        self.assertEqual(pick_safest(score_lookup), pick_safest(PayoffMatrix.from_dict(score_lookup)))
+
+    def test_remove_guaranteed_falls_back_to_the_whole_matrix(self):
+        payoff_matrix = PayoffMatrix(np.array([[-50, -60], [-50, -60]]), ["a", "c"], ["x", "y"])
+
+        self.assertEqual((("a", "y"), -60), pick_safest(payoff_matrix, remove_guaranteed=True))
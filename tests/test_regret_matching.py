@@ -0,0 +1,126 @@
+import unittest
+
+import numpy as np
+
+from showdown.battle_bots.nash_equilibrium.regret_matching import solve
+from showdown.battle_bots.nash_equilibrium.regret_matching import exploitability
+from showdown.battle_bots.nash_equilibrium.regret_matching import solve_bayesian
+from showdown.battle_bots.nash_equilibrium.regret_matching import bayesian_exploitability
+
+
+class TestRegretMatching(unittest.TestCase):
+    def test_rock_paper_scissors_is_uniform(self):
+        matrix = [
+            [0, -1, 1],
+            [1, 0, -1],
+            [-1, 1, 0],
+        ]
+        equilibrium = solve(matrix, tolerance=0.001)
+
+        np.testing.assert_allclose([1/3] * 3, equilibrium.row_strategy, atol=0.01)
+        np.testing.assert_allclose([1/3] * 3, equilibrium.column_strategy, atol=0.01)
+        self.assertAlmostEqual(0, equilibrium.value, places=2)
+
+    def test_dominant_row_is_played(self):
+        matrix = [
+            [10, 20],
+            [5, 15],
+        ]
+        equilibrium = solve(matrix, tolerance=0.001)
+
+        np.testing.assert_allclose([1, 0], equilibrium.row_strategy, atol=0.01)
+        np.testing.assert_allclose([1, 0], equilibrium.column_strategy, atol=0.01)
+        self.assertAlmostEqual(10, equilibrium.value, places=1)
+
+    def test_mixed_equilibrium_of_matching_pennies_with_unequal_payoffs(self):
+        # both players play their first option 1/3 of the time
+        matrix = [
+            [3, -1],
+            [-1, 1],
+        ]
+        equilibrium = solve(matrix, tolerance=0.001, time_limit=None)
+
+        np.testing.assert_allclose([1/3, 2/3], equilibrium.row_strategy, atol=0.01)
+        np.testing.assert_allclose([1/3, 2/3], equilibrium.column_strategy, atol=0.01)
+        self.assertAlmostEqual(1/3, equilibrium.value, places=2)
+
+    def test_exploitability_is_within_the_tolerance(self):
+        matrix = np.random.default_rng(0).normal(0, 100, size=(13, 40))
+        equilibrium = solve(matrix, tolerance=0.5, time_limit=None)
+
+        self.assertLessEqual(equilibrium.exploitability, 0.5)
+        self.assertAlmostEqual(
+            equilibrium.exploitability,
+            exploitability(matrix, equilibrium.row_strategy, equilibrium.column_strategy)
+        )
+
+    def test_stops_after_the_iteration_budget(self):
+        matrix = np.random.default_rng(0).normal(0, 100, size=(13, 40))
+        equilibrium = solve(matrix, max_iterations=10, tolerance=0, time_limit=None)
+
+        self.assertEqual(10, equilibrium.iterations)
+        self.assertAlmostEqual(1, equilibrium.row_strategy.sum())
+        self.assertAlmostEqual(1, equilibrium.column_strategy.sum())
+
+    def test_warm_start_at_the_equilibrium_needs_no_iterations(self):
+        matrix = np.random.default_rng(0).normal(0, 100, size=(13, 40))
+        cold = solve(matrix, tolerance=0.5, time_limit=None)
+        warm = solve(
+            matrix,
+            tolerance=0.5,
+            time_limit=None,
+            row_warm_start=cold.row_strategy,
+            column_warm_start=cold.column_strategy
+        )
+
+        self.assertGreater(cold.iterations, 0)
+        self.assertEqual(0, warm.iterations)
+
+    def test_warm_start_of_the_wrong_size_is_ignored(self):
+        equilibrium = solve([[0, -1, 1], [1, 0, -1], [-1, 1, 0]], tolerance=0.001, row_warm_start=[1, 0])
+
+        np.testing.assert_allclose([1/3] * 3, equilibrium.row_strategy, atol=0.01)
+
+
+class TestBayesianRegretMatching(unittest.TestCase):
+    def test_single_type_is_the_same_as_solve(self):
+        matrix = np.random.default_rng(0).normal(0, 100, size=(6, 8))
+        equilibrium = solve(matrix, time_limit=None)
+        bayesian_equilibrium = solve_bayesian([matrix], [1], time_limit=None)
+
+        np.testing.assert_allclose(equilibrium.row_strategy, bayesian_equilibrium.row_strategy)
+        np.testing.assert_allclose(equilibrium.column_strategy, bayesian_equilibrium.column_strategies[0])
+
+    def test_row_player_hedges_between_types_it_cannot_tell_apart(self):
+        # the first row is best against the first type and the second row is best against the second type
+        # each type only has one column so the bot plays whichever row is best against the likelier type
+        matrices = [
+            [[10], [0]],
+            [[0], [10]],
+        ]
+        equilibrium = solve_bayesian(matrices, [3, 1], tolerance=0.001, time_limit=None)
+
+        np.testing.assert_allclose([1, 0], equilibrium.row_strategy, atol=0.01)
+        self.assertAlmostEqual(7.5, equilibrium.value, places=1)
+
+    def test_each_type_plays_its_own_strategy(self):
+        matrices = [
+            [[3, -1], [-1, 1]],
+            [[5, 0], [5, 0]],
+        ]
+        equilibrium = solve_bayesian(matrices, [1, 1], tolerance=0.001, time_limit=None)
+
+        # the second type always plays its second column
+        np.testing.assert_allclose([0, 1], equilibrium.column_strategies[1], atol=0.01)
+
+    def test_types_can_have_different_numbers_of_columns(self):
+        rng = np.random.default_rng(0)
+        matrices = [rng.normal(0, 100, size=(5, 3)), rng.normal(0, 100, size=(5, 9))]
+        equilibrium = solve_bayesian(matrices, [0.3, 0.7], tolerance=0.5, time_limit=None)
+
+        self.assertEqual([3, 9], [len(c) for c in equilibrium.column_strategies])
+        self.assertLessEqual(equilibrium.exploitability, 0.5)
+        self.assertAlmostEqual(
+            equilibrium.exploitability,
+            bayesian_exploitability(matrices, [0.3, 0.7], equilibrium.row_strategy, equilibrium.column_strategies)
+        )
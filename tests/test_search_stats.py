@@ -0,0 +1,109 @@
+import threading
+import unittest
+from collections import defaultdict
+
+from config import ShowdownConfig
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.objects import IncrementalStateMutator
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.search_stats import SearchStats
+from showdown.engine.search_stats import measure_search
+from showdown.engine.search_stats import measure_decision
+from showdown.engine.search_stats import get_search_stats
+from showdown.engine.search_stats import get_decision_stats
+
+
+def create_pokemon(name, moves):
+    pokemon = StatePokemon(name, 100)
+    for move in moves:
+        pokemon.add_move(move)
+    return Pokemon.from_state_pokemon_dict(pokemon.to_dict())
+
+
+class TestSearchStats(unittest.TestCase):
+    def setUp(self):
+        ShowdownConfig.damage_calc_type = "average"
+        self.state = State(
+            Side(
+                create_pokemon("pikachu", ["thunderbolt", "quickattack"]),
+                {"rattata": create_pokemon("rattata", ["tackle"])},
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            Side(
+                create_pokemon("squirtle", ["watergun", "tackle"]),
+                {"pidgey": create_pokemon("pidgey", ["gust"])},
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            None,
+            None,
+            False
+        )
+        self.mutator = IncrementalStateMutator(self.state)
+        self.user_options, self.opponent_options = self.state.get_all_options()
+
+    def test_search_is_measured(self):
+        with measure_search(True) as stats:
+            get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+
+        summary = stats.summary()
+        self.assertEqual(1, summary['searches'])
+        self.assertEqual(1, summary['nodes_by_depth'][2])
+        self.assertGreater(summary['nodes_by_depth'][1], 0)
+        self.assertGreaterEqual(summary['outcomes'], summary['transitions'])
+        self.assertEqual(0, summary['pruned'])
+        self.assertGreater(summary['seconds']['instruction_generation'], 0)
+        self.assertFalse(get_search_stats().enabled)
+
+    def test_nothing_is_counted_when_disabled(self):
+        with measure_search(False) as stats:
+            get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+
+        self.assertEqual({}, stats.summary()['nodes_by_depth'])
+        self.assertEqual(0, stats.transitions)
+
+    def test_merging_adds_the_counts(self):
+        with measure_search(True) as stats:
+            get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=1, prune=False)
+        summary = stats.summary()
+
+        merged = SearchStats()
+        merged.merge(summary)
+        merged.merge(summary)
+
+        self.assertEqual(2, merged.searches)
+        self.assertEqual(2 * summary['transitions'], merged.transitions)
+        self.assertEqual(summary['max_outcomes'], merged.max_outcomes)
+
+    def test_each_thread_measures_its_own_decision(self):
+        searched = threading.Event()
+        summaries = {}
+
+        def decide(depth):
+            with measure_decision(True) as decision_stats:
+                with measure_search(True) as stats:
+                    get_payoff_matrix(IncrementalStateMutator(self.state), self.user_options, self.opponent_options, depth=depth, prune=False)
+                    if depth == 1:
+                        searched.set()
+                    else:
+                        # the other thread's decision has started and finished during this search
+                        searched.wait(10)
+                get_decision_stats().merge(stats.summary())
+            summaries[depth] = decision_stats.summary()
+
+        threads = [threading.Thread(target=decide, args=(depth,)) for depth in (2, 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([1], list(summaries[1]['nodes_by_depth']))
+        self.assertEqual(1, summaries[2]['nodes_by_depth'][2])
+        self.assertEqual(1, summaries[2]['searches'])
+        self.assertFalse(get_decision_stats().enabled)
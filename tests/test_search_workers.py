@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+import unittest
+import multiprocessing
+from unittest import mock
+
+from showdown.search_workers import SearchWorkerPool
+
+
+def add(a, b):
+    return a + b
+
+
+def get_pid():
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("bad search")
+
+
+def exit_in_a_worker(parent_pid):
+    # like a worker that is killed for using too much memory
+    if os.getpid() != parent_pid:
+        os._exit(1)
+    return os.getpid()
+
+
+def wait_for_file(path):
+    # gives up after 10 seconds so that a pool that runs one call at a time fails the test instead of hanging
+    deadline = time.time() + 10
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    return os.path.exists(path)
+
+
+def create_file(path):
+    open(path, 'w').close()
+    return True
+
+
+def log(message):
+    logging.getLogger("tests.search_worker").warning("%s from %s", message, os.getpid())
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@unittest.skipIf("fork" not in multiprocessing.get_all_start_methods(), "forking is not available")
+class TestSearchWorkerPool(unittest.TestCase):
+    def test_map_runs_in_this_process_when_the_pool_is_not_started(self):
+        pool = SearchWorkerPool(2)
+        self.assertEqual([os.getpid()], pool.map(get_pid, [()]))
+
+    def test_map_returns_results_in_the_order_of_the_arguments(self):
+        with SearchWorkerPool(2) as pool:
+            results = pool.map(add, [(i, 1) for i in range(20)])
+
+        self.assertEqual(list(range(1, 21)), results)
+
+    def test_map_runs_in_the_worker_processes(self):
+        with SearchWorkerPool(2) as pool:
+            pids = set(pool.map(get_pid, [()] * 10))
+
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_each_worker_reports_its_pid_and_memory(self):
+        with SearchWorkerPool(2) as pool:
+            reports = pool.reports
+
+        self.assertEqual([0, 1], [r.worker_index for r in reports])
+        self.assertEqual(2, len({r.pid for r in reports}))
+        for r in reports:
+            self.assertGreater(r.rss_kb, 0)
+
+    def test_exception_in_a_worker_raises_runtime_error(self):
+        with SearchWorkerPool(1) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.map(fail, [()])
+
+            # the pool is still usable after a failure
+            self.assertEqual([3], pool.map(add, [(1, 2)]))
+
+    def test_calls_from_two_threads_run_at_the_same_time(self):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "created")
+            with SearchWorkerPool(2) as pool:
+                # the first call's task can only finish once the second call's task has run
+                waiting = threading.Thread(target=lambda: results.update(waiting=pool.map(wait_for_file, [(path,)])))
+                creating = threading.Thread(target=lambda: results.update(creating=pool.map(create_file, [(path,)])))
+                waiting.start()
+                time.sleep(0.1)
+                creating.start()
+                waiting.join()
+                creating.join()
+
+        self.assertEqual({'waiting': [True], 'creating': [True]}, results)
+
+    def test_each_call_gets_its_own_results(self):
+        with SearchWorkerPool(2) as pool:
+            results = {}
+            threads = [
+                threading.Thread(target=lambda i=i: results.update({i: pool.map(add, [(i, j) for j in range(20)])}))
+                for i in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual({i: [i + j for j in range(20)] for i in range(4)}, results)
+
+    @mock.patch('showdown.search_workers.RESULT_POLL_SECONDS', 0.05)
+    def test_searches_are_run_in_this_process_when_a_worker_dies(self):
+        with SearchWorkerPool(2) as pool:
+            results = pool.map(exit_in_a_worker, [(os.getpid(),)] * 3)
+            started = pool.started
+            later_results = pool.map(get_pid, [()])
+
+        self.assertEqual([os.getpid()] * 3, results)
+        self.assertFalse(started)
+        self.assertEqual([os.getpid()], later_results)
+
+    def test_records_logged_in_a_worker_are_handled_by_this_process(self):
+        # the tests disable logging
+        disabled = logging.root.manager.disable
+        logging.disable(logging.NOTSET)
+        handler = RecordingHandler()
+        logging.getLogger().addHandler(handler)
+        try:
+            with SearchWorkerPool(2) as pool:
+                pool.map(log, [("searched",)] * 4)
+        finally:
+            logging.getLogger().removeHandler(handler)
+            logging.disable(disabled)
+
+        searched = [m for m in handler.messages if m.startswith("searched")]
+        self.assertEqual(4, len(searched))
+        self.assertNotIn(str(os.getpid()), " ".join(searched))
@@ -0,0 +1,147 @@
+import copy
+import unittest
+from collections import defaultdict
+
+import constants
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.objects import StateMutator
+from showdown.engine.evaluate import evaluate
+from showdown.engine.serialization import encode_state
+from showdown.engine.serialization import decode_state
+from showdown.engine.serialization import encode_instructions
+from showdown.engine.serialization import decode_instructions
+from showdown.engine.serialization import SerializationError
+from showdown.engine.serialization import VERSION
+
+
+class TestStateSerialization(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict()),
+                {
+                    "rattata": Pokemon.from_state_pokemon_dict(StatePokemon("rattata", 100).to_dict()),
+                    "charmander": Pokemon.from_state_pokemon_dict(StatePokemon("charmander", 100).to_dict()),
+                },
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("squirtle", 100).to_dict()),
+                {
+                    "bulbasaur": Pokemon.from_state_pokemon_dict(StatePokemon("bulbasaur", 100).to_dict()),
+                    "pidgey": Pokemon.from_state_pokemon_dict(StatePokemon("pidgey", 100).to_dict())
+                },
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            None,
+            None,
+            False
+        )
+
+    def assert_round_trip(self, state):
+        decoded = decode_state(encode_state(state))
+        self.assertEqual(repr(state), repr(decoded))
+        self.assertEqual(evaluate(state), evaluate(decoded))
+        return decoded
+
+    def test_state_round_trips(self):
+        self.assert_round_trip(self.state)
+
+    def test_changed_state_round_trips(self):
+        self.state.user.active.hp = 101.5
+        self.state.user.active.status = constants.BURN
+        self.state.user.active.attack_boost = -2
+        self.state.user.active.terastallized = True
+        self.state.user.active.volatile_status.add(constants.SUBSTITUTE)
+        self.state.user.active.moves = [
+            {constants.ID: 'tackle', constants.DISABLED: True, constants.CURRENT_PP: 56},
+            {constants.ID: 'thunderbolt', constants.DISABLED: False, constants.CURRENT_PP: 24},
+        ]
+        self.state.opponent.active.moves = [{constants.ID: 'tackle'}]
+        self.state.opponent.active.item = None
+        self.state.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+        self.state.opponent.wish = (2, 150)
+        self.state.weather = constants.RAIN
+        self.state.trick_room = True
+        self.state.tera_allowed = True
+
+        decoded = self.assert_round_trip(self.state)
+
+        self.assertEqual(101.5, decoded.user.active.hp)
+        self.assertIsInstance(decoded.user.active.maxhp, int)
+        self.assertEqual(1, decoded.opponent.side_conditions[constants.STEALTH_ROCK])
+        self.assertEqual(0, decoded.opponent.side_conditions[constants.SPIKES])
+        self.assertIn(constants.SUBSTITUTE, decoded.user.active.volatile_status)
+        self.assertEqual(self.state.user.active.volatile_status, decoded.user.active.volatile_status)
+
+    def test_decoded_state_keeps_the_effect_hooks_and_burn_multiplier(self):
+        self.state.user.active.ability = 'guts'
+        self.state.user.active.burn_multiplier = -2
+
+        decoded = self.assert_round_trip(self.state)
+
+        self.assertIs(self.state.user.active.hooks, decoded.user.active.hooks)
+        self.assertEqual(-2, decoded.user.active.burn_multiplier)
+
+    def test_decoded_state_can_be_mutated_and_reversed(self):
+        decoded = decode_state(encode_state(self.state))
+        instructions = [
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, 50),
+            (constants.MUTATOR_SWITCH, constants.USER, "pikachu", "rattata"),
+        ]
+        mutator = StateMutator(decoded)
+        mutator.apply(instructions)
+        self.assertEqual("rattata", decoded.user.active.id)
+        mutator.reverse(instructions)
+        self.assertEqual("pikachu", decoded.user.active.id)
+        self.assertEqual(self.state.opponent.active.hp, decoded.opponent.active.hp)
+
+    def test_copying_a_state_does_not_encode_it(self):
+        copied = copy.copy(self.state)
+        self.assertIs(self.state.user, copied.user)
+        self.assertIs(self.state.opponent, copied.opponent)
+
+    def test_decoding_instructions_raises_an_error(self):
+        with self.assertRaises(SerializationError):
+            decode_instructions(encode_state(self.state))
+
+    def test_decoding_a_different_version_raises_an_error(self):
+        payload = bytearray(encode_state(self.state))
+        payload[3] = VERSION + 1
+        with self.assertRaises(SerializationError):
+            decode_state(bytes(payload))
+
+    def test_truncated_payload_raises_an_error(self):
+        with self.assertRaises(SerializationError):
+            decode_state(encode_state(self.state)[:2])
+
+
+class TestInstructionSerialization(unittest.TestCase):
+    def test_instructions_round_trip(self):
+        instructions = [
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, 50),
+            (constants.MUTATOR_HEAL, constants.USER, 12.5),
+            (constants.MUTATOR_APPLY_STATUS, constants.USER, constants.BURN),
+            (constants.MUTATOR_WEATHER_START, constants.RAIN, None),
+            (constants.MUTATOR_WISH_START, constants.USER, 100, 0),
+            (constants.MUTATOR_CHANGE_TYPE, constants.USER, ['water'], ['fire', 'flying']),
+            (constants.MUTATOR_CHANGE_STATS, constants.USER, (1, 2, 3, 4, 5, 6), (6, 5, 4, 3, 2, 1.5)),
+            (constants.MUTATOR_TOGGLE_TRICKROOM,),
+        ]
+
+        self.assertEqual(instructions, decode_instructions(encode_instructions(instructions)))
+
+    def test_large_ints_round_trip(self):
+        instructions = [(constants.MUTATOR_DAMAGE, constants.USER, 2 ** 40)]
+        self.assertEqual(instructions, decode_instructions(encode_instructions(instructions)))
+
+    def test_unknown_value_raises_an_error(self):
+        with self.assertRaises(SerializationError):
+            encode_instructions([(constants.MUTATOR_DAMAGE, constants.USER, object())])
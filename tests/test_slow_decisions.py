@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from collections import defaultdict
+
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.engine.objects import get_move_choice
+from showdown.engine.serialization import decode_state
+from showdown.slow_decisions import StackSampler
+from showdown.slow_decisions import profile_decision
+from showdown.slow_decisions import record_search
+from showdown.slow_decisions import saver
+from benchmarks.corpus import load_saved_state
+from benchmarks.corpus import load_saved_searches
+
+
+def create_pokemon(name, moves):
+    pokemon = StatePokemon(name, 100)
+    for move in moves:
+        pokemon.add_move(move)
+    return Pokemon.from_state_pokemon_dict(pokemon.to_dict())
+
+
+class SlowBattle:
+    def __init__(self, seconds):
+        self.battle_tag = "battle-gen9ou-1"
+        self.turn = 3
+        self.pokemon_mode = "gen9ou"
+        self.seconds = seconds
+
+    def find_best_move(self):
+        # like a bot that searches the opponent's two possible sets
+        for opponent in ["squirtle", "bulbasaur"]:
+            record_search(self.create_state(opponent), [get_move_choice("thunderbolt")], [get_move_choice("tackle")], 2)
+        time.sleep(self.seconds)
+        return ["thunderbolt"]
+
+    def create_state(self, opponent="squirtle"):
+        return State(
+            Side(create_pokemon("pikachu", ["thunderbolt"]), {}, (0, 0), defaultdict(lambda: 0), (0, 0)),
+            Side(create_pokemon(opponent, ["tackle"]), {}, (0, 0), defaultdict(lambda: 0), (0, 0)),
+            None,
+            None,
+            False
+        )
+
+
+class TestSlowDecisions(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_fold_puts_the_innermost_call_last(self):
+        stack = StackSampler.fold(sys._getframe())
+
+        self.assertTrue(stack.endswith("test_slow_decisions:test_fold_puts_the_innermost_call_last"))
+
+    def test_slow_decision_is_saved_with_its_state(self):
+        battle = SlowBattle(0.05)
+
+        best_move = profile_decision(battle, 0.01, self.directory)
+        # it is saved on another thread
+        saver.submit(lambda: None).result()
+
+        self.assertEqual(["thunderbolt"], best_move)
+        saved, = os.listdir(self.directory)
+        self.assertTrue(saved.startswith("battle-gen9ou-1-turn3-"))
+
+        name, summary, data = load_saved_state(os.path.join(self.directory, saved))
+        self.assertEqual(saved, name)
+        self.assertEqual("gen9ou", summary['mode'])
+        self.assertGreater(summary['seconds'], 0.01)
+        self.assertGreater(summary['samples'], 0)
+        self.assertEqual("pikachu", decode_state(data).user.active.id)
+
+        name, summary, searches = load_saved_searches(os.path.join(self.directory, saved))
+        self.assertEqual(["squirtle", "bulbasaur"], [decode_state(s[1]).opponent.active.id for s in searches])
+        for _, _, user_options, opponent_options in searches:
+            self.assertEqual([get_move_choice("thunderbolt")], user_options)
+            self.assertEqual([get_move_choice("tackle")], opponent_options)
+
+        with open(os.path.join(self.directory, saved, "profile.txt")) as f:
+            self.assertIn("find_best_move", f.read())
+
+    def test_fast_decision_is_not_saved(self):
+        best_move = profile_decision(SlowBattle(0), 10, self.directory)
+        saver.submit(lambda: None).result()
+
+        self.assertEqual(["thunderbolt"], best_move)
+        self.assertEqual([], os.listdir(self.directory))
@@ -1,6 +1,13 @@
+import pickle
 import unittest
+from collections import defaultdict
 
 import constants
+from data import all_move_json
+from showdown.engine.objects import MoveChoice
+from showdown.engine.objects import MoveOverlay
+from showdown.engine.objects import Side
+from showdown.engine.objects import get_move_choice
 from showdown.engine.objects import State
 from showdown.battle import Pokemon as StatePokemon
 from showdown.engine.objects import Pokemon
@@ -68,3 +75,136 @@ class TestPokemon(unittest.TestCase):
     def test_item_can_be_removed_returns_false_if_target_is_kyogreprimal(self):
         self.pokemon.id = 'kyogreprimal'
         self.assertFalse(self.pokemon.item_can_be_removed())
+
+
+class TestMoveOverlay(unittest.TestCase):
+    def setUp(self):
+        self.base = all_move_json['earthquake']
+        self.overlay = MoveOverlay(self.base)
+
+    def test_overlay_without_overrides_equals_base_move(self):
+        self.assertEqual(self.base, self.overlay)
+
+    def test_setting_a_value_does_not_modify_base_move(self):
+        self.overlay[constants.BASE_POWER] = 150
+
+        self.assertEqual(150, self.overlay[constants.BASE_POWER])
+        self.assertEqual(100, self.base[constants.BASE_POWER])
+
+    def test_copy_does_not_share_overrides(self):
+        self.overlay[constants.BASE_POWER] = 150
+        new_overlay = self.overlay.copy()
+        new_overlay[constants.BASE_POWER] = 200
+
+        self.assertEqual(150, self.overlay[constants.BASE_POWER])
+        self.assertEqual(200, new_overlay[constants.BASE_POWER])
+        self.assertIs(self.base, new_overlay.base)
+
+    def test_deleting_a_key_hides_the_base_value(self):
+        del self.overlay[constants.SECONDARY]
+
+        self.assertNotIn(constants.SECONDARY, self.overlay)
+        self.assertIsNone(self.overlay.get(constants.SECONDARY))
+        self.assertIn(constants.SECONDARY, self.base)
+        self.assertEqual(len(self.base) - 1, len(self.overlay))
+
+    def test_deleting_a_missing_key_raises_keyerror(self):
+        with self.assertRaises(KeyError):
+            del self.overlay['not_a_key']
+
+    def test_get_returns_default_for_missing_key(self):
+        self.assertEqual('default', self.overlay.get('not_a_key', 'default'))
+
+    def test_new_keys_are_iterated(self):
+        self.overlay[constants.DRAIN] = [1, 2]
+
+        self.assertEqual({**self.base, constants.DRAIN: [1, 2]}, self.overlay.to_dict())
+
+
+class TestEffectHooks(unittest.TestCase):
+    def setUp(self):
+        self.pokemon = Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict())
+
+    def test_pokemon_without_relevant_ability_or_item_has_no_hooks(self):
+        self.pokemon.ability = 'runaway'
+        self.pokemon.item = None
+
+        self.assertIsNone(self.pokemon.hooks.ability_modify_attack_being_used)
+        self.assertIsNone(self.pokemon.hooks.ability_end_of_turn)
+        self.assertIsNone(self.pokemon.hooks.item_modify_attack_being_used)
+        self.assertIsNone(self.pokemon.hooks.item_end_of_turn)
+        self.assertFalse(self.pokemon.hooks.speed_ability)
+
+    def test_setting_ability_rebinds_hooks(self):
+        self.pokemon.ability = 'technician'
+        self.assertIsNotNone(self.pokemon.hooks.ability_modify_attack_being_used)
+
+        self.pokemon.ability = 'swiftswim'
+        self.assertIsNone(self.pokemon.hooks.ability_modify_attack_being_used)
+        self.assertTrue(self.pokemon.hooks.speed_ability)
+
+    def test_setting_item_rebinds_hooks(self):
+        self.pokemon.item = 'choiceband'
+        self.assertIsNotNone(self.pokemon.hooks.item_modify_attack_being_used)
+
+        self.pokemon.item = 'leftovers'
+        self.assertIsNone(self.pokemon.hooks.item_modify_attack_being_used)
+        self.assertIsNotNone(self.pokemon.hooks.item_end_of_turn)
+
+    def test_pokemon_with_same_ability_and_item_share_hooks(self):
+        other_pokemon = Pokemon.from_state_pokemon_dict(StatePokemon("raichu", 100).to_dict())
+        self.pokemon.ability = 'static'
+        self.pokemon.item = 'lightball'
+        other_pokemon.ability = 'static'
+        other_pokemon.item = 'lightball'
+
+        self.assertIs(self.pokemon.hooks, other_pokemon.hooks)
+
+
+class TestMoveChoice(unittest.TestCase):
+    def test_get_move_choice_returns_the_same_object_for_the_same_choice(self):
+        self.assertIs(get_move_choice('tackle'), get_move_choice('tackle'))
+        self.assertIs(get_move_choice('pikachu', is_switch=True), get_move_choice('pikachu', is_switch=True))
+
+    def test_different_choices_are_not_shared(self):
+        self.assertIsNot(get_move_choice('tackle'), get_move_choice('tackle', terastallize=True))
+        self.assertIsNot(get_move_choice('tackle'), get_move_choice('tackle', is_switch=True))
+
+    def test_interned_choice_is_equal_to_a_new_choice(self):
+        new_choice = MoveChoice('tackle', terastallize=True)
+        interned_choice = get_move_choice('tackle', terastallize=True)
+
+        self.assertEqual(new_choice, interned_choice)
+        self.assertEqual(hash(new_choice), hash(interned_choice))
+        self.assertEqual(1, {new_choice: 1}[interned_choice])
+
+    def test_unpickled_choice_is_the_interned_choice(self):
+        self.assertIs(get_move_choice('tackle'), pickle.loads(pickle.dumps(MoveChoice('tackle'))))
+
+    def test_options_are_interned_choices(self):
+        state = State(
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict()),
+                {"rattata": Pokemon.from_state_pokemon_dict(StatePokemon("rattata", 100).to_dict())},
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("squirtle", 100).to_dict()),
+                {},
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            None,
+            None,
+            False
+        )
+        state.user.active.moves = [{constants.ID: 'tackle', constants.DISABLED: False}]
+
+        user_options, opponent_options = state.get_all_options()
+
+        self.assertIs(get_move_choice('tackle'), user_options[0])
+        self.assertIs(get_move_choice('rattata', is_switch=True), user_options[1])
+        self.assertIs(get_move_choice(constants.DO_NOTHING_MOVE), opponent_options[0])
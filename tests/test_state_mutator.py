@@ -8,6 +8,8 @@ from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
 from showdown.engine.objects import StateMutator
+from showdown.engine.objects import IncrementalStateMutator
+from showdown.engine.evaluate import evaluate
 
 
 class TestStatemutator(unittest.TestCase):
@@ -727,6 +729,22 @@ class TestStatemutator(unittest.TestCase):
         self.mutator.reverse(list_of_instructions)
         self.assertEqual('some_item', self.state.user.active.item)
 
+    def test_changing_item_rebinds_effect_hooks(self):
+        self.state.user.active.item = 'leftovers'
+        instruction = (
+            constants.MUTATOR_CHANGE_ITEM,
+            constants.USER,
+            None,
+            self.state.user.active.item
+        )
+        list_of_instructions = [instruction]
+        self.mutator.apply(list_of_instructions)
+
+        self.assertIsNone(self.state.user.active.hooks.item_end_of_turn)
+
+        self.mutator.reverse(list_of_instructions)
+        self.assertIsNotNone(self.state.user.active.hooks.item_end_of_turn)
+
     def test_wish_starting(self):
         self.state.user.wish = (0, 0)
         instruction = (
@@ -883,3 +901,144 @@ class TestStatemutator(unittest.TestCase):
         self.assertEqual(["water", "fire"], self.state.user.active.types)
         self.assertFalse(self.state.user.active.terastallized)
         self.assertFalse(self.state.user.used_tera)
+
+    def test_move_to_changes_state_from_one_outcome_to_a_sibling_outcome(self):
+        shared_instruction = (constants.MUTATOR_DAMAGE, constants.USER, 10)
+        first_outcome = [shared_instruction, (constants.MUTATOR_BOOST, constants.USER, constants.ATTACK, 1)]
+        second_outcome = [shared_instruction, (constants.MUTATOR_APPLY_STATUS, constants.USER, constants.BURN)]
+        starting_hp = self.state.user.active.hp
+
+        self.mutator.apply(first_outcome)
+        self.mutator.move_to(first_outcome, second_outcome)
+
+        self.assertEqual(starting_hp - 10, self.state.user.active.hp)
+        self.assertEqual(0, self.state.user.active.attack_boost)
+        self.assertEqual(constants.BURN, self.state.user.active.status)
+
+        self.mutator.reverse(second_outcome)
+
+        self.assertEqual(starting_hp, self.state.user.active.hp)
+        self.assertIsNone(self.state.user.active.status)
+
+    def test_move_to_only_reverses_instructions_after_the_divergence_point(self):
+        shared_instruction = (constants.MUTATOR_SWITCH, constants.USER, "pikachu", "rattata")
+        first_outcome = [shared_instruction, (constants.MUTATOR_DAMAGE, constants.USER, 10)]
+        second_outcome = [shared_instruction]
+
+        self.mutator.apply(first_outcome)
+        rattata = self.state.user.active
+        self.mutator.move_to(first_outcome, second_outcome)
+
+        self.assertIs(rattata, self.state.user.active)
+        self.assertEqual(rattata.maxhp, rattata.hp)
+
+    def test_move_to_from_no_instructions_applies_all_instructions(self):
+        instructions = [(constants.MUTATOR_DAMAGE, constants.USER, 10)]
+        starting_hp = self.state.user.active.hp
+
+        self.mutator.move_to([], instructions)
+
+        self.assertEqual(starting_hp - 10, self.state.user.active.hp)
+
+
+class TestIncrementalStateMutator(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict()),
+                {
+                    "rattata": Pokemon.from_state_pokemon_dict(StatePokemon("rattata", 100).to_dict()),
+                    "charmander": Pokemon.from_state_pokemon_dict(StatePokemon("charmander", 100).to_dict()),
+                },
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("squirtle", 100).to_dict()),
+                {
+                    "bulbasaur": Pokemon.from_state_pokemon_dict(StatePokemon("bulbasaur", 100).to_dict()),
+                },
+                (0, 0),
+                defaultdict(lambda: 0),
+                (0, 0)
+            ),
+            None,
+            None,
+            False
+        )
+        self.mutator = IncrementalStateMutator(self.state, debug=True)
+
+    def test_evaluation_matches_evaluate_for_a_new_state(self):
+        self.assertEqual(evaluate(self.state), self.mutator.evaluate())
+
+    def test_evaluation_matches_evaluate_after_each_instruction_is_applied_and_reversed(self):
+        instructions = [
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, 50),
+            (constants.MUTATOR_BOOST, constants.USER, constants.ATTACK, 2),
+            (constants.MUTATOR_UNBOOST, constants.OPPONENT, constants.SPEED, 1),
+            (constants.MUTATOR_APPLY_STATUS, constants.OPPONENT, constants.BURN),
+            (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.USER, constants.SUBSTITUTE),
+            (constants.MUTATOR_SIDE_START, constants.OPPONENT, constants.STEALTH_ROCK, 1),
+            (constants.MUTATOR_SIDE_START, constants.OPPONENT, constants.SPIKES, 2),
+            (constants.MUTATOR_SIDE_START, constants.USER, constants.REFLECT, 1),
+            (constants.MUTATOR_SWITCH, constants.USER, "pikachu", "rattata"),
+            (constants.MUTATOR_DAMAGE, constants.USER, 10),
+            (constants.MUTATOR_HEAL, constants.OPPONENT, 20),
+            (constants.MUTATOR_SIDE_END, constants.OPPONENT, constants.SPIKES, 2),
+            (constants.MUTATOR_REMOVE_STATUS, constants.OPPONENT, constants.BURN),
+        ]
+        rattata = self.state.user.reserve["rattata"]
+        rattata_stats = (rattata.maxhp, rattata.attack, rattata.defense, rattata.special_attack, rattata.special_defense, rattata.speed)
+        instructions.append((constants.MUTATOR_CHANGE_STATS, constants.USER, (500, 1, 2, 3, 4, 5), rattata_stats))
+
+        scores = [self.mutator.evaluate()]
+        for instruction in instructions:
+            self.mutator.apply_one(instruction)
+            self.assertEqual(evaluate(self.state), self.mutator.evaluate())
+            scores.append(self.mutator.evaluate())
+
+        for instruction in reversed(instructions):
+            scores.pop()
+            self.mutator.reverse([instruction])
+            self.assertEqual(scores[-1], self.mutator.evaluate())
+
+    def test_fainting_a_reserve_changes_the_count_scored_side_conditions(self):
+        self.state.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+        self.mutator.reset_evaluation()
+
+        instructions = [
+            (constants.MUTATOR_SWITCH, constants.OPPONENT, "squirtle", "bulbasaur"),
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, self.state.opponent.reserve["bulbasaur"].hp),
+            (constants.MUTATOR_SWITCH, constants.OPPONENT, "bulbasaur", "squirtle"),
+        ]
+        self.mutator.apply(instructions)
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluate())
+
+    def test_only_evaluating_the_leaves_matches_evaluate(self):
+        instructions = [
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, 50),
+            (constants.MUTATOR_DAMAGE, constants.OPPONENT, 50),
+            (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.OPPONENT, constants.LEECH_SEED),
+            (constants.MUTATOR_SWITCH, constants.OPPONENT, "squirtle", "bulbasaur"),
+        ]
+        self.mutator.apply(instructions)
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluate())
+
+        self.mutator.reverse(instructions)
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluate())
+
+    def test_debug_mode_catches_a_state_changed_outside_of_the_mutator(self):
+        self.state.user.active.hp = 1
+
+        with self.assertRaises(AssertionError):
+            self.mutator.evaluate()
+
+    def test_reset_evaluation_picks_up_a_state_changed_outside_of_the_mutator(self):
+        self.state.user.active.hp = 1
+        self.mutator.reset_evaluation()
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluate())
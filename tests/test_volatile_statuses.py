@@ -0,0 +1,35 @@
+import unittest
+
+import constants
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import Pokemon
+from showdown.engine.evaluate import evaluate_pokemon
+from showdown.engine.volatile_statuses import PROTECT_VOLATILE_STATUSES
+
+
+class TestPokemonVolatileStatus(unittest.TestCase):
+    def setUp(self):
+        self.pokemon = Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict())
+
+    def test_pokemon_starts_with_an_empty_volatile_status_set(self):
+        self.assertEqual(set(), self.pokemon.volatile_status)
+
+    def test_any_protect_volatile_status_is_found(self):
+        self.pokemon.volatile_status.add(constants.BANEFUL_BUNKER)
+        self.assertFalse(self.pokemon.volatile_status.isdisjoint(PROTECT_VOLATILE_STATUSES))
+
+        self.pokemon.volatile_status.remove(constants.BANEFUL_BUNKER)
+        self.assertTrue(self.pokemon.volatile_status.isdisjoint(PROTECT_VOLATILE_STATUSES))
+
+    def test_forced_move_is_found(self):
+        self.assertIsNone(self.pokemon.forced_move())
+        self.pokemon.volatile_status.add('dig')
+        self.assertEqual('dig', self.pokemon.forced_move())
+
+    def test_volatile_statuses_that_are_not_scored_do_not_change_the_evaluation(self):
+        score = evaluate_pokemon(self.pokemon)
+        self.pokemon.volatile_status.add('some-unscored-volatile-status')
+        self.assertEqual(score, evaluate_pokemon(self.pokemon))
+
+        self.pokemon.volatile_status.add(constants.SUBSTITUTE)
+        self.assertNotEqual(score, evaluate_pokemon(self.pokemon))